@@ -0,0 +1,226 @@
+import asyncio
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from agent_tools.tv_remote import CONFIG_PATH
+
+# Most devices a command talks to at the same time
+FANOUT_CONCURRENCY = int(os.getenv("FANOUT_CONCURRENCY", "8"))
+
+# Name of the TV configured by the top-level tv_ip in config.json
+DEFAULT_DEVICE = "default"
+
+# Ways of saying "every TV" at the end of a command that no title ends with
+ALL_TARGETS = r"everywhere|(?:(?:on|in|to)\s+)?(?:all|every|each)\s+(?:the\s+)?(?:tvs?|screens?|devices?|rooms?)"
+
+# "mute all": only a target when the rest is a key command, since titles end
+# with these words too ("winner takes all", "free for all")
+BARE_ALL_TARGETS = r"(?:(?:on|in|to)\s+)?(?:all|every|each)"
+
+
+# path -> (mtime, config); every command reads the config, it rarely changes
+_config_cache = {}
+
+
+def load_config(path=None):
+    """config.json as a dict, read again only when the file changes. Do not modify it."""
+    path = path or CONFIG_PATH
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        # Bridge-only setups have no config.json
+        _config_cache.pop(path, None)
+        return {}
+
+    cached = _config_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with open(path) as f:
+        config = json.load(f)
+    _config_cache[path] = (mtime, config)
+    return config
+
+
+def load_devices(config):
+    """
+    Returns {name: device} from config.json.
+
+    A device is {"name", "tv_ip", "api_port", "bridge_url", "transport"};
+    missing fields fall back to API_BASE_URL / TV_TRANSPORT / config.json
+    at send time. The top-level tv_ip is the "default" device unless
+    "devices" lists it under another name.
+
+        "devices": {
+            "living_room": {"tv_ip": "10.34.76.78"},
+            "bedroom": {"tv_ip": "10.34.76.80", "bridge_url": "http://10.34.76.5:3000"}
+        },
+        "groups": {"downstairs": ["living_room", "kitchen"]}
+    """
+    devices = {}
+    for name, device in (config.get("devices") or {}).items():
+        devices[name] = {**device, "name": name}
+
+    if not devices or ("tv_ip" in config and not any(d.get("tv_ip") == config["tv_ip"] for d in devices.values())):
+        devices[DEFAULT_DEVICE] = {"name": DEFAULT_DEVICE, "tv_ip": config.get("tv_ip")}
+
+    default = default_device(config, devices)
+    devices[default["name"]] = {**default, "default": True}
+    return devices
+
+
+def default_device(config, devices):
+    """The TV a command goes to when it names none: default_device, else the top-level tv_ip."""
+    name = config.get("default_device")
+    if name in devices:
+        return devices[name]
+    for device in devices.values():
+        if device.get("tv_ip") == config.get("tv_ip"):
+            return device
+    return next(iter(devices.values()))
+
+
+def load_groups(config, devices):
+    """Device groups from config.json, plus "all" for every configured device."""
+    groups = {"all": list(devices)}
+    groups.update(config.get("groups") or {})
+    return groups
+
+
+def spoken(name):
+    return name.replace("_", " ").replace("-", " ").lower()
+
+
+def split_targets(task, config=None, is_key_command=None):
+    """
+    Splits the target devices off the end of a command.
+
+    "mute on all tvs" -> ("mute", ["all"]), "play stranger things in the
+    bedroom" -> ("play stranger things", ["bedroom"]). A bare "mute all"
+    only targets every TV when `is_key_command` accepts what comes before
+    it, so "play winner takes all" keeps its title. Returns (task, []) when
+    the command names no target, which means the default TV.
+    """
+    config = config if config is not None else load_config()
+    devices = load_devices(config)
+    names = sorted(set(devices) | set(load_groups(config, devices)) - {"all"}, key=len, reverse=True)
+
+    named = "|".join(re.escape(spoken(name)) for name in names)
+    pattern = rf"\s+(?:(?P<all>{ALL_TARGETS})|(?P<bare>{BARE_ALL_TARGETS})"
+    if named:
+        pattern += rf"|(?:on|in|to|at)\s+(?:the\s+)?(?P<name>{named})(?:\s+(?:tv|screen|room))?"
+    pattern += r")\s*[.!]?$"
+
+    match = re.search(pattern, task, flags=re.IGNORECASE)
+    if not match:
+        return task, []
+
+    rest = task[:match.start()].strip()
+    if match.group("bare"):
+        if not (is_key_command and is_key_command(rest)):
+            return task, []
+        target = "all"
+    elif match.group("all"):
+        target = "all"
+    else:
+        target = next(name for name in names if spoken(name) == match.group("name").lower())
+    return rest, [target]
+
+
+def resolve_targets(targets, config=None):
+    """Expands device and group names into device dicts; no targets means the default TV."""
+    config = config if config is not None else load_config()
+    devices = load_devices(config)
+    groups = load_groups(config, devices)
+
+    if not targets:
+        return [next(device for device in devices.values() if device.get("default"))]
+
+    resolved = []
+    for target in targets:
+        for name in groups.get(target, [target]):
+            if name not in devices:
+                raise Exception(f"Unknown device '{name}' in config.json")
+            if devices[name] not in resolved:
+                resolved.append(devices[name])
+    return resolved
+
+
+def device_result(device, start, error=None):
+    return {
+        "device": device["name"],
+        "status": "error" if error else "success",
+        "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+        "error": f"{type(error).__name__}: {error}" if error else None,
+    }
+
+
+async def fan_out(devices, send, concurrency=None):
+    """
+    Runs `await send(device)` for every device, at most `concurrency` at a time.
+
+    Returns one result per device (in device order) with its status and
+    latency, so the whole fan-out takes about as long as the slowest device.
+    """
+    limit = asyncio.Semaphore(concurrency or FANOUT_CONCURRENCY)
+
+    async def send_one(device):
+        async with limit:
+            start = time.perf_counter()
+            try:
+                await send(device)
+                return device_result(device, start)
+            except Exception as e:
+                return device_result(device, start, e), e
+
+    results = await asyncio.gather(*(send_one(device) for device in devices))
+    return unpack(results)
+
+
+def fan_out_sync(devices, send, concurrency=None):
+    """fan_out for the sync nodes: one thread per device, at most `concurrency` at a time."""
+    if len(devices) == 1:
+        start = time.perf_counter()
+        try:
+            send(devices[0])
+            return unpack([device_result(devices[0], start)])
+        except Exception as e:
+            return unpack([(device_result(devices[0], start, e), e)])
+
+    def send_one(device):
+        start = time.perf_counter()
+        try:
+            send(device)
+            return device_result(device, start)
+        except Exception as e:
+            return device_result(device, start, e), e
+
+    with ThreadPoolExecutor(max_workers=min(len(devices), concurrency or FANOUT_CONCURRENCY)) as pool:
+        return unpack(list(pool.map(send_one, devices)))
+
+
+def unpack(results):
+    """Splits fan-out results into (per-device results, exceptions of the failed devices)."""
+    device_results, errors = [], []
+    for result in results:
+        if isinstance(result, tuple):
+            device_results.append(result[0])
+            errors.append(result[1])
+        else:
+            device_results.append(result)
+    return device_results, errors
+
+
+def report_fan_out(device_results, errors):
+    """
+    Logs the per-device outcome and re-raises when no device got the command,
+    so a single TV fails exactly as it did before fan-out existed.
+    """
+    if len(device_results) > 1:
+        for result in device_results:
+            icon = "✅" if result["status"] == "success" else "❌"
+            print(f"    {icon} {result['device']:16} {result['latency_ms']:8.1f} ms {result['error'] or ''}")
+
+    if errors and len(errors) == len(device_results):
+        raise errors[0]
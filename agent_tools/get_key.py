@@ -1,69 +1,97 @@
-from langchain_groq import ChatGroq
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
-from typing import Literal
-from dotenv import load_dotenv
+from typing import Literal, List, Optional
+from model.groq_model import register_chain
+from agent_tools.tracing import add_llm_time
+from agent_tools.key_macro import macro_from_state, macro_update, describe_macro
 
-load_dotenv()
+# Every key code the device accepts
+KeyCode = Literal["KEYCODE_DPAD_UP", "KEYCODE_DPAD_DOWN", "KEYCODE_DPAD_LEFT", "KEYCODE_DPAD_RIGHT", "KEYCODE_DPAD_CENTER", "KEYCODE_MEDIA_PLAY_PAUSE", "KEYCODE_HOME", "KEYCODE_BACK", "KEYCODE_POWER", "KEYCODE_MUTE", "KEYCODE_VOLUME_UP", "KEYCODE_VOLUME_DOWN"]
 
-def get_key(state):
-
-    print("[KEY] Starting key command generation...")
+# Create output schema using Pydantic
+class KeyStep(BaseModel):
+    command: KeyCode = Field(description="""Return key code depending on the task 
+    here are the key codes
+        "key up code": "KEYCODE_DPAD_UP",
+        "key down code": "KEYCODE_DPAD_DOWN",
+        "key left code": "KEYCODE_DPAD_LEFT",
+        "key right code": "KEYCODE_DPAD_RIGHT",
+        "key select code this is use for selection and work like tap on the screen or OK button": "KEYCODE_DPAD_CENTER",
+        "key media play pause": "KEYCODE_MEDIA_PLAY_PAUSE",
+        "key home": "KEYCODE_HOME",
+        "key back": "KEYCODE_BACK",
+        "key power": "KEYCODE_POWER",
+        "key mute or volume 0 and also use for unmute": "KEYCODE_MUTE",
+        "key volume up": "KEYCODE_VOLUME_UP",
+        "key volume down": "KEYCODE_VOLUME_DOWN"
+    """)
+    repeat : int = Field(default=1,description="""The number of times to repeat the key code this only required if you want to send the key code multiple times example volume increasing and decreasing""")
+    delay_ms : Optional[int] = Field(default=None, description="""Pause in milliseconds after this step, only when the user asks to wait""")
 
-    task = state['current_task']
-    task_number = state['task_number']
+class SendKeyOutput(BaseModel):
+    steps: List[KeyStep] = Field(description="""The keys to press in order. One step for a single key (use repeat for the same key several times), one step per key for sequences""")
 
-    print(f"[TASK] Task #{task_number + 1}: {task}")
-
-    # Initialize the Groq model (use any model you prefer)
-    llm = ChatGroq(model="gemma2-9b-it")
-
-    # Create output schema using Pydantic
-    class SendKeyOutput(BaseModel):
-        command: Literal["KEYCODE_DPAD_UP", "KEYCODE_DPAD_DOWN", "KEYCODE_DPAD_LEFT", "KEYCODE_DPAD_RIGHT", "KEYCODE_DPAD_CENTER", "KEYCODE_MEDIA_PLAY_PAUSE", "KEYCODE_HOME", "KEYCODE_BACK", "KEYCODE_POWER", "KEYCODE_MUTE", "KEYCODE_VOLUME_UP", "KEYCODE_VOLUME_DOWN"] = Field(description="""Return key code depending on the task 
-        here are the key codes
-            "key up code": "KEYCODE_DPAD_UP",
-            "key down code": "KEYCODE_DPAD_DOWN",
-            "key left code": "KEYCODE_DPAD_LEFT",
-            "key right code": "KEYCODE_DPAD_RIGHT",
-            "key select code this is use for selection and work like tap on the screen or OK button": "KEYCODE_DPAD_CENTER",
-            "key media play pause": "KEYCODE_MEDIA_PLAY_PAUSE",
-            "key home": "KEYCODE_HOME",
-            "key back": "KEYCODE_BACK",
-            "key power": "KEYCODE_POWER",
-            "key mute or volume 0 and also use for unmute": "KEYCODE_MUTE",
-            "key volume up": "KEYCODE_VOLUME_UP",
-            "key volume down": "KEYCODE_VOLUME_DOWN"
-        """)
-        repeat : int = Field(default=1,description="""The number of times to repeat the key code this only required if you want to send the key code multiple times example volume increasing and decreasing""")
-
-    # Create output parser using PydanticOutputParser
-    key_output_parser = PydanticOutputParser(pydantic_object=SendKeyOutput)
-
-    # Create prompt template using PromptTemplate
-    template = PromptTemplate(
-        template="""You are a remote control agent. You are given a task to complete. Your task is to return a valid key code. 
+KEY_TEMPLATE = """You are a remote control agent. You are given a task to complete. Your task is to return a valid key code. 
         Your task is to send the key code to the device. 
+        example:
+        increase volume 4 times = {{"steps": [{{"command": "KEYCODE_VOLUME_UP", "repeat": 4}}]}}
+        go right twice, down once, then select = {{"steps": [{{"command": "KEYCODE_DPAD_RIGHT", "repeat": 2}}, {{"command": "KEYCODE_DPAD_DOWN"}}, {{"command": "KEYCODE_DPAD_CENTER"}}]}}
         Here is the task:
         {task} \n {format_instructions}
-        """,
-        input_variables=["task", "format_instructions"],
-        partial_variables={"format_instructions": key_output_parser.get_format_instructions()},
-    )
+        """
+
+# Prompt, parser and format instructions are built once and shared by every call
+key_chain = register_chain("get_key", KEY_TEMPLATE, SendKeyOutput, on_llm_time=add_llm_time)
+
+def start_get_key(state):
+    """Logs the task and returns the key command the fused planner already extracted, if any."""
+
+    print("[KEY] Starting key command generation...")
+
+    task_number = state['task_number']
+
+    print(f"[TASK] Task #{task_number + 1}: {state['current_task']}")
+
+    # The fused planner may already have extracted the key macro
+    if state.get('key_macro'):
+        steps = macro_from_state(state)
+        print(f"[DONE] Using key macro from planner. | key_macro : {describe_macro(steps)}\n")
+        return { **macro_update(steps), 'task_number': task_number + 1 }
+
+    if state.get('current_task_command'):
+        print(f"[DONE] Using key command from planner. | current_task_command : {state['current_task_command']} | repeat :  {state.get('repeat', 1)}\n")
+        return { 'current_task_command': state['current_task_command'], 'repeat': state.get('repeat') or 1, 'task_number': task_number + 1 }
+
+    return None
+
+def key_result(final_result, task_number):
+
+    if not final_result.steps:
+        raise Exception("No key code found for the given task.")
+
+    result = macro_update(final_result.steps)
+
+    print(f"[DONE] Task processed successfully. | key_macro : {describe_macro(result['key_macro'])}\n" )
+
+    return { **result, 'task_number': task_number + 1 }
+
+def get_key(state):
+    prefilled = start_get_key(state)
+    if prefilled is not None:
+        return prefilled
 
-    # Create prompt
-    prompt = template.invoke({"task": task})
+    # Get the parsed key command from the shared llm chain
+    final_result = key_chain.invoke(task=state['current_task'])
 
-    # Get response from the llm
-    response = llm.invoke(prompt)
+    return key_result(final_result, state['task_number'])
 
-    # Parse the response using the output parser
-    final_result = key_output_parser.parse(response.content)
+async def get_key_async(state):
+    prefilled = start_get_key(state)
+    if prefilled is not None:
+        return prefilled
 
-    print(f"[DONE] Task processed successfully. | current_task_command : {final_result.command} | repeat :  {final_result.repeat}\n" )
+    final_result = await key_chain.ainvoke(task=state['current_task'])
 
-    return { 'current_task_command': final_result.command, 'repeat': final_result.repeat, 'task_number': task_number + 1 }
+    return key_result(final_result, state['task_number'])
 
 # if __name__ == "__main__":
 #   r = get_key({"current_task": "make volume 0"})
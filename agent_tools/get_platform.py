@@ -1,14 +1,26 @@
+import asyncio
 import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from simplejustwatchapi.justwatch import search
+from agent_tools.tracing import network_timer
+from agent_tools.platform_cache import platform_cache
 
-def get_tvshow_plattform(state):
-  print("🔎 Starting platform search for TV show...")
-  show_name = state["target_show_name"]
-  task_number = state['task_number']
-  results = search(show_name, "IN", "en", 5, True)
+# JustWatch search parameters
+COUNTRY = "IN"
+LANGUAGE = "en"
+RESULT_COUNT = 5
+
+# Set PLATFORM_CACHE=0 to always search JustWatch live
+PLATFORM_CACHE_ENABLED = os.getenv("PLATFORM_CACHE", "1") != "0"
 
-  print(f"📺 Searching for: '{show_name}' (Task #{task_number + 1})")
+# Recommended titles looked up at the same time, and how many of the list are looked up at all
+PLATFORM_CONCURRENCY = int(os.getenv("PLATFORM_CONCURRENCY", "4"))
+PLATFORM_MAX_TITLES = int(os.getenv("PLATFORM_MAX_TITLES", "12"))
 
+def project_results(results):
+  """Keeps the fields the agent uses from raw JustWatch search entries."""
   final_results = []
 
   for i in results:
@@ -31,14 +43,170 @@ def get_tvshow_plattform(state):
       }
       final_results.append(info)
 
+  return final_results
+
+def cached_platforms(show_name):
+  """Returns the platform_info cached for a title, or None."""
+  if not PLATFORM_CACHE_ENABLED:
+    return None
+
+  final_results = platform_cache.get(show_name, COUNTRY, LANGUAGE, RESULT_COUNT)
+  if final_results is not None:
+    stats = platform_cache.stats()
+    print(f"[CACHE] JustWatch cache hit | hit rate : {stats['hit_rate']:.0%} | saved : {stats['saved_ms'] / 1000:.1f} s")
+  return final_results
+
+def store_platforms(show_name, final_results, fetch_start):
+  if PLATFORM_CACHE_ENABLED:
+    fetch_ms = (time.perf_counter() - fetch_start) * 1000
+    platform_cache.set(show_name, COUNTRY, LANGUAGE, RESULT_COUNT, final_results, fetch_ms)
+  return final_results
+
+def lookup_platforms(show_name):
+  """Projected JustWatch results for one title, from the cache or a live search."""
+  final_results = cached_platforms(show_name)
+  if final_results is None:
+    start = time.perf_counter()
+    results = search(show_name, COUNTRY, LANGUAGE, RESULT_COUNT, True)
+    final_results = store_platforms(show_name, project_results(results), start)
+  return final_results
+
+def first_playable(final_results):
+  """First search result with a platform to open, or None."""
+  for info in final_results:
+    if info["available_platforms"]:
+      return info
+  return None
+
+def candidate_titles(state):
+  """
+  Titles worth looking up: the target alone, or, when the target came from
+  get_recommendations, the target followed by the other recommendations.
+  """
+  target = state["target_show_name"]
+  recommendations = state.get("recommendations") or []
+  if target not in recommendations:
+    return [target]
+  return ([target] + [title for title in recommendations if title != target])[:PLATFORM_MAX_TITLES]
+
+def resolved_title(title, final_results, error=None):
+  if error is not None:
+    print(f"  ⚠️ {title}: lookup failed ({error})")
+  elif first_playable(final_results):
+    print(f"  ▶️ {title}: {', '.join(p['platform_name'] for p in first_playable(final_results)['available_platforms'])}")
+  else:
+    print(f"  ⏭️ {title}: no streaming offers")
+  return title, final_results, error
+
+def resolve_platforms(titles):
+  """
+  Looks the titles up PLATFORM_CONCURRENCY at a time and returns
+  (title, platform_info, error) in the order the lookups finish, stopping
+  at the first title that has a platform to open.
+  """
+  if len(titles) == 1:
+    try:
+      return [resolved_title(titles[0], lookup_platforms(titles[0]))]
+    except Exception as e:
+      return [resolved_title(titles[0], [], e)]
+
+  resolved = []
+  pool = ThreadPoolExecutor(max_workers=min(len(titles), PLATFORM_CONCURRENCY))
+  try:
+    futures = {pool.submit(lookup_platforms, title): title for title in titles}
+    for future in as_completed(futures):
+      try:
+        resolved.append(resolved_title(futures[future], future.result()))
+      except Exception as e:
+        resolved.append(resolved_title(futures[future], [], e))
+      if first_playable(resolved[-1][1]):
+        break
+  finally:
+    # Lookups still running finish in the background and fill the cache
+    pool.shutdown(wait=False, cancel_futures=True)
+  return resolved
+
+async def resolve_platforms_async(titles):
+  """Same as resolve_platforms, awaiting the lookups on the running loop."""
+  loop = asyncio.get_running_loop()
+  # Own pool: the loop's default executor may have fewer threads than PLATFORM_CONCURRENCY
+  pool = ThreadPoolExecutor(max_workers=min(len(titles), PLATFORM_CONCURRENCY))
+
+  async def lookup(title):
+    try:
+      return resolved_title(title, await loop.run_in_executor(pool, lookup_platforms, title))
+    except Exception as e:
+      return resolved_title(title, [], e)
+
+  tasks = [asyncio.ensure_future(lookup(title)) for title in titles]
+  resolved = []
+  try:
+    for next_done in asyncio.as_completed(tasks):
+      resolved.append(await next_done)
+      if first_playable(resolved[-1][1]):
+        break
+  finally:
+    for task in tasks:
+      task.cancel()
+    # Lookups still running finish in the background and fill the cache
+    pool.shutdown(wait=False, cancel_futures=True)
+  return resolved
+
+def platform_result(resolved, task_number):
+  """
+  Picks the first resolved title with a platform to open and returns it as
+  playing_title; target_show_name stays what was asked for, so the step does
+  not conflict with get_recommendations. Raises when no title has one.
+  """
+
   # with open('just-results.json', 'w', encoding='utf-8') as f:
   #     json.dump(final_results, f, ensure_ascii=False)
 
+  for title, final_results, error in resolved:
+    info = first_playable(final_results)
+    if info:
+      break
+  else:
+    errors = [error for _, _, error in resolved if error is not None]
+    if len(errors) == len(resolved):
+      raise errors[0]
+    raise Exception(f"No streaming platform found for: {', '.join(title for title, _, _ in resolved)}")
+
+  app_link = info["available_platforms"][0]["platform_url"]
+
   print("\n📦 Platform info successfully gathered.")
-  print(f"🔗 First available platform link: {final_results[0]['available_platforms'][0]['platform_url']}")
+  if len(resolved) > 1 or info is not final_results[0]:
+    print(f"🎬 Playing: {info['name']} ({title})")
+  print(f"🔗 First available platform link: {app_link}")
   print("✅ Task completed.\n")
 
-  return {"platform_info": final_results, 'task_number': task_number + 1, "app_link": final_results[0]["available_platforms"][0]["platform_url"]}
+  return {"platform_info": final_results, 'task_number': task_number + 1, "app_link": app_link, "playing_title": title}
+
+def get_tvshow_plattform(state):
+  print("🔎 Starting platform search for TV show...")
+  titles = candidate_titles(state)
+  task_number = state['task_number']
+
+  print(f"📺 Searching for: '{state['target_show_name']}' (Task #{task_number + 1})")
+  if len(titles) > 1:
+    print(f"🔀 Checking {len(titles)} recommended titles, {PLATFORM_CONCURRENCY} at a time...")
+
+  return platform_result(resolve_platforms(titles), task_number)
+
+async def get_tvshow_plattform_async(state):
+  print("🔎 Starting platform search for TV show...")
+  titles = candidate_titles(state)
+  task_number = state['task_number']
+
+  print(f"📺 Searching for: '{state['target_show_name']}' (Task #{task_number + 1})")
+  if len(titles) > 1:
+    print(f"🔀 Checking {len(titles)} recommended titles, {PLATFORM_CONCURRENCY} at a time...")
+
+  # Timed as a whole: the lookups overlap
+  with network_timer():
+    resolved = await resolve_platforms_async(titles)
+
+  return platform_result(resolved, task_number)
 
 
-# print(get_tvshow_plattform({"target_show_name": "stranger things"}))
\ No newline at end of file
+# print(get_tvshow_plattform({"target_show_name": "stranger things"}))
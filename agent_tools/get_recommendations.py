@@ -1,26 +1,26 @@
+import os
 import requests
 from bs4 import BeautifulSoup
+from agent_tools.html_extract import extract_link_texts
+from agent_tools.http_client import get_async_client
+from agent_tools.tracing import network_timer
+from agent_tools.similarity_index import similarity_index, BackgroundRefresher
 
-def get_recommendations(state):
-
-    print("🔎 Starting recommendation search...")
-
-    show_name = state["show_name"]
-    task_number = state['task_number']
+MOVIE_MAP_URL = "https://www.movie-map.com"
 
-    print(f"📺 Looking for shows similar to: '{show_name}' (Task #{task_number + 1})")
+# Set SIMILAR_INDEX=0 to scrape movie-map for every request
+SIMILAR_INDEX_ENABLED = os.getenv("SIMILAR_INDEX", "1") != "0"
 
+def recommendations_url(show_name):
     # Format title for URL
     formatted_title = show_name.strip().replace(" ", "+").lower()
-    url = f"https://www.movie-map.com/{formatted_title}"
+    return f"{MOVIE_MAP_URL}/{formatted_title}"
 
-    # Send request
-    response = requests.get(url)
-    if response.status_code != 200:
-        raise Exception(f"Failed to load page. Status code: {response.status_code}")
+def parse_recommendations_soup(html, show_name):
+    """Extracts the similar titles from a movie-map page with a full BeautifulSoup tree."""
 
     # Parse HTML
-    soup = BeautifulSoup(response.text, 'html.parser')
+    soup = BeautifulSoup(html, 'html.parser')
     map_div = soup.find('div', {'id': 'gnodMap'})
     if not map_div:
         raise Exception("Could not find recommendations on the page.")
@@ -28,7 +28,56 @@ def get_recommendations(state):
     # Extract recommendations
     similar_titles = [a.text.strip() for a in map_div.find_all('a', class_='S')]
     similar_titles = [title for title in similar_titles if title.lower() != show_name.lower()]
-    result = list(set(similar_titles))
+    return list(set(similar_titles))
+
+def parse_recommendations(html, show_name):
+    """
+    Extracts the similar titles from a movie-map page.
+
+    Only the div#gnodMap subtree is parsed; pages where it cannot be located
+    that way go through parse_recommendations_soup. Both return the same list.
+    """
+    similar_titles = extract_link_texts(html, 'gnodMap', 'S')
+    if similar_titles is None:
+        return parse_recommendations_soup(html, show_name)
+
+    similar_titles = [title for title in similar_titles if title.lower() != show_name.lower()]
+    return list(set(similar_titles))
+
+def fetch_recommendations(show_name):
+    """Scrapes movie-map for a title and adds the result to the similarity index."""
+    response = requests.get(recommendations_url(show_name))
+    if response.status_code != 200:
+        raise Exception(f"Failed to load page. Status code: {response.status_code}")
+
+    result = parse_recommendations(response.text, show_name)
+    index_recommendations(show_name, result)
+    return result
+
+def index_recommendations(show_name, result):
+    """Adds a scrape to the similarity index; empty results are never indexed."""
+    if SIMILAR_INDEX_ENABLED and result:
+        similarity_index.put(show_name, result)
+
+# Stale index entries are re-scraped off the request path
+refresher = BackgroundRefresher(fetch_recommendations)
+
+def indexed_recommendations(show_name):
+    """Returns the indexed similar titles for a known title, or None."""
+    if not SIMILAR_INDEX_ENABLED:
+        return None
+
+    entry = similarity_index.get(show_name)
+    if entry is None:
+        return None
+
+    result, stale = entry
+    if stale:
+        refresher.submit(show_name)
+    print(f"[INDEX] Similar titles from the local index{' (refreshing in background)' if stale else ''} | {len(similarity_index)} titles indexed")
+    return result
+
+def recommendations_result(result, task_number):
 
     if not result:
         print("⚠️ No recommendations found.")
@@ -38,6 +87,45 @@ def get_recommendations(state):
 
     return {"recommendations": result, "target_show_name": result[0], 'task_number': task_number + 1}
 
+def get_recommendations(state):
+
+    print("🔎 Starting recommendation search...")
+
+    show_name = state["show_name"]
+    task_number = state['task_number']
+
+    print(f"📺 Looking for shows similar to: '{show_name}' (Task #{task_number + 1})")
+
+    # Only titles the index has never seen wait for movie-map
+    result = indexed_recommendations(show_name)
+    if result is None:
+        result = fetch_recommendations(show_name)
+
+    return recommendations_result(result, task_number)
+
+async def get_recommendations_async(state):
+
+    print("🔎 Starting recommendation search...")
+
+    show_name = state["show_name"]
+    task_number = state['task_number']
+
+    print(f"📺 Looking for shows similar to: '{show_name}' (Task #{task_number + 1})")
+
+    result = indexed_recommendations(show_name)
+    if result is not None:
+        return recommendations_result(result, task_number)
+
+    with network_timer():
+        response = await get_async_client().get(recommendations_url(show_name))
+    if response.status_code != 200:
+        raise Exception(f"Failed to load page. Status code: {response.status_code}")
+
+    result = parse_recommendations(response.text, show_name)
+    index_recommendations(show_name, result)
+
+    return recommendations_result(result, task_number)
+
 # # Example usage
 # if __name__ == "__main__":
 #     results = get_recommendations({"show_name": "stranger things"})
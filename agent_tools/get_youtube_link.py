@@ -1,23 +1,337 @@
+import asyncio
+import json
+import os
+import re
+import urllib.parse
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import requests
 from youtube_search import YoutubeSearch
+from agent_tools.cache import TTLCache
+from agent_tools.http_client import get_async_client
+from agent_tools.platform_cache import normalize_title
+from agent_tools.tracing import network_timer
 
-def get_youtube_link(state):
-  print("🔎 Starting YouTube search...")
-  query = state['youtube_query']
-  task_number = state['task_number']
+YOUTUBE_URL = "https://www.youtube.com"
 
-  print(f"🎬 Searching for: '{query}' (Task #{task_number + 1})")
+# Set YOUTUBE_EARLY_EXIT=0 to always let youtube_search parse the full results page
+YOUTUBE_EARLY_EXIT = os.getenv("YOUTUBE_EARLY_EXIT", "1") != "0"
+
+# query -> first result; popular queries repeat all day. Set YOUTUBE_CACHE=0 to turn it off
+YOUTUBE_CACHE_ENABLED = os.getenv("YOUTUBE_CACHE", "1") != "0"
+YOUTUBE_CACHE_TTL = int(os.getenv("YOUTUBE_CACHE_TTL", 6 * 3600))
+YOUTUBE_CACHE_SIZE = int(os.getenv("YOUTUBE_CACHE_SIZE", 256))
+youtube_cache = TTLCache(max_entries=YOUTUBE_CACHE_SIZE, ttl=YOUTUBE_CACHE_TTL)
+
+# Set SPECULATIVE_YOUTUBE=0 to wait for the llm query before searching
+SPECULATIVE_YOUTUBE = os.getenv("SPECULATIVE_YOUTUBE", "1") != "0"
+
+# What people put around a search when they ask for a video
+LEAD_WORDS = re.compile(
+  r"^(?:(?:please|can you|could you|i want to|i wanna|i would like to|i'd like to|let's|lets)\s+)*"
+  r"(?:play|watch|open|show me|show|put on|search for|search|find|listen to|youtube)\s+"
+)
+TRAIL_WORDS = re.compile(r"\s+(?:(?:on|from|in)\s+youtube|please)$")
+# Words that do not change what a search finds
+QUERY_STOPWORDS = {"the", "a", "an", "some", "me", "please", "on", "youtube", "video", "videos"}
+
+# Start of the results of one item section in ytInitialData
+ITEM_SECTION = re.compile(r'"itemSectionRenderer"\s*:\s*\{\s*"contents"\s*:\s*\[')
+ITEM_SEPARATOR = re.compile(r"[\s,]*")
+# Unscanned page end kept in case a marker is split across chunks
+MARKER_TAIL = 64
+CHUNK_SIZE = 16 * 1024
+
+# Keep-alive session for the sync node
+session = requests.Session()
+_decoder = json.JSONDecoder()
+
+def results_url(query):
+  return f"{YOUTUBE_URL}/results?search_query={urllib.parse.quote_plus(query)}"
+
+def playable_video(item):
+  """The video of an item section result, or None when it is something else or cannot be played."""
+  video = item.get("videoRenderer") if isinstance(item, dict) else None
+  if not isinstance(video, dict):
+    return None
+  url_suffix = video.get("navigationEndpoint", {}).get("commandMetadata", {}).get("webCommandMetadata", {}).get("url")
+  if video.get("videoId") and url_suffix:
+    title = video.get("title", {}).get("runs", [{}])[0].get("text")
+    return {"id": video["videoId"], "title": title, "url_suffix": url_suffix}
+  return None
+
+class FirstVideoScanner:
+  """
+  Looks for the first playable video in a results page that is still
+  downloading; feed() it the chunks as they arrive.
 
+  Like youtube_search, only the direct items of an itemSectionRenderer's
+  contents are results, in page order: a videoRenderer nested in another
+  item is skipped along with it. Only the part of the page not scanned yet
+  is kept, and each item is decoded once, when all of it has arrived.
+  """
+
+  def __init__(self):
+    self.pending = []
+    # "page": before ytInitialData, "data": between item sections, "items": inside one
+    self.state = "page"
+
+  def feed(self, chunk):
+    """Returns the first playable video once it has arrived, else None."""
+    self.pending.append(chunk)
+    text = "".join(self.pending)
+    video, pos = self.scan(text)
+    self.pending = [text[pos:]]
+    return video
+
+  def scan(self, text):
+    """Returns (video or None, where the unscanned part of `text` starts)."""
+    pos = 0
+    while True:
+      if self.state == "page":
+        found = text.find("ytInitialData", pos)
+        if found < 0:
+          return None, max(pos, len(text) - MARKER_TAIL)
+        pos, self.state = found + len("ytInitialData"), "data"
+      elif self.state == "data":
+        section = ITEM_SECTION.search(text, pos)
+        if section is None:
+          return None, max(pos, len(text) - MARKER_TAIL)
+        pos, self.state = section.end(), "items"
+      else:
+        pos = ITEM_SEPARATOR.match(text, pos).end()
+        if pos == len(text):
+          return None, pos
+        if text[pos] == "]":
+          pos, self.state = pos + 1, "data"
+          continue
+        try:
+          item, pos_after = _decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+          # The item runs past what has arrived so far
+          return None, pos
+        pos = pos_after
+        video = playable_video(item)
+        if video:
+          return video, pos
+
+def full_search(query):
   results = YoutubeSearch(query, max_results=10).to_dict()
+  return results[0] if results else None
+
+def early_exit_search(query):
+  """
+  Streams the results page and stops reading at the first playable video.
+  Falls back to youtube_search when the page has none (consent page, new layout).
+  """
+  scanner = FirstVideoScanner()
+  with session.get(results_url(query), stream=True, timeout=10) as response:
+    response.encoding = response.encoding or "utf-8"
+    for chunk in response.iter_content(CHUNK_SIZE, decode_unicode=True):
+      video = scanner.feed(chunk)
+      if video:
+        return video
+  return full_search(query)
+
+async def early_exit_search_async(query):
+  scanner = FirstVideoScanner()
+  async with get_async_client().stream("GET", results_url(query)) as response:
+    async for chunk in response.aiter_text(CHUNK_SIZE):
+      video = scanner.feed(chunk)
+      if video:
+        return video
+  return await asyncio.to_thread(full_search, query)
+
+def cached_video(query):
+  if not YOUTUBE_CACHE_ENABLED:
+    return None
+  video = youtube_cache.get(normalize_title(query))
+  if video is not None:
+    stats = youtube_cache.stats()
+    print(f"[CACHE] YouTube cache hit | hit rate : {stats['hit_rate']:.0%}")
+  return video
 
-  if not results:
+def store_video(query, video):
+  if video and YOUTUBE_CACHE_ENABLED:
+    youtube_cache.set(normalize_title(query), video)
+  return video
+
+def youtube_link_result(video, task_number):
+  if not video:
         print("❌ No YouTube results found.")
         raise Exception("No YouTube results found for the given query.")
-  
-  link = "https://www.youtube.com" + results[0]['url_suffix']
-  title = results[0].get('title', 'Unknown Title')
+
+  link = "https://www.youtube.com" + video['url_suffix']
+  title = video.get('title') or 'Unknown Title'
 
   print("✅ YouTube search successful.")
   print(f"🔗 Top Result: {title}")
   print("✅ Task completed.\n")
 
   return { 'app_link': link, 'task_number': task_number + 1 }
+
+def find_video(query):
+  """First result for a query: from the cache, else from a search."""
+  video = cached_video(query)
+  if video is None:
+    video = store_video(query, early_exit_search(query) if YOUTUBE_EARLY_EXIT else full_search(query))
+  return video
+
+async def find_video_async(query):
+  video = cached_video(query)
+  if video is None:
+    if YOUTUBE_EARLY_EXIT:
+      video = await early_exit_search_async(query)
+    else:
+      # youtube_search is blocking, keep it off the event loop
+      video = await asyncio.to_thread(full_search, query)
+    store_video(query, video)
+  return video
+
+def cheap_query(task):
+  """The raw task as a search: "please play the avengers endgame trailer" -> "the avengers endgame trailer"."""
+  query = re.sub(r"[^\w\s']", " ", task.casefold())
+  query = re.sub(r"\s+", " ", query).strip()
+  query = TRAIL_WORDS.sub("", LEAD_WORDS.sub("", query))
+  return query.strip()
+
+def query_key(query):
+  """Queries with the same key find the same videos."""
+  words = re.sub(r"[^\w\s]", " ", query.casefold()).split()
+  return " ".join(word for word in words if word not in QUERY_STOPWORDS)
+
+def title_matches(title, query):
+  """Every meaningful word of the query is in the video title."""
+  title_words = set(re.sub(r"[^\w\s]", " ", (title or "").casefold()).split())
+  return bool(query_key(query)) and set(query_key(query).split()) <= title_words
+
+# Speculative searches waiting for their llm query: query key -> (speculative query, future)
+speculations = OrderedDict()
+MAX_SPECULATIONS = 64
+speculation_stats = {"started": 0, "same_query": 0, "title_match": 0, "discarded": 0}
+_speculation_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="youtube-speculate")
+# speculative_video's answer when no speculative search was started, unlike None: searched, nothing found
+NO_SPECULATION = object()
+
+def should_speculate(state):
+  # Only plans that go on to search, and only when the llm is about to be asked
+  edges = state.get('edges')
+  return SPECULATIVE_YOUTUBE and not state.get('youtube_query') and (not edges or 'get_youtube_link' in edges)
+
+def start_speculation(task):
+  """Searches the cheaply cleaned task while the llm rewrites it. Returns (query, future) or None."""
+  query = cheap_query(task)
+  if not query:
+    return None
+  speculation_stats["started"] += 1
+  print(f"[SPEC] Speculative YouTube search: '{query}'")
+  return query, _speculation_pool.submit(find_video, query)
+
+def start_speculation_async(task):
+  query = cheap_query(task)
+  if not query:
+    return None
+  speculation_stats["started"] += 1
+  print(f"[SPEC] Speculative YouTube search: '{query}'")
+  future = asyncio.ensure_future(find_video_async(query))
+  # A search nobody picks up must not log "exception was never retrieved"
+  future.add_done_callback(lambda f: f.cancelled() or f.exception())
+  return query, future
+
+def keep_speculation(speculation, llm_query):
+  """Hands a speculative search to get_youtube_link under the llm's query (None: the llm failed)."""
+  if speculation is None:
+    return
+  if llm_query is None:
+    speculation[1].cancel()
+    return
+  speculations[query_key(llm_query)] = speculation
+  while len(speculations) > MAX_SPECULATIONS:
+    _, (_, future) = speculations.popitem(last=False)
+    future.cancel()
+
+def adopt_speculation(query, speculative_query, video):
+  """Returns the speculative video when its query or its top hit matches the llm query, else None."""
+  if query_key(speculative_query) == query_key(query):
+    speculation_stats["same_query"] += 1
+    print(f"[SPEC] Using speculative result, same query as '{speculative_query}'")
+    return video
+  if video and title_matches(video.get('title'), query):
+    speculation_stats["title_match"] += 1
+    print(f"[SPEC] Using speculative result, top hit matches '{query}'")
+    return video
+  speculation_stats["discarded"] += 1
+  print(f"[SPEC] Discarded speculative result for '{speculative_query}'")
+  return None
+
+def speculative_video(query):
+  """
+  The first result for the llm query (None: the search found nothing) when a
+  speculative search was started for it, else NO_SPECULATION. When the
+  queries differ the real search starts at once and only waits for the
+  speculative one to see whether its top hit matches.
+  """
+  speculation = speculations.pop(query_key(query), None)
+  if speculation is None:
+    return NO_SPECULATION
+  speculative_query, future = speculation
+  search = None if query_key(speculative_query) == query_key(query) else _speculation_pool.submit(find_video, query)
+  try:
+    video = future.result()
+  except Exception:
+    if search is None:
+      # The same search failed on its own; the caller runs it again
+      return NO_SPECULATION
+    video = None
+  video = adopt_speculation(query, speculative_query, video)
+  if video is None and search is not None:
+    return search.result()
+  if search is not None:
+    search.cancel()
+  return video
+
+async def speculative_video_async(query):
+  speculation = speculations.pop(query_key(query), None)
+  if speculation is None:
+    return NO_SPECULATION
+  speculative_query, future = speculation
+  search = None if query_key(speculative_query) == query_key(query) else asyncio.ensure_future(find_video_async(query))
+  try:
+    video = await (asyncio.wrap_future(future) if isinstance(future, Future) else future)
+  except Exception:
+    if search is None:
+      return NO_SPECULATION
+    video = None
+  video = adopt_speculation(query, speculative_query, video)
+  if video is None and search is not None:
+    return await search
+  if search is not None:
+    search.cancel()
+  return video
+
+def get_youtube_link(state):
+  print("🔎 Starting YouTube search...")
+  query = state['youtube_query']
+  task_number = state['task_number']
+
+  print(f"🎬 Searching for: '{query}' (Task #{task_number + 1})")
+
+  video = speculative_video(query)
+  if video is NO_SPECULATION:
+    video = find_video(query)
+
+  return youtube_link_result(video, task_number)
+
+async def get_youtube_link_async(state):
+  print("🔎 Starting YouTube search...")
+  query = state['youtube_query']
+  task_number = state['task_number']
+
+  print(f"🎬 Searching for: '{query}' (Task #{task_number + 1})")
+
+  with network_timer():
+    video = await speculative_video_async(query)
+    if video is NO_SPECULATION:
+      video = await find_video_async(query)
+
+  return youtube_link_result(video, task_number)
@@ -1,53 +1,75 @@
-from langchain_groq import ChatGroq
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
-from typing import Literal
-from dotenv import load_dotenv
+from model.groq_model import register_chain
+from agent_tools.tracing import add_llm_time
+from agent_tools.get_youtube_link import should_speculate, start_speculation, start_speculation_async, keep_speculation
 
-load_dotenv()
+# Create output schema using Pydantic
+class YoutubeQueryOutput(BaseModel):
+    query: str = Field(description="""Return query for youtube search for getting desired youtube video.""")
 
-def get_youtube_query(state):
+YOUTUBE_QUERY_TEMPLATE = """You are a remote control agent. You are given a task to complete. Your task is to return a valid youtube query. this query will be used to search for the desired youtube video. dont use any other words in the query just simple search for getting desire youtube video. if there is any mention of movie then add full movie text in the query.
+        Here is the task:
+        {task} \n {format_instructions}
+        """
+
+# Prompt, parser and format instructions are built once and shared by every call
+query_chain = register_chain("get_youtube_query", YOUTUBE_QUERY_TEMPLATE, YoutubeQueryOutput, on_llm_time=add_llm_time)
+
+def start_youtube_query(state):
+    """Logs the task and returns the query the fused planner already wrote, if any."""
     print("[YT] Generating YouTube query from task...")
 
-    task = state['current_task']
     task_number = state['task_number']
 
-    print(f"[TASK] Task #{task_number + 1}: {task}")
+    print(f"[TASK] Task #{task_number + 1}: {state['current_task']}")
 
-    # Initialize the Groq model (use any model you prefer)
-    llm = ChatGroq(model="gemma2-9b-it")
+    # The fused planner may already have written the query
+    if state.get('youtube_query'):
+        print(f"🎯 YouTube Query from planner: {state['youtube_query']}")
+        print("✅ Query generation completed.\n")
+        return { 'youtube_query': state['youtube_query'], 'task_number': task_number + 1 }
 
-    # Create output schema using Pydantic
-    class YoutubeQueryOutput(BaseModel):
-        query: str = Field(description="""Return query for youtube search for getting desired youtube video.""")
+    return None
 
-    # Create output parser using PydanticOutputParser
-    query_output_parser = PydanticOutputParser(pydantic_object=YoutubeQueryOutput)
+def youtube_query_result(final_result, task_number):
+    print(f"🎯 YouTube Query: {final_result.query}")
+    print("✅ Query generation completed.\n")
 
-    # Create prompt template using PromptTemplate
-    template = PromptTemplate(
-        template="""You are a remote control agent. You are given a task to complete. Your task is to return a valid youtube query. this query will be used to search for the desired youtube video. dont use any other words in the query just simple search for getting desire youtube video. if there is any mention of movie then add full movie text in the query.
-        Here is the task:
-        {task} \n {format_instructions}
-        """,
-        input_variables=["task", "format_instructions"],
-        partial_variables={"format_instructions": query_output_parser.get_format_instructions()},
-    )
+    return { 'youtube_query': final_result.query, 'task_number': task_number + 1 }
 
-    # Create prompt
-    prompt = template.invoke({"task": task})
+def get_youtube_query(state):
+    prefilled = start_youtube_query(state)
+    if prefilled is not None:
+        return prefilled
 
-    # Get response from the llm
-    response = llm.invoke(prompt)
+    # Search the raw task while the llm rewrites it
+    speculation = start_speculation(state['current_task']) if should_speculate(state) else None
 
-    # Parse the response using the output parser
-    final_result = query_output_parser.parse(response.content)
+    # Get the parsed query from the shared llm chain
+    try:
+        final_result = query_chain.invoke(task=state['current_task'])
+    except Exception:
+        keep_speculation(speculation, None)
+        raise
+    keep_speculation(speculation, final_result.query)
 
-    print(f"🎯 YouTube Query: {final_result.query}")
-    print("✅ Query generation completed.\n")
+    return youtube_query_result(final_result, state['task_number'])
 
-    return { 'youtube_query': final_result.query, 'task_number': task_number + 1 }
+async def get_youtube_query_async(state):
+    prefilled = start_youtube_query(state)
+    if prefilled is not None:
+        return prefilled
+
+    speculation = start_speculation_async(state['current_task']) if should_speculate(state) else None
+
+    try:
+        final_result = await query_chain.ainvoke(task=state['current_task'])
+    except BaseException:
+        keep_speculation(speculation, None)
+        raise
+    keep_speculation(speculation, final_result.query)
+
+    return youtube_query_result(final_result, state['task_number'])
 
 # if __name__ == "__main__":
 #   r = get_key({"current_task": "make volume 0"})
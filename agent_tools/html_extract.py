@@ -0,0 +1,133 @@
+import re
+from html.parser import HTMLParser
+
+# Elements without an end tag; BeautifulSoup never puts them on its stack either
+VOID_ELEMENTS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "keygen",
+    "link", "menuitem", "meta", "param", "source", "track", "wbr",
+}
+
+# Elements whose text BeautifulSoup's .text leaves out of a link title (its
+# html.parser string containers); script and style are also CDATA to HTMLParser
+HIDDEN_TEXT_ELEMENTS = {"script", "style", "template", "rt", "rp"}
+
+# Where a stretch of a page that is only text to a parser starts, and how it
+# ends: comments, script and style bodies
+OPAQUE_START = re.compile(r"<!--|<(script|style)\b", flags=re.IGNORECASE)
+OPAQUE_END = {
+    None: re.compile(r"-->"),
+    "script": re.compile(r"</script", flags=re.IGNORECASE),
+    "style": re.compile(r"</style", flags=re.IGNORECASE),
+}
+
+
+def opaque_end(html, opening):
+    """Where the comment or script/style body opened by `opening` ends (the page end if never closed)."""
+    end = OPAQUE_END[opening.group(1) and opening.group(1).lower()].search(html, opening.end())
+    return end.end() if end else len(html)
+
+
+class StopParsing(Exception):
+    pass
+
+
+class LinkTextExtractor(HTMLParser):
+    """
+    Collects the text of every <a> with class `link_class` inside the first
+    <div id=`container_id`>, then stops.
+
+    Open tags are kept on a stack and an end tag closes everything up to the
+    most recent matching start tag, the way BeautifulSoup's html.parser tree
+    builder does, so the texts match soup.find(...).find_all('a', class_=...).
+    """
+
+    def __init__(self, container_id, link_class):
+        super().__init__(convert_charrefs=True)
+        self.container_id = container_id
+        self.link_class = link_class
+        self.found = False
+        # (tag, text buffer for an open link or None) from the container down
+        self.stack = []
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        if not self.stack:
+            if tag == "div" and dict(attrs).get("id") == self.container_id:
+                self.found = True
+                self.stack.append((tag, None))
+            return
+        if tag in VOID_ELEMENTS:
+            return
+
+        buffer = None
+        if tag == "a" and self.link_class in (dict(attrs).get("class") or "").split():
+            buffer = []
+            self.links.append(buffer)
+        self.stack.append((tag, buffer))
+
+    def handle_startendtag(self, tag, attrs):
+        # <br/> and friends hold no text
+        if self.stack and tag not in VOID_ELEMENTS:
+            self.handle_starttag(tag, attrs)
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if not self.stack:
+            return
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i][0] == tag:
+                del self.stack[i:]
+                break
+        if not self.stack:
+            raise StopParsing()
+
+    def handle_data(self, data):
+        if self.cdata_elem or any(tag in HIDDEN_TEXT_ELEMENTS for tag, _ in self.stack):
+            return
+        for _, buffer in self.stack:
+            if buffer is not None:
+                buffer.append(data)
+
+
+def container_start(html, container_id):
+    """
+    Where the start tag of div#`container_id` is in the page, or None.
+
+    Candidates inside a comment or a script or style body are text to a
+    parser, not tags, so the search moves past those stretches.
+    """
+    candidate = re.compile(rf"<div\b[^>]*\bid\s*=\s*[\"']?{re.escape(container_id)}\b", flags=re.IGNORECASE)
+    cursor = 0
+    while True:
+        start = candidate.search(html, cursor)
+        if start is None:
+            return None
+        opening = OPAQUE_START.search(html, cursor, start.start())
+        if opening is None:
+            return start.start()
+        cursor = opaque_end(html, opening)
+
+
+def extract_link_texts(html, container_id, link_class):
+    """
+    Returns the stripped texts of the `link_class` links inside
+    div#`container_id`, or None when the page has no such div.
+
+    Parsing starts at the div's start tag and ends at its end tag, so the
+    rest of the page is never tokenized. HTMLParser checks that the start
+    tag found really is the div before anything is collected.
+    """
+    start = container_start(html, container_id)
+    if start is None:
+        return None
+
+    parser = LinkTextExtractor(container_id, link_class)
+    try:
+        parser.feed(html[start:])
+        parser.close()
+    except StopParsing:
+        pass
+
+    if not parser.found:
+        return None
+    return ["".join(buffer).strip() for buffer in parser.links]
@@ -0,0 +1,27 @@
+import asyncio
+import weakref
+import httpx
+
+# One keep-alive pool shared by every async node (bridge, movie-map, ...)
+HTTP_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60)
+HTTP_TIMEOUT = httpx.Timeout(10.0, connect=3.0)
+
+# httpx pools are bound to the loop that opened them, so keep one client per loop
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    """Returns the pooled AsyncClient of the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT, follow_redirects=True)
+        _clients[loop] = client
+    return client
+
+
+async def close_async_client():
+    """Closes the running loop's client; call it before the loop shuts down."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,187 @@
+import json
+import os
+import re
+from typing import get_args
+from agent_tools.get_key import KeyCode
+from agent_tools.key_macro import macro_update, describe_macro
+from agent_tools.devices import split_targets
+
+TOOLS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools.json")
+
+# Extra ways people say each key, on top of the names in tools.json
+KEY_ALIASES = {
+    "KEYCODE_DPAD_UP": ["up", "move up", "go up", "arrow up", "up arrow"],
+    "KEYCODE_DPAD_DOWN": ["down", "move down", "go down", "arrow down", "down arrow"],
+    "KEYCODE_DPAD_LEFT": ["left", "move left", "go left", "arrow left", "left arrow"],
+    "KEYCODE_DPAD_RIGHT": ["right", "move right", "go right", "arrow right", "right arrow"],
+    "KEYCODE_DPAD_CENTER": ["select", "ok", "okay", "enter", "center", "confirm", "click"],
+    "KEYCODE_MEDIA_PLAY_PAUSE": ["play", "pause", "play pause", "resume", "stop", "play/pause"],
+    "KEYCODE_HOME": ["home", "go home", "home screen", "go to home", "go to home screen"],
+    "KEYCODE_BACK": ["back", "go back"],
+    "KEYCODE_POWER": ["power", "turn off", "turn on", "switch off", "switch on", "power off", "power on",
+                      "turn off the tv", "turn on the tv", "turn the tv off", "turn the tv on"],
+    "KEYCODE_MUTE": ["mute", "unmute", "volume 0", "volume zero", "mute the tv", "unmute the tv"],
+    "KEYCODE_VOLUME_UP": ["volume up", "increase volume", "increase the volume", "raise volume", "raise the volume",
+                          "turn up the volume", "turn the volume up", "louder", "volume plus"],
+    "KEYCODE_VOLUME_DOWN": ["volume down", "decrease volume", "decrease the volume", "lower volume", "lower the volume",
+                            "reduce volume", "reduce the volume", "turn down the volume", "turn the volume down",
+                            "quieter", "volume minus"],
+}
+
+NUMBERS = {
+    "once": 1, "twice": 2, "thrice": 3,
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+
+# Upper bound for a locally parsed repeat, anything above goes to the llm
+MAX_REPEAT = 50
+
+COUNT = r"(?P<count>\d+|" + "|".join(NUMBERS) + r")"
+REPEAT = rf"(?:\s+(?:by\s+)?{COUNT}(?:\s*(?:times|time|x|steps|step))?)?"
+PREFIX = r"(?:(?:please|can you|could you|just)\s+)?(?:(?:press|hit|push|tap)\s+(?:the\s+)?)?"
+SUFFIX = r"(?:\s+(?:button|key))?"
+
+# Separators between the steps of a key sequence ("go right twice, down once, then select")
+STEP_SPLIT = re.compile(r"\s*(?:,|;|\band then\b|\bthen\b|\band\b)\s*")
+WAIT = re.compile(rf"^(?:wait|pause)(?:\s+for)?\s+{COUNT}\s*(?P<unit>seconds|second|secs|sec|s|milliseconds|ms)$")
+
+# Longer sequences go to the llm
+MAX_MACRO_STEPS = 10
+
+
+def load_key_phrases(path=TOOLS_PATH):
+    """
+    Collects the phrases for every key code in the SendKeyOutput literal set.
+
+    Names come from keys_code_map in tools.json ("key volume up" -> "volume up")
+    and from KEY_ALIASES.
+    """
+    with open(path) as f:
+        keys_code_map = json.load(f)["keys_code_map"]
+
+    key_codes = set(get_args(KeyCode))
+    phrases = {}
+    for name, code in keys_code_map.items():
+        key_code = f"KEYCODE_{code}"
+        if key_code not in key_codes:
+            continue
+        phrase = re.sub(r"^key\s+|\s+code$", "", name).replace("media ", "")
+        phrases.setdefault(key_code, set()).add(phrase)
+
+    for key_code, aliases in KEY_ALIASES.items():
+        if key_code in key_codes:
+            phrases.setdefault(key_code, set()).update(aliases)
+
+    return phrases
+
+
+def compile_key_table(phrases):
+    """Builds one anchored regex per key code; longer phrases are tried first."""
+    table = []
+    for key_code, names in phrases.items():
+        alternatives = "|".join(re.escape(name) for name in sorted(names, key=len, reverse=True))
+        pattern = re.compile(rf"^{PREFIX}(?:{alternatives}){SUFFIX}{REPEAT}$")
+        table.append((key_code, pattern))
+    return table
+
+
+KEY_TABLE = compile_key_table(load_key_phrases())
+
+# Traffic counters, reported after every routed command
+router_stats = {"commands": 0, "fast_path": 0}
+
+
+def normalize_command(task):
+    task = task.lower().strip()
+    task = re.sub(r"[^\w\s/]", " ", task)
+    return re.sub(r"\s+", " ", task).strip()
+
+
+def parse_key_command(task):
+    """
+    Parses a plain remote command into (key_code, repeat).
+
+    Returns None when the task is anything more than a key press, so the
+    caller can fall back to the llm planner.
+    """
+    command = normalize_command(task)
+    for key_code, pattern in KEY_TABLE:
+        match = pattern.match(command)
+        if not match:
+            continue
+
+        count = match.group("count")
+        if count is None:
+            return key_code, 1
+
+        repeat = int(count) if count.isdigit() else NUMBERS[count]
+        if 1 <= repeat <= MAX_REPEAT:
+            return key_code, repeat
+        return None
+    return None
+
+
+def parse_key_macro(task):
+    """
+    Parses a key press or a sequence of them into macro steps.
+
+    "wait 2 seconds" between presses becomes the pause after the previous
+    step. Returns None as soon as one part is not a plain key press.
+    """
+    parts = [part for part in STEP_SPLIT.split(task.lower().strip()) if part.strip()]
+    if not parts or len(parts) > MAX_MACRO_STEPS:
+        return None
+
+    steps = []
+    for part in parts:
+        wait = WAIT.match(normalize_command(part))
+        if wait and steps:
+            count = wait.group("count")
+            amount = int(count) if count.isdigit() else NUMBERS[count]
+            steps[-1]['delay_ms'] = amount if wait.group("unit") in ("ms", "milliseconds") else amount * 1000
+            continue
+
+        parsed = parse_key_command(part)
+        if parsed is None:
+            return None
+        key_code, repeat = parsed
+        steps.append({ 'command': key_code, 'repeat': repeat, 'delay_ms': None })
+
+    return steps or None
+
+
+def skipped_llm_share():
+    if not router_stats["commands"]:
+        return 0.0
+    return router_stats["fast_path"] / router_stats["commands"]
+
+
+def intent_router(state):
+
+    print("[ROUTE] Checking for a direct remote command...")
+
+    # "mute all" / "play friends in the bedroom": the target is not part of what to do
+    task, targets = split_targets(state['current_task'], is_key_command=lambda rest: parse_key_macro(rest) is not None)
+    update = { 'current_task': task, 'target_devices': targets } if targets else {}
+    if targets:
+        print(f"[ROUTE] Target devices : {', '.join(targets)}")
+
+    steps = parse_key_macro(task)
+
+    router_stats["commands"] += 1
+    if steps is None:
+        print(f"[ROUTE] No direct match, handing over to planner. | skipped llm : {skipped_llm_share():.0%} of commands\n")
+        return update
+
+    router_stats["fast_path"] += 1
+
+    print(f"[FAST] Direct key command. | key_macro : {describe_macro(steps)}")
+    print(f"[ROUTE] Skipped llm for {router_stats['fast_path']}/{router_stats['commands']} commands ({skipped_llm_share():.0%})\n")
+
+    return { **update, 'edges': ['send_code'], **macro_update(steps), 'task_number': 0 }
+
+
+async def intent_router_async(state):
+    # Pure regex matching, nothing to await
+    return intent_router(state)
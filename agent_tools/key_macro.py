@@ -0,0 +1,93 @@
+import os
+import threading
+
+# Pacer bounds: gap between presses = PACER_GAIN x smoothed bridge ack time, within these limits
+MIN_KEY_GAP_MS = int(os.getenv("MIN_KEY_GAP_MS", "40"))
+PACER_GAIN = float(os.getenv("PACER_GAIN", "1.5"))
+
+
+def macro_from_state(state):
+    """
+    Returns the key macro of a command as a list of steps
+    {"command": KEYCODE_*, "repeat": n, "delay_ms": pause after the step or None}.
+
+    Plans from before macros (or a single prefilled key) become a one-step macro.
+    """
+    if state.get('key_macro'):
+        return [
+            { 'command': step['command'], 'repeat': step.get('repeat') or 1, 'delay_ms': step.get('delay_ms') }
+            for step in state['key_macro']
+        ]
+    return [{ 'command': state['current_task_command'], 'repeat': state.get('repeat') or 1, 'delay_ms': None }]
+
+
+def macro_update(steps):
+    """State update for a macro; current_task_command/repeat mirror the first step for older readers."""
+    steps = [step.model_dump() if hasattr(step, "model_dump") else dict(step) for step in steps]
+    return { 'key_macro': steps, 'current_task_command': steps[0]['command'], 'repeat': steps[0]['repeat'] }
+
+
+def describe_macro(steps):
+    parts = []
+    for step in steps:
+        part = step['command'] if step['repeat'] == 1 else f"{step['command']} x{step['repeat']}"
+        if step.get('delay_ms'):
+            part += f" (wait {step['delay_ms']} ms)"
+        parts.append(part)
+    return " -> ".join(parts)
+
+
+def expand_macro(steps):
+    """
+    Flattens a macro into presses (keycode, delay_ms after the press).
+
+    delay_ms is only set after the last press of a step that asked for a
+    pause; every other gap is left to the pacer.
+    """
+    presses = []
+    for step in steps:
+        for i in range(step['repeat']):
+            last = i == step['repeat'] - 1
+            presses.append((step['command'], step.get('delay_ms') if last else None))
+    return presses
+
+
+class KeyPacer:
+    """
+    Picks the gap between key presses from the bridge's acknowledgements.
+
+    Ack times are smoothed like TCP's SRTT (EWMA with weight `alpha`); the gap
+    is PACER_GAIN times that, kept between min_ms and max_ms. Until the first
+    ack arrives the gap is initial_ms.
+    """
+
+    def __init__(self, initial_ms, max_ms, min_ms=MIN_KEY_GAP_MS, gain=PACER_GAIN, alpha=0.25):
+        self.initial_ms = initial_ms
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+        self.gain = gain
+        self.alpha = alpha
+        self.srtt_ms = None
+        self.samples = 0
+        self.lock = threading.Lock()
+
+    def observe(self, ack_ms):
+        with self.lock:
+            self.samples += 1
+            if self.srtt_ms is None:
+                self.srtt_ms = ack_ms
+            else:
+                self.srtt_ms += self.alpha * (ack_ms - self.srtt_ms)
+
+    def observe_batch(self, ack_ms, presses, waited_ms):
+        """Feeds a /send-keys ack: the batch time minus the pauses the bridge was asked for, per press."""
+        if presses:
+            self.observe(max(0.0, ack_ms - waited_ms) / presses)
+
+    def gap_ms(self):
+        with self.lock:
+            if self.srtt_ms is None:
+                gap = self.initial_ms
+            else:
+                gap = self.gain * self.srtt_ms
+        return min(self.max_ms, max(self.min_ms, gap))
@@ -0,0 +1,133 @@
+import os
+import re
+from agent_tools.cache import CACHE_DIR, TTLCache, SqliteTTLStore
+
+PLAN_CACHE_TTL = int(os.getenv("PLAN_CACHE_TTL", 7 * 24 * 3600))
+PLAN_CACHE_SIZE = int(os.getenv("PLAN_CACHE_SIZE", 512))
+
+# Words that decide the plan. Every other run of words is treated as a title
+# slot, so "watch stranger things" and "watch the office" share one entry.
+COMMAND_WORDS = {
+    # filler
+    "i", "want", "wanna", "would", "like", "to", "please", "can", "you", "me", "my",
+    "a", "an", "and", "then", "by", "of", "for", "with", "from", "in", "is", "it",
+    # remote keys
+    "volume", "sound", "up", "down", "left", "right", "increase", "decrease", "raise",
+    "lower", "louder", "quieter", "mute", "unmute", "home", "back", "power", "turn",
+    "on", "off", "pause", "resume", "stop", "select", "ok", "enter", "press", "button",
+    "key", "go", "move", "times", "time", "once", "twice", "thrice", "step", "steps",
+    # media
+    "watch", "play", "open", "launch", "start", "show", "shows", "tv", "series",
+    "movie", "movies", "film", "films", "song", "songs", "music", "video", "videos",
+    "trailer", "trailers", "youtube", "latest", "new", "episode", "season",
+    "similar", "same", "recommend", "recommendations", "suggest", "something",
+    "where", "available", "platform", "stream", "find", "search", "some",
+}
+
+NUMBER_WORDS = {
+    "zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+    "eleven", "twelve", "fifteen", "twenty",
+}
+
+NUMBER_SLOT = "<n>"
+TITLE_SLOT = "<title>"
+
+# Which pipeline a title goes to is the planner's call ("play despacito" is a
+# song, "play stranger things" a show), so a plan for a command with a title
+# in it is only reused when the command itself names the pipeline. The first
+# tool of these found in a plan decides which words pin it.
+PLAN_PIN_WORDS = [
+    ("get_recommendations", {"similar", "same", "recommend", "recommendations", "suggest"}),
+    ("get_youtube_query", {"youtube", "song", "songs", "music", "video", "videos", "trailer", "trailers"}),
+    ("set_show_name", {"watch", "show", "shows", "series", "movie", "movies", "film", "films", "episode", "season"}),
+    ("get_key", {"press", "button", "key", "volume", "sound", "mute", "unmute", "louder", "quieter"}),
+]
+
+
+def normalize_task(task):
+    """
+    Turns a user task into a plan cache key.
+
+    Lowercases, strips punctuation, collapses whitespace and replaces numbers
+    and title words with slots: "Volume up 3 times" -> "volume up <n> times".
+    """
+    words = re.sub(r"[^\w\s']", " ", task.lower()).split()
+
+    slotted = []
+    for word in words:
+        if word.isdigit() or word in NUMBER_WORDS:
+            token = NUMBER_SLOT
+        elif word in COMMAND_WORDS:
+            token = word
+        else:
+            token = TITLE_SLOT
+
+        # a multi-word title collapses into a single slot
+        if token == TITLE_SLOT and slotted and slotted[-1] == TITLE_SLOT:
+            continue
+        slotted.append(token)
+
+    return " ".join(slotted)
+
+
+def plan_is_pinned(key, edges):
+    """True when every task with this key gets the same plan, whatever its title."""
+    words = set(key.split())
+    if TITLE_SLOT not in words:
+        return True
+    for tool, pin_words in PLAN_PIN_WORDS:
+        if tool in edges:
+            return bool(words & pin_words)
+    return False
+
+
+class PlanCache:
+    """
+    Two-level cache of planner edges: an in-memory LRU in front of a SQLite
+    store that survives restarts.
+    """
+
+    def __init__(self, path=os.path.join(CACHE_DIR, "plans.sqlite"), max_entries=PLAN_CACHE_SIZE, ttl=PLAN_CACHE_TTL):
+        self.memory = TTLCache(max_entries=max_entries, ttl=ttl)
+        self.disk = SqliteTTLStore(path, max_entries=max_entries * 4, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, task):
+        key = normalize_task(task)
+
+        edges = self.memory.get(key)
+        if edges is None:
+            edges = self.disk.get(key)
+            if edges is not None:
+                self.memory.set(key, edges)
+
+        # Entries stored before a key had to pin its plan are not trusted either
+        if edges is None or not plan_is_pinned(key, edges):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return list(edges)
+
+    def set(self, task, edges):
+        key = normalize_task(task)
+        edges = list(edges)
+        if not plan_is_pinned(key, edges):
+            return
+        self.memory.set(key, edges)
+        self.disk.set(key, edges)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats(),
+        }
+
+
+# Process-wide cache used by the planner node
+plan_cache = PlanCache()
@@ -0,0 +1,114 @@
+import os
+
+# Set PARALLEL_PLAN=0 to run every plan strictly step by step
+PARALLEL_PLAN = os.getenv("PARALLEL_PLAN", "1") != "0"
+
+# State keys each node reads and writes. Dependencies between plan steps are
+# derived from these, so the planner keeps returning a flat list of edges.
+NODE_IO = {
+    "get_key": ({"current_task", "current_task_command", "key_macro"}, {"current_task_command", "repeat", "key_macro"}),
+    "set_show_name": ({"current_task", "show_name"}, {"show_name", "target_show_name"}),
+    "send_code": ({"current_task_command", "repeat", "key_macro", "target_devices"}, {"status", "device_results"}),
+    "get_youtube_query": ({"current_task", "youtube_query"}, {"youtube_query"}),
+    "get_youtube_link": ({"youtube_query"}, {"app_link"}),
+    "send_link": ({"app_link", "target_devices"}, {"status", "device_results"}),
+    "get_platform": ({"target_show_name", "recommendations"}, {"platform_info", "app_link", "playing_title"}),
+    "get_recommendations": ({"show_name"}, {"recommendations", "target_show_name"}),
+}
+
+# Nodes that act on the TV always run in plan order
+SIDE_EFFECT_NODES = {"send_code", "send_link"}
+
+
+def dead_writes(edges, j):
+    """
+    Keys step j writes that a later step overwrites before any step reads
+    them, e.g. the app_link of get_platform in a plan that goes on to
+    get_youtube_link and send_link. The graph drops them from j's update, so
+    the two writers do not have to run one after the other.
+    """
+    dead = set()
+    for key in NODE_IO.get(edges[j], (set(), set()))[1]:
+        for node in edges[j + 1:]:
+            if node not in NODE_IO or key in NODE_IO[node][0]:
+                break
+            if key in NODE_IO[node][1]:
+                dead.add(key)
+                break
+    return dead
+
+
+def live_update(state, node, update):
+    """A plan step's update without its dead writes; `node` runs as one of the pending steps."""
+    edges = state.get('edges') or []
+    for j in state.get('pending_steps') or []:
+        if edges[j] == node:
+            dead = dead_writes(edges, j)
+            if dead and update:
+                return {key: value for key, value in update.items() if key not in dead}
+            break
+    return update
+
+
+def step_dependencies(edges):
+    """
+    Returns (after, not_before) for every step of a plan.
+
+    after[j]      steps that must finish before step j starts: j reads what
+                  they write, both write the same key, or both drive the TV.
+                  Dead writes (see dead_writes) do not count.
+    not_before[j] steps j must not overtake because they read a key j
+                  overwrites; j may still run in the same batch, since every
+                  node in a batch sees the state from before the batch.
+    """
+    after, not_before = [], []
+    for j, node in enumerate(edges):
+        reads_j, writes_j = NODE_IO.get(node, (set(), set()))
+        hard, soft = set(), set()
+        for i in range(j):
+            reads_i, writes_i = NODE_IO.get(edges[i], (set(), set()))
+            writes_i = writes_i - dead_writes(edges, i)
+            if edges[i] not in NODE_IO or node not in NODE_IO:
+                hard.add(i)
+            elif writes_i & reads_j or writes_i & writes_j:
+                hard.add(i)
+            elif edges[i] in SIDE_EFFECT_NODES and node in SIDE_EFFECT_NODES:
+                hard.add(i)
+            elif reads_i & writes_j:
+                soft.add(i)
+        after.append(hard)
+        not_before.append(soft)
+    return after, not_before
+
+
+def ready_steps(edges, done, parallel=None):
+    """
+    Returns the indexes of the plan steps that can start now.
+
+    With parallel off only the next unfinished step is returned, which is the
+    original linear behaviour.
+    """
+    parallel = PARALLEL_PLAN if parallel is None else parallel
+    done = set(done)
+
+    if not parallel:
+        return [j for j in range(len(edges)) if j not in done][:1]
+
+    after, not_before = step_dependencies(edges)
+    ready = []
+    for j in range(len(edges)):
+        if j in done:
+            continue
+        if after[j] <= done and not_before[j] <= done | set(ready):
+            ready.append(j)
+    return ready
+
+
+def plan_levels(edges):
+    """Groups a plan into the batches the graph runs one after another."""
+    levels, done = [], []
+    while len(done) < len(edges):
+        batch = ready_steps(edges, done, parallel=True)
+        levels.append([edges[j] for j in batch])
+        done += batch
+    return levels
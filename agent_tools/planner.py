@@ -1,31 +1,39 @@
-from langchain_groq import ChatGroq
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
+import asyncio
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from pydantic import BaseModel, Field
-from typing import Literal, List
-from dotenv import load_dotenv
+from typing import Literal, List, Optional
+from model.groq_model import register_chain
+from agent_tools.tracing import add_llm_time
+from agent_tools.plan_cache import plan_cache
+from agent_tools.get_key import KeyStep, get_key, get_key_async
+from agent_tools.key_macro import macro_update
+from agent_tools.set_show import setShowName, setShowNameAsync
+from agent_tools.get_youtube_query import get_youtube_query, get_youtube_query_async
 
-load_dotenv()
+# Set PLAN_CACHE=0 to always ask the llm for a fresh plan
+PLAN_CACHE_ENABLED = os.getenv("PLAN_CACHE", "1") != "0"
 
-def planner(state):
-
-    print("[PLAN] Starting task planning...")
+# Set FUSED_PLANNER=1 to plan and extract every slot in a single llm call
+FUSED_PLANNER = os.getenv("FUSED_PLANNER", "0") == "1"
 
-    task = state['current_task']
+# Set STREAMING_PLANNER=1 to start the first step while the plan is still streaming
+STREAMING_PLANNER = os.getenv("STREAMING_PLANNER", "0") == "1"
 
-    # Initialize the Groq model (use any model you prefer)
-    llm = ChatGroq(model="gemma2-9b-it")
+Edge = Literal["get_key", "send_code", "get_youtube_query", "get_youtube_link", "send_link", "get_platform", "get_recommendations", "set_show_name"]
 
-    # Create output schema using Pydantic
-    class PlannerState(BaseModel):
-        edges: List[Literal["get_key", "send_code", "get_youtube_query", "get_youtube_link", "send_link", "get_platform", "get_recommendations", "set_show_name"]] = Field(description="""The list of edges in the graph this list is sequetion execution of the agent""")
+# Create output schema using Pydantic
+class PlannerState(BaseModel):
+    edges: List[Edge] = Field(description="""The list of edges in the graph this list is sequetion execution of the agent""")
 
-    # Create output parser using PydanticOutputParser
-    plan_output_parser = PydanticOutputParser(pydantic_object=PlannerState)
+class FusedPlannerState(BaseModel):
+    edges: List[Edge] = Field(description="""The list of edges in the graph this list is sequetion execution of the agent""")
+    key_macro: Optional[List[KeyStep]] = Field(default=None, description="""Keys to press in order, only when the plan uses get_key""")
+    show_name: Optional[str] = Field(default=None, description="""Movie or TV show name from the task, only when the plan uses set_show_name""")
+    youtube_query: Optional[str] = Field(default=None, description="""Query for youtube search, only when the plan uses get_youtube_query. if there is any mention of movie then add full movie text in the query""")
 
-    # Create prompt template using PromptTemplate
-    template = PromptTemplate(
-        template="""You are a goal oriented remote control agent. Your task is to create a function plans that will help you to achieve your goal. you have access to the following tools:
+PLANNER_TOOLS = """You are a goal oriented remote control agent. Your task is to create a function plans that will help you to achieve your goal. you have access to the following tools:
         for getting key code to controll remote keys = "get_key" (volume up, volume down, volume 0, mute, play/pause, home, back, power)
         for sending key code to controll remote keys = "send_code" (send key code to the device)
         for getting youtube query for searching youtube videos = "get_youtube_query" (use this when user need to listen song, view specefic video, if movie they specific say view movie on youtube or any other video those not available on ott platforms then use this tool)
@@ -45,28 +53,239 @@ def planner(state):
         user goal is to press some button or key or send command = ["get_key", "send_code"]
         user goal is watch perticular movie or tv show = ["set_show_name", "get_platform", "send_link"]
         user goal is watch movie trailer = ["get_youtube_query", "get_youtube_link", "send_link"]
+        user goal is to know where a movie or tv show is available and what is similar to it = ["set_show_name", "get_platform", "get_recommendations"]
+"""
+
+PLANNER_TEMPLATE = PLANNER_TOOLS + """
+        {task} \n {format_instructions}
+        """
+
+FUSED_PLANNER_TEMPLATE = PLANNER_TOOLS + """
+        along with the plan also fill the values the planned tools would extract, leave the others empty:
+        if the plan uses "get_key" return key_macro, the keys to press in order with their repeat
+        if the plan uses "set_show_name" return show_name
+        if the plan uses "get_youtube_query" return youtube_query
 
         {task} \n {format_instructions}
-        """,
-        input_variables=["task", "format_instructions"],
-        partial_variables={"format_instructions": plan_output_parser.get_format_instructions()},
-    )
+        """
+
+# Slots filled by the fused planner and the node that would otherwise extract them
+FUSED_SLOTS = {
+    "get_key": ("key_macro",),
+    "set_show_name": ("show_name",),
+    "get_youtube_query": ("youtube_query",),
+}
+
+# First steps that only read current_task, so they can start before the plan is complete
+PREFETCH_NODES = {
+    "get_key": get_key,
+    "set_show_name": setShowName,
+    "get_youtube_query": get_youtube_query,
+}
+
+PREFETCH_NODES_ASYNC = {
+    "get_key": get_key_async,
+    "set_show_name": setShowNameAsync,
+    "get_youtube_query": get_youtube_query_async,
+}
+
+prefetch_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="plan-prefetch")
+
+# Prompt, parser and format instructions are built once and shared by every call
+plan_chain = register_chain("planner", PLANNER_TEMPLATE, PlannerState, on_llm_time=add_llm_time)
+fused_plan_chain = register_chain("fused_planner", FUSED_PLANNER_TEMPLATE, FusedPlannerState, on_llm_time=add_llm_time)
+
+add_arrow = lambda lst: " -> ".join(lst)
+
+def cached_plan(task):
+    """Returns the planner output for a task planned before, or None."""
 
-    # Create prompt
-    prompt = template.invoke({"task": task})
+    # Commands we have planned before skip the llm round trip
+    if not PLAN_CACHE_ENABLED:
+        return None
 
-    # Get response from the llm
-    response = llm.invoke(prompt)
+    edges = plan_cache.get(task)
+    if edges is None:
+        return None
 
-    # Parse the response using the output parser
-    final_result = plan_output_parser.parse(response.content)
+    print(f"[CACHE] Plan cache hit | hits : {plan_cache.hits} | misses : {plan_cache.misses}")
+    print(f"[SEQ] Planned Tool Sequence: {add_arrow(edges)}")
+    print("[DONE] Planning completed.\n")
+    return { 'edges': edges }
+
+def plan_result(task, final_result, first_step):
 
-    add_arrow = lambda lst: " -> ".join(lst)
+    if PLAN_CACHE_ENABLED and final_result.edges:
+        plan_cache.set(task, final_result.edges)
 
     print(f"[SEQ] Planned Tool Sequence: {add_arrow(final_result.edges)}")
+
+    result = { 'edges': final_result.edges }
+    if FUSED_PLANNER:
+        result.update(fused_slots(final_result))
+        print(f"[SLOT] Extracted with plan: {', '.join(f'{k} : {v}' for k, v in result.items() if k != 'edges') or 'none'}")
+
+    # The first step already ran while streaming, the graph continues from the second one
+    result.update(first_step)
+
     print("[DONE] Planning completed.\n")
 
-    return { 'edges': final_result.edges }
+    return result
+
+def planner(state):
+
+    print("[PLAN] Starting task planning...")
+
+    task = state['current_task']
+
+    cached = cached_plan(task)
+    if cached is not None:
+        return cached
+
+    # Get the parsed plan from the shared llm chain
+    first_step = {}
+    if FUSED_PLANNER:
+        final_result = fused_plan_chain.invoke(task=task)
+    elif STREAMING_PLANNER:
+        final_result, first_step = stream_plan(state)
+    else:
+        final_result = plan_chain.invoke(task=task)
+
+    return plan_result(task, final_result, first_step)
+
+async def planner_async(state):
+
+    print("[PLAN] Starting task planning...")
+
+    task = state['current_task']
+
+    cached = cached_plan(task)
+    if cached is not None:
+        return cached
+
+    first_step = {}
+    if FUSED_PLANNER:
+        final_result = await fused_plan_chain.ainvoke(task=task)
+    elif STREAMING_PLANNER:
+        final_result, first_step = await stream_plan_async(state)
+    else:
+        final_result = await plan_chain.ainvoke(task=task)
+
+    return plan_result(task, final_result, first_step)
+
+def fused_slots(final_result):
+    """Returns the slots the planned nodes consume, so those nodes skip their own llm call."""
+    slots = {}
+    for edge, keys in FUSED_SLOTS.items():
+        if edge not in final_result.edges:
+            continue
+        values = {key: getattr(final_result, key) for key in keys}
+        if not all(value not in (None, "", []) for value in values.values()):
+            continue
+        if edge == "get_key":
+            # current_task_command / repeat mirror the first step
+            slots.update(macro_update(values["key_macro"]))
+        else:
+            slots.update(values)
+    return slots
+
+class EdgeStreamParser:
+    """Pulls complete edge names out of a partially streamed {"edges": [...]} completion."""
+
+    EDGES_START = re.compile(r'"edges"\s*:\s*\[')
+    EDGE = re.compile(r'\s*,?\s*"(\w+)"')
+
+    def __init__(self):
+        self.buffer = ""
+        self.edges = []
+        self._pos = None
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        if self._pos is None:
+            match = self.EDGES_START.search(self.buffer)
+            if not match:
+                return self.edges
+            self._pos = match.end()
+
+        # Only fully quoted names count, a half streamed "get_k is left for the next chunk
+        while (match := self.EDGE.match(self.buffer, self._pos)):
+            self.edges.append(match.group(1))
+            self._pos = match.end()
+        return self.edges
+
+def stream_plan(state):
+    """
+    Streams the plan and starts its first step as soon as that edge is parsed.
+
+    Returns the parsed plan and the first step's output, or {} when the first
+    step could not be started early (or the final plan disagrees with it).
+    """
+    edge_parser = EdgeStreamParser()
+    chunks = []
+    first_edge, future = None, None
+
+    try:
+        for chunk in plan_chain.stream(task=state['current_task']):
+            chunks.append(chunk)
+            edges = edge_parser.feed(chunk)
+            if first_edge is None and edges:
+                first_edge = edges[0]
+                if first_edge in PREFETCH_NODES:
+                    print(f"[STREAM] First step '{first_edge}' known, starting it while the plan streams...")
+                    future = prefetch_pool.submit(PREFETCH_NODES[first_edge], {**state, 'task_number': 0})
+
+        final_result = plan_chain.parser.parse("".join(chunks))
+    except BaseException:
+        # No plan to hand the early step to; don't let it run on
+        if future is not None:
+            future.cancel()
+        raise
+
+    if future is None:
+        return final_result, {}
+
+    if final_result.edges[:1] != [first_edge]:
+        print(f"[STREAM] Final plan does not start with '{first_edge}', discarding early result.")
+        future.cancel()
+        return final_result, {}
+
+    return final_result, future.result()
+
+async def stream_plan_async(state):
+    """stream_plan for the async graph: the first step runs as a task on the same loop."""
+    edge_parser = EdgeStreamParser()
+    chunks = []
+    first_edge, early_step = None, None
+
+    try:
+        async for chunk in plan_chain.astream(task=state['current_task']):
+            chunks.append(chunk)
+            edges = edge_parser.feed(chunk)
+            if first_edge is None and edges:
+                first_edge = edges[0]
+                if first_edge in PREFETCH_NODES_ASYNC:
+                    print(f"[STREAM] First step '{first_edge}' known, starting it while the plan streams...")
+                    early_step = asyncio.create_task(PREFETCH_NODES_ASYNC[first_edge]({**state, 'task_number': 0}))
+
+        final_result = plan_chain.parser.parse("".join(chunks))
+    except BaseException:
+        # No plan to hand the early step to: stop its llm call, and a failure
+        # it already had must not log "exception was never retrieved"
+        if early_step is not None:
+            early_step.cancel()
+            early_step.add_done_callback(lambda task: task.cancelled() or task.exception())
+        raise
+
+    if early_step is None:
+        return final_result, {}
+
+    if final_result.edges[:1] != [first_edge]:
+        print(f"[STREAM] Final plan does not start with '{first_edge}', discarding early result.")
+        early_step.cancel()
+        return final_result, {}
+
+    return final_result, await early_step
 
 # if __name__ == "__main__":
 #   r = planner({"current_task": "i want to watch war 2 like movie"})
@@ -0,0 +1,69 @@
+import json
+import os
+import re
+import unicodedata
+from agent_tools.cache import CACHE_DIR, SqliteTTLStore
+
+# Streaming catalogues change, so entries expire after a day by default
+PLATFORM_CACHE_TTL = int(os.getenv("PLATFORM_CACHE_TTL", 24 * 3600))
+# Titles JustWatch had nothing for are retried sooner
+PLATFORM_CACHE_EMPTY_TTL = int(os.getenv("PLATFORM_CACHE_EMPTY_TTL", 3600))
+PLATFORM_CACHE_SIZE = int(os.getenv("PLATFORM_CACHE_SIZE", 2000))
+
+
+def normalize_title(title):
+    """Casefolds and strips punctuation: "Stranger Things!" -> "stranger things"."""
+    title = unicodedata.normalize("NFKC", title).casefold()
+    title = re.sub(r"[^\w\s]", " ", title)
+    return re.sub(r"\s+", " ", title).strip()
+
+
+def platform_key(title, country, language, count):
+    return json.dumps([normalize_title(title), country, language, count])
+
+
+class PlatformCache:
+    """
+    Projected JustWatch results (platform_info) by (title, country, language, count),
+    in a SQLite store that survives restarts.
+
+    Every entry remembers how long the live search took, so a hit can report
+    the latency it saved.
+    """
+
+    def __init__(self, path=os.path.join(CACHE_DIR, "justwatch.sqlite"), max_entries=PLATFORM_CACHE_SIZE, ttl=PLATFORM_CACHE_TTL):
+        self.store = SqliteTTLStore(path, max_entries=max_entries, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+
+    def get(self, title, country, language, count):
+        entry = self.store.get(platform_key(title, country, language, count))
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.saved_ms += entry["fetch_ms"]
+        return entry["platform_info"]
+
+    def set(self, title, country, language, count, platform_info, fetch_ms):
+        self.store.set(
+            platform_key(title, country, language, count),
+            {"platform_info": platform_info, "fetch_ms": round(fetch_ms, 1)},
+            ttl=None if platform_info else PLATFORM_CACHE_EMPTY_TTL,
+        )
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_ms": round(self.saved_ms, 1),
+            "disk": self.store.stats(),
+        }
+
+
+# Process-wide cache used by get_platform
+platform_cache = PlatformCache()
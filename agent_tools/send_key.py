@@ -51,50 +51,219 @@ import asyncio
 # asyncio.run(sendCode({ 'current_task_command': 'VOLUME_UP', 'repeat': 5 }))
 
 async def sendCodeTest(state):
-    key_code = state['current_task_command']
-    repeat = state['repeat']
     task_number = state['task_number']
-    for i in range(repeat):
+    for key_code, delay_ms in expand_macro(macro_from_state(state)):
         print(f"Sending key code: {key_code}")
-        await asyncio.sleep(0.2)  # Small delay between repeats
+        await asyncio.sleep(0.2 if delay_ms is None else delay_ms / 1000)  # Small delay between repeats
 
     return { 'status': 'success', 'command': "", 'repeat': 1, 'task_number': task_number + 1 }
 
 
+import os
 import requests
 import time
+from requests.adapters import HTTPAdapter
+from agent_tools.http_client import get_async_client
+from agent_tools.key_macro import KeyPacer, macro_from_state, expand_macro, describe_macro
+from agent_tools.devices import resolve_targets, fan_out, fan_out_sync, report_fan_out
+from agent_tools.tv_remote import remote_manager
+from agent_tools.tracing import network_timer
 
 API_BASE_URL = "http://localhost:3000"
 
+# bridge: HTTP bridge at API_BASE_URL, remote: kept-open androidtvremote2 session to the TV in config.json.
+# A device in config.json can override it with its own "transport".
+TV_TRANSPORT = os.getenv("TV_TRANSPORT", "bridge")
+
+# Longest gap the pacer ever leaves between two presses (the old fixed delay)
+KEY_DELAY_SEC = 0.5
+
+# Send all presses of a command to /send-keys in one request and let the bridge pace them.
+# Set BATCH_KEYS=0 for bridges without the batch endpoint.
+BATCH_KEYS = os.getenv("BATCH_KEYS", "1") != "0"
+# Gap between presses until the first bridge ack has been measured
+KEY_INTERVAL_MS = int(os.getenv("KEY_INTERVAL_MS", "100"))
+
+# Keep-alive session shared by every sync send
+session = requests.Session()
+session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=10))
+
+# Bridges that answered 404 on /send-keys
+batch_unsupported_bridges = set()
+
+# Learns the gap between presses from the default TV's acks
+pacer = KeyPacer(initial_ms=KEY_INTERVAL_MS, max_ms=KEY_DELAY_SEC * 1000)
+# Pacers of the other devices in config.json, by device name
+pacers = {}
+
+def bridge_url(device):
+    return device.get("bridge_url") or API_BASE_URL
+
+def remote_target(device):
+    """Host and port for remote_manager; the default TV is left to the manager's config."""
+    return { 'host': None if device.get("default") else device.get("tv_ip"), 'api_port': device.get("api_port") }
+
+def pacer_for(device):
+    if device.get("default"):
+        return pacer
+    if device["name"] not in pacers:
+        pacers[device["name"]] = KeyPacer(initial_ms=KEY_INTERVAL_MS, max_ms=KEY_DELAY_SEC * 1000)
+    return pacers[device["name"]]
+
+def key_batch(presses, gap_ms):
+    """
+    Body of POST /send-keys: the presses in order and the gap the bridge waits between them.
+    A press with its own pause is sent as an object.
+
+    { "keys": ["KEYCODE_DPAD_RIGHT", {"keycode": "KEYCODE_DPAD_DOWN", "delay_ms": 2000}, "KEYCODE_DPAD_CENTER"],
+      "interval_ms": 100 }
+    """
+    keys = [keycode if delay_ms is None else { "keycode": keycode, "delay_ms": delay_ms } for keycode, delay_ms in presses]
+    return { "keys": keys, "interval_ms": round(gap_ms) }
+
+def batch_wait_ms(batch):
+    """Time the bridge spends pausing between the presses of a batch."""
+    keys = batch["keys"]
+    return sum(
+        key["delay_ms"] if isinstance(key, dict) else batch["interval_ms"]
+        for key in keys[:-1]
+    )
+
+def use_batch(base_url):
+    return BATCH_KEYS and base_url not in batch_unsupported_bridges
+
+def batch_unsupported(base_url):
+    batch_unsupported_bridges.add(base_url)
+    print(f"⚠️ Bridge {base_url} has no /send-keys endpoint, sending presses one by one.")
+
+def press_gap(device_pacer, delay_ms):
+    """Seconds from sending one press to sending the next."""
+    return (device_pacer.gap_ms() if delay_ms is None else delay_ms) / 1000
+
+def code_result(steps, devices, device_results, task_number):
+    failed = sum(result["status"] == "error" for result in device_results)
+    target = devices[0]["name"] if len(devices) == 1 else f"{len(devices) - failed}/{len(devices)} devices"
+    print(f"✅ Command execution completed. | {describe_macro(steps)} | {target} | key gap : {pacer_for(devices[0]).gap_ms():.0f} ms\n")
+    return {
+        'status': 'partial' if failed else 'success',
+        'command': "",
+        'device_results': device_results,
+        'task_number': task_number + 1,
+    }
+
+def deliver_keys(device, presses):
+    """
+    Sends the presses to one device.
+
+    With batching on, every press goes out in one /send-keys request;
+    otherwise one /send-key request per press. Either way the gap between
+    presses comes from the device's pacer, which tracks how fast it acks.
+    """
+    device_pacer = pacer_for(device)
+
+    if (device.get("transport") or TV_TRANSPORT) == "remote":
+        # The remote protocol has no per-key ack, presses go out at the pacer's current gap
+        remote_manager.send_keys_sync(presses, device_pacer.gap_ms(), **remote_target(device))
+        print(f"[{len(presses)}/{len(presses)}] Key presses sent over the remote session.")
+        return
+
+    base_url = bridge_url(device)
+    if use_batch(base_url):
+        batch = key_batch(presses, device_pacer.gap_ms())
+        start = time.perf_counter()
+        response = session.post(f"{base_url}/send-keys", json=batch)
+        if response.status_code == 404:
+            batch_unsupported(base_url)
+        else:
+            response.raise_for_status()
+            device_pacer.observe_batch((time.perf_counter() - start) * 1000, len(presses), batch_wait_ms(batch))
+            print(f"[{len(presses)}/{len(presses)}] Key presses sent successfully in one batch.")
+            return
+
+    url = f"{base_url}/send-key"
+
+    # The wait for each ack overlaps the gap before the next press,
+    # which goes out once both the ack is in and the gap has passed
+    next_at = time.perf_counter()
+    for i, (keycode, delay_ms) in enumerate(presses):
+        time.sleep(max(0.0, next_at - time.perf_counter()))
+
+        sent = time.perf_counter()
+        response = session.post(url, json={ "keycode": keycode })
+        response.raise_for_status()
+        device_pacer.observe((time.perf_counter() - sent) * 1000)
+        print(f"[{i+1}/{len(presses)}] Keycode {keycode} sent successfully.")
+
+        next_at = sent + press_gap(device_pacer, delay_ms)
+
+async def deliver_keys_async(device, presses):
+    """Same as deliver_keys, over the shared async client."""
+    device_pacer = pacer_for(device)
+    client = get_async_client()
+
+    if (device.get("transport") or TV_TRANSPORT) == "remote":
+        await remote_manager.send_keys(presses, device_pacer.gap_ms(), **remote_target(device))
+        print(f"[{len(presses)}/{len(presses)}] Key presses sent over the remote session.")
+        return
+
+    base_url = bridge_url(device)
+    if use_batch(base_url):
+        batch = key_batch(presses, device_pacer.gap_ms())
+        start = time.perf_counter()
+        response = await client.post(f"{base_url}/send-keys", json=batch)
+        if response.status_code == 404:
+            batch_unsupported(base_url)
+        else:
+            response.raise_for_status()
+            device_pacer.observe_batch((time.perf_counter() - start) * 1000, len(presses), batch_wait_ms(batch))
+            print(f"[{len(presses)}/{len(presses)}] Key presses sent successfully in one batch.")
+            return
+
+    url = f"{base_url}/send-key"
+
+    next_at = time.perf_counter()
+    for i, (keycode, delay_ms) in enumerate(presses):
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+
+        sent = time.perf_counter()
+        response = await client.post(url, json={ "keycode": keycode })
+        response.raise_for_status()
+        device_pacer.observe((time.perf_counter() - sent) * 1000)
+        print(f"[{i+1}/{len(presses)}] Keycode {keycode} sent successfully.")
+
+        next_at = sent + press_gap(device_pacer, delay_ms)
+
 def sendCode(state):
     """
-    Sends a raw integer keycode repeatedly via the API.
+    Sends the command's key macro to the target devices (the default TV unless
+    the command named others), every device at the same time.
+    """
+
+    print("📡 Starting to send keycode to device...")
+
+    steps = macro_from_state(state)
+    presses = expand_macro(steps)
+    devices = resolve_targets(state.get('target_devices'))
+
+    device_results, errors = fan_out_sync(devices, lambda device: deliver_keys(device, presses))
+    report_fan_out(device_results, errors)
 
-    :param keycode: Integer keycode to send.
-    :param repeat: Number of times to send the keycode.
-    :param delay_sec: Delay in seconds between each request.
+    return code_result(steps, devices, device_results, state['task_number'])
+
+async def sendCodeAsync(state):
+    """
+    Same as sendCode, over the shared async client so other commands keep running while it waits.
     """
 
     print("📡 Starting to send keycode to device...")
 
-    keycode = state['current_task_command']
-    repeat = state['repeat']
-    task_number = state['task_number']
-    delay_sec = 0.5
-    url = f"{API_BASE_URL}/send-key"
+    steps = macro_from_state(state)
+    presses = expand_macro(steps)
+    devices = resolve_targets(state.get('target_devices'))
 
-    for i in range(repeat):
-        payload = {
-            "keycode": keycode
-            # No direction field sent, so API must default internally
-        }
+    # Timed as a whole: the devices' waits overlap
+    with network_timer():
+        device_results, errors = await fan_out(devices, lambda device: deliver_keys_async(device, presses))
+    report_fan_out(device_results, errors)
 
-        response = requests.post(url, json=payload)
-        response.raise_for_status()
-        print(f"[{i+1}/{repeat}] Keycode {keycode} sent successfully.")
-        
-        time.sleep(delay_sec)
-    
-    print("✅ Command execution completed.\n")
-    
-    return { 'status': 'success', 'command': "", 'task_number': task_number + 1 }
\ No newline at end of file
+    return code_result(steps, devices, device_results, state['task_number'])
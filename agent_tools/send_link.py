@@ -36,31 +36,86 @@ async def sendLinkTest(state):
     await asyncio.sleep(0.2)  # Small delay between repeats
     return { 'status': 'success', 'link': "", 'task_number': task_number + 1 }
 
+import os
+import httpx
 import requests
+from agent_tools.http_client import get_async_client
+from agent_tools.devices import resolve_targets, fan_out, fan_out_sync, report_fan_out
+from agent_tools.send_key import remote_target
+from agent_tools.tracing import network_timer
+from agent_tools.tv_remote import remote_manager
 
 API_BASE_URL = "http://localhost:3000"
 
+# bridge: HTTP bridge at API_BASE_URL, remote: kept-open androidtvremote2 session to the TV in config.json.
+# A device in config.json can override it with its own "transport".
+TV_TRANSPORT = os.getenv("TV_TRANSPORT", "bridge")
+
+def link_result(devices, device_results, errors, task_number):
+    if errors and len(errors) == len(device_results):
+        print("Error sending app link:", errors[0])
+        return { 'status': 'error', 'link': "", 'device_results': device_results, 'task_number': task_number + 1 }
+
+    if len(devices) > 1:
+        print(f"✅ App link sent to {len(devices) - len(errors)}/{len(devices)} devices.")
+    return {
+        'status': 'partial' if errors else 'success',
+        'link': "",
+        'device_results': device_results,
+        'task_number': task_number + 1,
+    }
+
+def deliver_link(device, app_url):
+    if (device.get("transport") or TV_TRANSPORT) == "remote":
+        remote_manager.launch_sync(app_url, **remote_target(device))
+        print("✅ App link sent over the remote session.")
+        return
+
+    response = requests.post(f"{device.get('bridge_url') or API_BASE_URL}/send-app", json={ "url": app_url })
+    response.raise_for_status()
+    print("✅ App link sent successfully.")
+
+async def deliver_link_async(device, app_url):
+    if (device.get("transport") or TV_TRANSPORT) == "remote":
+        await remote_manager.launch(app_url, **remote_target(device))
+        print("✅ App link sent over the remote session.")
+        return
+
+    response = await get_async_client().post(f"{device.get('bridge_url') or API_BASE_URL}/send-app", json={ "url": app_url })
+    response.raise_for_status()
+    print("✅ App link sent successfully.")
+
 def sendLink(state):
     """
-    Sends an app link to open on the Android TV via the API.
+    Sends an app link to open on the target Android TVs via the API.
 
     :param app_url: A valid app deep link or URL (e.g., "https://www.netflix.com")
     """
     app_url = state['app_link']
-    task_number = state['task_number']
-    url = f"{API_BASE_URL}/send-app"
+    devices = resolve_targets(state.get('target_devices'))
 
     print("📡 Starting to send app link to device...")
     print(f"🔗 App URL: {app_url}")
 
-    payload = {
-        "url": app_url
-    }
+    device_results, errors = fan_out_sync(devices, lambda device: deliver_link(device, app_url))
+    # Bridge errors are logged and returned as before; anything else raises when no device got the link
+    report_fan_out(device_results, [e for e in errors if not isinstance(e, requests.exceptions.RequestException)])
+
+    return link_result(devices, device_results, errors, state['task_number'])
+
+async def sendLinkAsync(state):
+    """
+    Same as sendLink, over the shared async client.
+    """
+    app_url = state['app_link']
+    devices = resolve_targets(state.get('target_devices'))
+
+    print("📡 Starting to send app link to device...")
+    print(f"🔗 App URL: {app_url}")
+
+    with network_timer():
+        device_results, errors = await fan_out(devices, lambda device: deliver_link_async(device, app_url))
+    # Bridge errors are logged and returned as before; anything else raises when no device got the link
+    report_fan_out(device_results, [e for e in errors if not isinstance(e, httpx.HTTPError)])
 
-    try:
-        response = requests.post(url, json=payload)
-        response.raise_for_status()
-        print("✅ App link sent successfully.")
-        return { 'status': 'success', 'link': "", 'task_number': task_number + 1 }
-    except requests.exceptions.RequestException as e:
-        print("Error sending app link:", e)
\ No newline at end of file
+    return link_result(devices, device_results, errors, state['task_number'])
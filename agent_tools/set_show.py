@@ -1,54 +1,61 @@
-from langchain_groq import ChatGroq
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
-from typing import Literal
-from dotenv import load_dotenv
+from model.groq_model import register_chain
+from agent_tools.tracing import add_llm_time
 
-load_dotenv()
+# Create output schema using Pydantic
+class ShowNameOutput(BaseModel):
+    showName: str = Field(description="""Movie or TV show name to be set.""")
 
-def setShowName(state):
+SHOW_NAME_TEMPLATE = """You are a remote control agent. You are given a task to complete. Your task is to extrat movie or tv show name from user task and return a valid movie or tv show name.
+        Here is the task:
+        {task} \n {format_instructions}
+        """
+
+# Prompt, parser and format instructions are built once and shared by every call
+show_name_chain = register_chain("set_show_name", SHOW_NAME_TEMPLATE, ShowNameOutput, on_llm_time=add_llm_time)
+
+def startShowName(state):
+    """Logs the task and returns the show name the fused planner already extracted, if any."""
 
     print("🧠 Extracting show/movie name from user task...")
 
-    task = state['current_task']
     task_number = state['task_number']
 
-    print(f"📌 Current task: {task}")
+    print(f"📌 Current task: {state['current_task']}")
 
-    # Initialize the Groq model (use any model you prefer)
-    llm = ChatGroq(model="gemma2-9b-it")
+    # The fused planner may already have extracted the show name
+    if state.get('show_name'):
+        print(f"🎯 Show name from planner: {state['show_name']}")
+        print("✅ Extraction complete.\n")
+        return { 'target_show_name': state['show_name'], 'show_name': state['show_name'], 'task_number': task_number + 1 }
 
-    # Create output schema using Pydantic
-    class ShowNameOutput(BaseModel):
-        showName: str = Field(description="""Movie or TV show name to be set.""")
+    return None
 
-    # Create output parser using PydanticOutputParser
-    show_name_parser = PydanticOutputParser(pydantic_object=ShowNameOutput)
+def showNameResult(final_result, task_number):
 
-    # Create prompt template using PromptTemplate
-    template = PromptTemplate(
-        template="""You are a remote control agent. You are given a task to complete. Your task is to extrat movie or tv show name from user task and return a valid movie or tv show name.
-        Here is the task:
-        {task} \n {format_instructions}
-        """,
-        input_variables=["task", "format_instructions"],
-        partial_variables={"format_instructions": show_name_parser.get_format_instructions()},
-    )
+    print(f"🎯 Extracted show name: {final_result.showName}")
+    print("✅ Extraction complete.\n")
 
-    # Create prompt
-    prompt = template.invoke({"task": task})
+    return { 'target_show_name': final_result.showName, 'show_name': final_result.showName, 'task_number': task_number + 1 }
 
-    # Get response from the llm
-    response = llm.invoke(prompt)
+def setShowName(state):
+    prefilled = startShowName(state)
+    if prefilled is not None:
+        return prefilled
 
-    # Parse the response using the output parser
-    final_result = show_name_parser.parse(response.content)
+    # Get the parsed show name from the shared llm chain
+    final_result = show_name_chain.invoke(task=state['current_task'])
 
-    print(f"🎯 Extracted show name: {final_result.showName}")
-    print("✅ Extraction complete.\n")
+    return showNameResult(final_result, state['task_number'])
 
-    return { 'target_show_name': final_result.showName, 'show_name': final_result.showName, 'task_number': task_number + 1 }
+async def setShowNameAsync(state):
+    prefilled = startShowName(state)
+    if prefilled is not None:
+        return prefilled
+
+    final_result = await show_name_chain.ainvoke(task=state['current_task'])
+
+    return showNameResult(final_result, state['task_number'])
 
 # if __name__ == "__main__":
 #   r = setShowName({"current_task": "show me war 2 movie"})
@@ -0,0 +1,206 @@
+"""
+Local title -> similar titles index for get_recommendations.
+
+Every movie-map scrape is added to it, and a snapshot can be imported in bulk:
+
+    python -m agent_tools.similarity_index import snapshot.json
+    python -m agent_tools.similarity_index export snapshot.json
+    python -m agent_tools.similarity_index stats
+
+A snapshot is a JSON object {"title": ["similar title", ...], ...}.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from agent_tools.cache import CACHE_DIR
+from agent_tools.platform_cache import normalize_title
+
+# Entries older than this are still served, then refreshed in the background
+SIMILAR_INDEX_MAX_AGE = int(os.getenv("SIMILAR_INDEX_MAX_AGE", 14 * 24 * 3600))
+# Snapshot imported when the index is first opened, if set
+SIMILAR_INDEX_SNAPSHOT = os.getenv("SIMILAR_INDEX_SNAPSHOT", "")
+
+
+class SimilarityIndex:
+    """
+    Adjacency index from a title to its similar titles.
+
+    Lookups are dict reads; SQLite only keeps the index across restarts and
+    is read once, when the index opens.
+    """
+
+    def __init__(self, path=os.path.join(CACHE_DIR, "similar.sqlite"), max_age=SIMILAR_INDEX_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS similar ("
+            "key TEXT PRIMARY KEY, title TEXT NOT NULL, "
+            "similar TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+        # key -> (title, similar titles, updated_at); empty scrapes written
+        # before they were skipped are left out, so they count as misses
+        self._index = {}
+        for key, title, similar, updated_at in self._db.execute("SELECT key, title, similar, updated_at FROM similar"):
+            similar = json.loads(similar)
+            if similar:
+                self._index[key] = (title, similar, updated_at)
+
+    def get(self, title):
+        """Returns (similar titles, stale) for a known title, or None."""
+        entry = self._index.get(normalize_title(title))
+        if entry is None:
+            self.misses += 1
+            return None
+
+        _, similar, updated_at = entry
+        stale = time.time() - updated_at > self.max_age
+        self.hits += 1
+        self.stale_hits += stale
+        return list(similar), stale
+
+    def put(self, title, similar, updated_at=None):
+        self.put_many({title: similar}, updated_at)
+
+    def put_many(self, entries, updated_at=None):
+        """
+        Adds or replaces {title: similar titles}; one transaction for the whole
+        batch. Titles without similar titles are skipped, so a failed scrape
+        is retried instead of being served until it goes stale.
+        """
+        updated_at = updated_at or time.time()
+        rows = [
+            (normalize_title(title), title, json.dumps(list(similar), ensure_ascii=False), updated_at)
+            for title, similar in entries.items()
+            if similar
+        ]
+        if not rows:
+            return 0
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO similar (key, title, similar, updated_at) VALUES (?, ?, ?, ?)", rows
+            )
+            self._db.commit()
+            for key, title, similar, stamp in rows:
+                self._index[key] = (title, json.loads(similar), stamp)
+        return len(rows)
+
+    def import_snapshot(self, path):
+        """
+        Imports a {"title": [similar titles]} snapshot. Its entries are as old
+        as the file, so an old snapshot still gets refreshed from movie-map.
+        """
+        with open(path, encoding="utf-8") as f:
+            snapshot = json.load(f)
+        return self.put_many(snapshot, updated_at=os.path.getmtime(path))
+
+    def export_snapshot(self, path):
+        with self._lock:
+            snapshot = {title: similar for title, similar, _ in self._index.values()}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False, indent=2)
+        return len(snapshot)
+
+    def __len__(self):
+        return len(self._index)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "titles": len(self._index),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class BackgroundRefresher:
+    """Runs refresh(title) on a daemon thread, at most once at a time per title."""
+
+    def __init__(self, refresh):
+        self.refresh = refresh
+        self.in_flight = set()
+        self.refreshed = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def submit(self, title):
+        key = normalize_title(title)
+        with self._lock:
+            if key in self.in_flight:
+                return False
+            self.in_flight.add(key)
+        threading.Thread(target=self._run, args=(key, title), daemon=True, name="similar-refresh").start()
+        return True
+
+    def _run(self, key, title):
+        try:
+            self.refresh(title)
+            self.refreshed += 1
+        except Exception as e:
+            self.failed += 1
+            print(f"⚠️ Could not refresh recommendations for '{title}': {e}")
+        finally:
+            with self._lock:
+                self.in_flight.discard(key)
+
+
+def open_index(snapshot=SIMILAR_INDEX_SNAPSHOT, **kwargs):
+    """
+    Opens the index, importing `snapshot` into an empty one.
+
+    Runs at import time, so a broken index file or snapshot is logged and
+    the agent starts with an empty index instead of failing to start.
+    """
+    try:
+        index = SimilarityIndex(**kwargs)
+    except sqlite3.Error as e:
+        print(f"⚠️ Could not open the similar-titles index, starting empty: {e}")
+        return SimilarityIndex(path=":memory:")
+
+    if snapshot and not len(index):
+        try:
+            count = index.import_snapshot(snapshot)
+            print(f"[INDEX] Imported {count} titles from {snapshot}")
+        except Exception as e:
+            print(f"⚠️ Could not import {snapshot}, starting with an empty index: {e}")
+    return index
+
+
+# Process-wide index used by get_recommendations
+similarity_index = open_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the local similar-titles index.")
+    sub = parser.add_subparsers(dest="action", required=True)
+    sub.add_parser("import", help="add the titles of a snapshot file").add_argument("path")
+    sub.add_parser("export", help="write every indexed title to a snapshot file").add_argument("path")
+    sub.add_parser("stats", help="show how many titles are indexed")
+    args = parser.parse_args()
+
+    if args.action == "import":
+        print(f"Imported {similarity_index.import_snapshot(args.path)} titles into {similarity_index.path}")
+    elif args.action == "export":
+        print(f"Exported {similarity_index.export_snapshot(args.path)} titles to {args.path}")
+    else:
+        print(json.dumps(similarity_index.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from dotenv import load_dotenv
+
+# May be imported before model.groq_model, so read .env here as well
+load_dotenv()
+
+# One JSON line per node invocation; set TRACE_FILE= (empty) to disable
+TRACE_FILE = os.getenv("TRACE_FILE", os.path.join(".cache", "node_traces.jsonl"))
+
+# Latency buckets in seconds for the Prometheus histograms
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Span of the node currently running; to_thread and create_task copy it along
+current_span = contextvars.ContextVar("current_span", default=None)
+current_command = contextvars.ContextVar("current_command", default=None)
+
+
+class NodeMetrics:
+    """Process-wide aggregates behind the Prometheus endpoint."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = defaultdict(int)              # (node, status) -> count
+        self.buckets = defaultdict(lambda: [0] * len(BUCKETS))
+        self.sums = defaultdict(float)             # (node, kind) -> seconds or bytes
+
+    def observe(self, record):
+        node = record["node"]
+        wall = record["wall_ms"] / 1000
+        with self.lock:
+            self.calls[(node, record["status"])] += 1
+            for i, bound in enumerate(BUCKETS):
+                if wall <= bound:
+                    self.buckets[node][i] += 1
+            self.sums[(node, "wall")] += wall
+            self.sums[(node, "llm")] += record["llm_ms"] / 1000
+            self.sums[(node, "network")] += record["network_ms"] / 1000
+            self.sums[(node, "input_bytes")] += record["input_bytes"]
+            self.sums[(node, "output_bytes")] += record["output_bytes"]
+
+    def render_prometheus(self):
+        lines = [
+            "# HELP tv_agent_node_calls_total Node invocations by outcome.",
+            "# TYPE tv_agent_node_calls_total counter",
+        ]
+        with self.lock:
+            for (node, status), count in sorted(self.calls.items()):
+                lines.append(f'tv_agent_node_calls_total{{node="{node}",status="{status}"}} {count}')
+
+            lines += [
+                "# HELP tv_agent_node_seconds Node wall time.",
+                "# TYPE tv_agent_node_seconds histogram",
+            ]
+            for node, counts in sorted(self.buckets.items()):
+                for bound, count in zip(BUCKETS, counts):
+                    lines.append(f'tv_agent_node_seconds_bucket{{node="{node}",le="{bound}"}} {count}')
+                total = sum(c for (n, _), c in self.calls.items() if n == node)
+                lines.append(f'tv_agent_node_seconds_bucket{{node="{node}",le="+Inf"}} {total}')
+                lines.append(f'tv_agent_node_seconds_sum{{node="{node}"}} {self.sums[(node, "wall")]:.6f}')
+                lines.append(f'tv_agent_node_seconds_count{{node="{node}"}} {total}')
+
+            for kind, unit, help_text in (
+                ("llm", "seconds", "Time spent waiting on the LLM."),
+                ("network", "seconds", "Time spent on non-LLM network calls."),
+                ("input_bytes", "bytes", "Serialized size of the state passed to the node."),
+                ("output_bytes", "bytes", "Serialized size of the update returned by the node."),
+            ):
+                name = f"tv_agent_node_{kind}_total" if unit == "bytes" else f"tv_agent_node_{kind}_seconds_total"
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for (node, k), value in sorted(self.sums.items()):
+                    if k == kind:
+                        lines.append(f'{name}{{node="{node}"}} {value:.6f}')
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = NodeMetrics()
+_trace_lock = threading.Lock()
+
+
+def payload_size(value):
+    try:
+        return len(json.dumps(value, default=str, ensure_ascii=False).encode("utf-8"))
+    except (TypeError, ValueError):
+        return 0
+
+
+def add_llm_time(seconds):
+    span = current_span.get()
+    if span is not None:
+        span["llm"] += seconds
+
+
+def add_network_time(seconds):
+    span = current_span.get()
+    if span is not None:
+        span["network"] += seconds
+
+
+@contextmanager
+def network_timer():
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_network_time(time.perf_counter() - start)
+
+
+def write_record(record):
+    metrics.observe(record)
+    if not TRACE_FILE:
+        return
+    directory = os.path.dirname(TRACE_FILE)
+    with _trace_lock:
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(TRACE_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def start_span():
+    # The enclosing span (the command) also collects this span's llm and network time
+    return {"llm": 0.0, "network": 0.0, "start": time.perf_counter(), "parent": current_span.get()}
+
+
+def finish_span(node, span, state, result, error, **extra):
+    wall = time.perf_counter() - span["start"]
+    parent = span["parent"]
+    if parent is not None:
+        parent["llm"] += span["llm"]
+        parent["network"] += span["network"]
+
+    write_record({
+        "ts": time.time(),
+        "command_id": current_command.get(),
+        "node": node,
+        "wall_ms": round(wall * 1000, 3),
+        "llm_ms": round(span["llm"] * 1000, 3),
+        "network_ms": round(span["network"] * 1000, 3),
+        "other_ms": round(max(0.0, wall - span["llm"] - span["network"]) * 1000, 3),
+        "input_bytes": payload_size(state),
+        "output_bytes": payload_size(result),
+        "status": "error" if error else "success",
+        "error": f"{type(error).__name__}: {error}" if error else None,
+        **extra,
+    })
+
+
+def traced(name, node):
+    """Wraps a graph node (sync or async) so every invocation is timed and recorded."""
+
+    if inspect.iscoroutinefunction(node):
+        @functools.wraps(node)
+        async def async_wrapper(state):
+            span = start_span()
+            token = current_span.set(span)
+            result, error = None, None
+            try:
+                result = await node(state)
+                return result
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                current_span.reset(token)
+                finish_span(name, span, state, result, error)
+
+        return async_wrapper
+
+    @functools.wraps(node)
+    def wrapper(state):
+        span = start_span()
+        token = current_span.set(span)
+        result, error = None, None
+        try:
+            result = node(state)
+            return result
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            current_span.reset(token)
+            finish_span(name, span, state, result, error)
+
+    return wrapper
+
+
+@contextmanager
+def command_trace(task):
+    """Groups the node records of one command and records its end-to-end latency."""
+    command_token = current_command.set(uuid.uuid4().hex[:12])
+    span = start_span()
+    span_token = current_span.set(span)
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        current_span.reset(span_token)
+        finish_span("__command__", span, {"current_task": task}, None, error, task=task)
+        current_command.reset(command_token)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """Serves the Prometheus text format on http://host:port/metrics from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics").start()
+    return server
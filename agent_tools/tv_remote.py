@@ -0,0 +1,259 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from androidtvremote2 import AndroidTVRemote, CannotConnect, ConnectionClosed, InvalidAuth
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.json")
+
+# Seconds between health checks of every session
+HEALTH_CHECK_SEC = float(os.getenv("REMOTE_HEALTH_CHECK_SEC", "10"))
+# How long a send waits for a (re)connecting session before giving up
+SEND_TIMEOUT_SEC = float(os.getenv("REMOTE_SEND_TIMEOUT_SEC", "5"))
+CONNECT_TIMEOUT_SEC = 5.0
+# Backoff between attempts while a TV is unreachable
+RETRY_MIN_SEC = 0.5
+RETRY_MAX_SEC = 30.0
+# A drop androidtvremote2's reconnect loop has not recovered from after this
+# long (its own backoff tops out at 30 s) is reconnected by the health check
+LIBRARY_RECONNECT_GRACE_SEC = 30.0 + CONNECT_TIMEOUT_SEC
+
+
+def load_tv_config(path=CONFIG_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+class RemoteSession:
+    """
+    One authenticated remote-protocol session to one TV, kept open between commands.
+
+    androidtvremote2 reconnects a dropped connection by itself once it has been
+    up; the health check covers the rest (TV off at start-up, a reconnect loop
+    that gave up or never recovers) by reconnecting with exponential backoff.
+    Connection state comes from the library's availability callback only.
+    """
+
+    def __init__(self, host, certfile, keyfile, client_name, api_port=6466):
+        self.host = host
+        self.api_port = api_port
+        self.certfile = certfile
+        self.keyfile = keyfile
+        self.client_name = client_name
+        self.remote = None
+        self.ready = asyncio.Event()
+        self.connects = 0
+        self.reconnects = 0
+        self.last_error = None
+        self._retry_sec = RETRY_MIN_SEC
+        self._next_attempt = 0.0
+        # When the session dropped, while the library is reconnecting it
+        self._dropped_at = None
+        self._gave_up = False
+        self._check_lock = asyncio.Lock()
+
+    def on_available(self, available):
+        if available:
+            self.reconnects += 1
+            self._dropped_at = None
+            self.ready.set()
+            print(f"📺 Remote session to {self.host} is back.")
+        else:
+            self._dropped_at = time.monotonic()
+            self.ready.clear()
+            print(f"⚠️ Remote session to {self.host} dropped, reconnecting...")
+
+    def on_invalid_auth(self):
+        self._gave_up = True
+        print(f"❌ {self.host} rejected the client certificate, pair again.")
+
+    async def connect(self):
+        self.close()
+        remote = AndroidTVRemote(
+            client_name=self.client_name,
+            certfile=self.certfile,
+            keyfile=self.keyfile,
+            host=self.host,
+            api_port=self.api_port,
+            enable_ime=False,
+        )
+        try:
+            await asyncio.wait_for(remote.async_connect(), CONNECT_TIMEOUT_SEC)
+        except BaseException:
+            remote.disconnect()
+            raise
+        remote.add_is_available_updated_callback(self.on_available)
+        remote.keep_reconnecting(self.on_invalid_auth)
+
+        self.remote = remote
+        self._dropped_at = None
+        self._gave_up = False
+        self.connects += 1
+        self.last_error = None
+        self._retry_sec = RETRY_MIN_SEC
+        self.ready.set()
+
+    def is_healthy(self):
+        return self.remote is not None and self.ready.is_set()
+
+    def library_reconnecting(self):
+        """The library's reconnect loop is still working on a drop and has not been at it too long."""
+        return (
+            self.remote is not None and not self._gave_up and self._dropped_at is not None
+            and time.monotonic() - self._dropped_at < LIBRARY_RECONNECT_GRACE_SEC
+        )
+
+    async def check(self):
+        """Reconnects when the session is down and nothing else is bringing it back."""
+        async with self._check_lock:
+            await self._check()
+
+    async def _check(self):
+        if self.is_healthy():
+            return
+        if self.library_reconnecting():
+            return
+        if time.monotonic() < self._next_attempt:
+            return
+        try:
+            await self.connect()
+            print(f"📺 Remote session to {self.host} connected.")
+        except (CannotConnect, ConnectionClosed, InvalidAuth, OSError, asyncio.TimeoutError) as e:
+            self.last_error = e
+            self._next_attempt = time.monotonic() + self._retry_sec
+            self._retry_sec = min(self._retry_sec * 2, RETRY_MAX_SEC)
+
+    async def wait_ready(self):
+        if not self.ready.is_set():
+            await self.check()
+        try:
+            await asyncio.wait_for(self.ready.wait(), SEND_TIMEOUT_SEC)
+        except asyncio.TimeoutError:
+            raise Exception(f"TV {self.host} is not connected: {self.last_error}") from None
+
+    async def send_keys(self, presses, gap_ms):
+        """Sends (keycode, delay_ms) presses; delay_ms overrides gap_ms after that press."""
+        await self.wait_ready()
+        for i, (keycode, delay_ms) in enumerate(presses):
+            self.remote.send_key_command(keycode)
+            if i < len(presses) - 1:
+                await asyncio.sleep((gap_ms if delay_ms is None else delay_ms) / 1000)
+
+    async def launch(self, app_link):
+        await self.wait_ready()
+        self.remote.send_launch_app_command(app_link)
+
+    def close(self):
+        if self.remote is not None:
+            self.remote.disconnect()
+            self.remote = None
+        self.ready.clear()
+
+
+class RemoteManager:
+    """
+    Keeps one RemoteSession per TV on a dedicated event loop thread.
+
+    Sessions outlive the commands (and the event loops) that use them, so
+    neither the sync nodes nor the asyncio.run() of each caller pays for the
+    TLS handshake. Call the *_sync methods from plain threads and await the
+    async ones from any event loop.
+    """
+
+    def __init__(self, config_path=CONFIG_PATH):
+        self.config_path = config_path
+        self.sessions = {}
+        self.loop = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(target=self.loop.run_forever, daemon=True, name="tv-remote").start()
+                asyncio.run_coroutine_threadsafe(self._health_loop(), self.loop)
+        return self
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.start().loop)
+
+    def session(self, host=None, api_port=None):
+        """Session for a TV from config.json (the default TV when host is None). Runs on the manager loop."""
+        config = load_tv_config(self.config_path)
+        host = host or config["tv_ip"]
+        api_port = api_port or config.get("api_port", 6466)
+        key = f"{host}:{api_port}"
+        if key not in self.sessions:
+            self.sessions[key] = RemoteSession(
+                host=host,
+                certfile=config["certfile"],
+                keyfile=config["keyfile"],
+                client_name=config["client_name"],
+                api_port=api_port,
+            )
+        return self.sessions[key]
+
+    async def _send_keys(self, presses, gap_ms, host, api_port):
+        await self.session(host, api_port).send_keys(presses, gap_ms)
+
+    async def _launch(self, app_link, host, api_port):
+        await self.session(host, api_port).launch(app_link)
+
+    async def _health_loop(self):
+        while True:
+            for session in list(self.sessions.values()):
+                await session.check()
+            await asyncio.sleep(HEALTH_CHECK_SEC)
+
+    def connect_sync(self, host=None, api_port=None):
+        """Opens the session ahead of the first command."""
+        return self.submit(self._connect(host, api_port)).result()
+
+    async def _connect(self, host, api_port):
+        await self.session(host, api_port).wait_ready()
+
+    def send_keys_sync(self, presses, gap_ms, host=None, api_port=None):
+        return self.submit(self._send_keys(presses, gap_ms, host, api_port)).result()
+
+    async def send_keys(self, presses, gap_ms, host=None, api_port=None):
+        return await asyncio.wrap_future(self.submit(self._send_keys(presses, gap_ms, host, api_port)))
+
+    def launch_sync(self, app_link, host=None, api_port=None):
+        return self.submit(self._launch(app_link, host, api_port)).result()
+
+    async def launch(self, app_link, host=None, api_port=None):
+        return await asyncio.wrap_future(self.submit(self._launch(app_link, host, api_port)))
+
+    def stats(self):
+        return {
+            key: {
+                "healthy": session.is_healthy(),
+                "connects": session.connects,
+                "reconnects": session.reconnects,
+                "last_error": repr(session.last_error) if session.last_error else None,
+            }
+            for key, session in self.sessions.items()
+        }
+
+    def close(self):
+        if self.loop is None:
+            return
+
+        async def close_all():
+            for session in self.sessions.values():
+                session.close()
+            # Health loop and the library's idle timers
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        self.submit(close_all()).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.loop = None
+        self.sessions = {}
+
+
+# Shared by send_key and send_link when TV_TRANSPORT=remote
+remote_manager = RemoteManager()
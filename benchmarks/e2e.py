@@ -0,0 +1,245 @@
+"""
+End-to-end command latency through the compiled agent graph.
+
+Run from the repository root:
+
+    python -m benchmarks.e2e --rounds 5 --concurrency 4 --out e2e.json
+    python -m benchmarks.e2e --compare e2e.json
+
+Groq, JustWatch, movie-map, YouTube search and the TV bridge are replaced by
+local stand-ins with configurable latency; everything else (router, planner,
+dispatch, node code, parsers, HTTP clients) is the code main.py runs. Per-node
+numbers come from the trace lines written by agent_tools.tracing.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from collections import defaultdict
+
+import agent_tools.get_platform as get_platform
+import agent_tools.get_recommendations as get_recommendations
+import agent_tools.get_youtube_link as get_youtube_link
+import agent_tools.planner as planner
+import agent_tools.send_key as send_key
+import agent_tools.send_link as send_link
+import agent_tools.tracing as tracing
+from agent_tools.http_client import close_async_client
+from agent_tools.platform_cache import PlatformCache
+from agent_tools.similarity_index import SimilarityIndex
+from benchmarks.standins import (
+    CORPUS, StandInBackend, bridge_server, justwatch_search, movie_map_server, youtube_search, youtube_server,
+)
+from main import build_graph
+from model.groq_model import set_backend
+
+
+def percentile(values, q):
+    # Nearest-rank percentile
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)] if ordered else 0.0
+
+
+def latency_stats(values):
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 2) if values else 0.0,
+        "p50": round(percentile(values, 0.50), 2),
+        "p95": round(percentile(values, 0.95), 2),
+        "p99": round(percentile(values, 0.99), 2),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def install_standins(args):
+    """Points every external dependency at a local stand-in; returns the servers to close."""
+    set_backend(StandInBackend(latency=args.llm_latency, first_token=args.llm_first_token))
+
+    bridge = bridge_server(args.bridge_latency)
+    movie_map = movie_map_server(args.movie_map_latency)
+    send_key.API_BASE_URL = bridge.url
+    send_link.API_BASE_URL = bridge.url
+    get_recommendations.MOVIE_MAP_URL = movie_map.url
+    get_platform.search = justwatch_search(args.justwatch_latency)
+    youtube = youtube_server(args.youtube_latency)
+    get_youtube_link.YOUTUBE_URL = youtube.url
+    get_youtube_link.YoutubeSearch = youtube_search(args.youtube_latency)
+    get_youtube_link.YOUTUBE_CACHE_ENABLED = args.youtube_cache
+    get_youtube_link.youtube_cache.clear()
+
+    if args.key_delay is not None:
+        send_key.KEY_DELAY_SEC = args.key_delay
+        send_key.pacer.max_ms = args.key_delay * 1000
+    # Planning is part of what is measured, so the plan cache stays off unless asked for
+    planner.PLAN_CACHE_ENABLED = args.plan_cache
+    # Same for the JustWatch cache, which starts empty in a scratch file
+    get_platform.PLATFORM_CACHE_ENABLED = args.platform_cache
+    get_platform.platform_cache = PlatformCache(path=os.path.join(tempfile.mkdtemp(prefix="tv-agent-e2e-"), "justwatch.sqlite"))
+    get_recommendations.SIMILAR_INDEX_ENABLED = args.similar_index
+    get_recommendations.similarity_index = SimilarityIndex(path=os.path.join(tempfile.mkdtemp(prefix="tv-agent-e2e-"), "similar.sqlite"))
+
+    return [bridge, movie_map, youtube]
+
+
+async def run_corpus(app, rounds, concurrency):
+    limit = asyncio.Semaphore(concurrency)
+    failures = []
+
+    async def run_one(task):
+        async with limit:
+            try:
+                with tracing.command_trace(task):
+                    await app.ainvoke({"current_task": task, "task_number": 0})
+            except Exception as e:
+                failures.append(f"{task}: {type(e).__name__}: {e}")
+
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(run_one(entry["task"]) for _ in range(rounds) for entry in CORPUS))
+    finally:
+        await close_async_client()
+    return time.perf_counter() - start, failures
+
+
+def summarize(records, wall, failures, args):
+    commands = [r for r in records if r["node"] == "__command__"]
+
+    nodes = defaultdict(list)
+    for r in records:
+        if r["node"] != "__command__":
+            nodes[r["node"]].append(r)
+
+    per_task = defaultdict(list)
+    for r in commands:
+        per_task[r["task"]].append(r["wall_ms"])
+
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "settings": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "commands": len(commands),
+        "failures": failures,
+        "wall_s": round(wall, 3),
+        "throughput_cmd_s": round(len(commands) / wall, 3) if wall else 0.0,
+        "command_ms": latency_stats([r["wall_ms"] for r in commands]),
+        "tasks": {task: latency_stats(values) for task, values in sorted(per_task.items())},
+        "platform_cache": get_platform.platform_cache.stats(),
+        "similar_index": get_recommendations.similarity_index.stats(),
+        "nodes": {
+            name: {
+                **latency_stats([r["wall_ms"] for r in rs]),
+                "llm_ms_mean": round(sum(r["llm_ms"] for r in rs) / len(rs), 2),
+                "network_ms_mean": round(sum(r["network_ms"] for r in rs) / len(rs), 2),
+                "errors": sum(r["status"] == "error" for r in rs),
+            }
+            for name, rs in sorted(nodes.items())
+        },
+    }
+
+
+def print_report(result, baseline=None):
+    def delta(path):
+        if baseline is None:
+            return ""
+        old = baseline
+        for key in path:
+            old = old.get(key, {}) if isinstance(old, dict) else {}
+        new = result
+        for key in path:
+            new = new[key]
+        if not isinstance(old, (int, float)) or not old:
+            return ""
+        return f"  ({(new - old) / old:+.0%} vs {baseline.get('commit')})"
+
+    cmd = result["command_ms"]
+    print(f"\ncommit {result['commit']} | {result['commands']} commands in {result['wall_s']} s"
+          f" | {result['throughput_cmd_s']} cmd/s{delta(['throughput_cmd_s'])}")
+    for q in ("p50", "p95", "p99"):
+        print(f"  command {q}  {cmd[q]:9.1f} ms{delta(['command_ms', q])}")
+
+    print("\nper task (p50 / p95 ms)")
+    for task, stats in result["tasks"].items():
+        print(f"  {task:42} {stats['p50']:9.1f} {stats['p95']:9.1f}{delta(['tasks', task, 'p50'])}")
+
+    print("\nper node (p50 / p95 ms, mean llm / network ms)")
+    for name, stats in result["nodes"].items():
+        print(f"  {name:20} {stats['p50']:9.1f} {stats['p95']:9.1f}   llm {stats['llm_ms_mean']:8.1f}"
+              f"   net {stats['network_ms_mean']:8.1f}{delta(['nodes', name, 'p50'])}")
+
+    cache, index = result["platform_cache"], result["similar_index"]
+    if cache["hits"] + cache["misses"] or index["hits"] + index["misses"]:
+        print()
+    if cache["hits"] + cache["misses"]:
+        print(f"justwatch cache  hit rate {cache['hit_rate']:.0%} ({cache['hits']}/{cache['hits'] + cache['misses']})"
+              f" | saved {cache['saved_ms']:.0f} ms")
+    if index["hits"] + index["misses"]:
+        print(f"similar index    hit rate {index['hit_rate']:.0%} ({index['hits']}/{index['hits'] + index['misses']})"
+              f" | {index['titles']} titles")
+
+    for failure in result["failures"]:
+        print(f"  ❌ {failure}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=3, help="times the corpus is run")
+    parser.add_argument("--concurrency", type=int, default=1, help="commands in flight at once")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="seconds per LLM call")
+    parser.add_argument("--llm-first-token", type=float, default=0.05, help="seconds to the first streamed chunk")
+    parser.add_argument("--bridge-latency", type=float, default=0.01, help="seconds per TV bridge request")
+    parser.add_argument("--movie-map-latency", type=float, default=0.2, help="seconds per movie-map page")
+    parser.add_argument("--justwatch-latency", type=float, default=0.4, help="seconds per JustWatch search")
+    parser.add_argument("--youtube-latency", type=float, default=0.4, help="seconds per YouTube search")
+    parser.add_argument("--key-delay", type=float, default=None, help="override send_key.KEY_DELAY_SEC, the longest gap between presses")
+    parser.add_argument("--plan-cache", action="store_true", help="keep the persistent plan cache on")
+    parser.add_argument("--platform-cache", action="store_true", help="turn the JustWatch cache on (starts empty)")
+    parser.add_argument("--similar-index", action="store_true", help="turn the similar-titles index on (starts empty)")
+    parser.add_argument("--youtube-cache", action="store_true", help="turn the YouTube query cache on (starts empty)")
+    parser.add_argument("--out", help="write the results as JSON to this path")
+    parser.add_argument("--compare", help="print deltas against a previous results JSON")
+    args = parser.parse_args()
+
+    servers = install_standins(args)
+    trace_path = os.path.join(tempfile.mkdtemp(prefix="tv-agent-e2e-"), "trace.jsonl")
+    tracing.TRACE_FILE = trace_path
+    app = build_graph()
+
+    try:
+        # Node logs would swamp the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            wall, failures = asyncio.run(run_corpus(app, args.rounds, args.concurrency))
+    finally:
+        for server in servers:
+            server.close()
+
+    with open(trace_path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    result = summarize(records, wall, failures, args)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nresults written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
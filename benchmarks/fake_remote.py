@@ -0,0 +1,152 @@
+"""
+Local fake of an Android TV's remote-protocol endpoint (TLS, port 6466).
+
+It speaks just enough of the protocol for androidtvremote2 to connect:
+remote_configure -> remote_set_active -> remote_start, a ping every
+`ping_sec`, and it records every key press and app link it receives.
+
+    tv = FakeAndroidTV().start()
+    ...
+    tv.drop_connections()   # simulate the TV going away
+    tv.close()
+"""
+import asyncio
+import os
+import ssl
+import tempfile
+import threading
+import time
+
+from androidtvremote2.certificate_generator import generate_selfsigned_cert
+from androidtvremote2.remotemessage_pb2 import RemoteKeyCode, RemoteMessage
+from google.protobuf.internal.decoder import _DecodeVarint
+from google.protobuf.internal.encoder import _EncodeVarint
+
+# Feature bits: ping, key, power, volume, app link
+FEATURES = 1 | 2 | 32 | 64 | 512
+
+
+def write_cert_pair(directory, name):
+    cert_pem, key_pem = generate_selfsigned_cert(name)
+    certfile = os.path.join(directory, f"{name}-cert.pem")
+    keyfile = os.path.join(directory, f"{name}-key.pem")
+    with open(certfile, "wb") as f:
+        f.write(cert_pem)
+    with open(keyfile, "wb") as f:
+        f.write(key_pem)
+    return certfile, keyfile
+
+
+def client_cert_pair(name="tv-agent-test"):
+    """Writes a throwaway client certificate; the fake TV accepts any client."""
+    return write_cert_pair(tempfile.mkdtemp(prefix="fake-tv-"), name)
+
+
+class FakeRemoteProtocol(asyncio.Protocol):
+    def __init__(self, tv):
+        self.tv = tv
+        self.transport = None
+        self.buffer = bytearray()
+        self.ping_task = None
+
+    def send(self, msg):
+        _EncodeVarint(self.transport.write, msg.ByteSize())
+        self.transport.write(msg.SerializeToString())
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.tv.connections.add(self)
+        self.tv.connects += 1
+        msg = RemoteMessage()
+        msg.remote_configure.code1 = FEATURES
+        msg.remote_configure.device_info.vendor = "FakeVendor"
+        msg.remote_configure.device_info.model = "FakeTV"
+        self.send(msg)
+        self.ping_task = asyncio.get_running_loop().create_task(self.ping())
+
+    def connection_lost(self, exc):
+        self.tv.connections.discard(self)
+        if self.ping_task:
+            self.ping_task.cancel()
+
+    async def ping(self):
+        counter = 0
+        while True:
+            await asyncio.sleep(self.tv.ping_sec)
+            counter += 1
+            msg = RemoteMessage()
+            msg.remote_ping_request.val1 = counter
+            self.send(msg)
+
+    def data_received(self, data):
+        self.buffer += data
+        while self.buffer:
+            try:
+                length, pos = _DecodeVarint(self.buffer, 0)
+            except IndexError:
+                return
+            if len(self.buffer) < pos + length:
+                return
+            raw = bytes(self.buffer[pos:pos + length])
+            del self.buffer[:pos + length]
+            self.handle(raw)
+
+    def handle(self, raw):
+        msg = RemoteMessage()
+        msg.ParseFromString(raw)
+        if msg.HasField("remote_configure"):
+            reply = RemoteMessage()
+            reply.remote_set_active.active = FEATURES
+            self.send(reply)
+        elif msg.HasField("remote_set_active"):
+            reply = RemoteMessage()
+            reply.remote_start.started = True
+            self.send(reply)
+        elif msg.HasField("remote_key_inject"):
+            key = RemoteKeyCode.Name(msg.remote_key_inject.key_code)
+            self.tv.keys.append((time.perf_counter(), key))
+        elif msg.HasField("remote_app_link_launch_request"):
+            self.tv.links.append((time.perf_counter(), msg.remote_app_link_launch_request.app_link))
+
+
+class FakeAndroidTV:
+    """Fake TV on 127.0.0.1:<port> served from its own event loop thread."""
+
+    def __init__(self, port=0, ping_sec=5.0):
+        self.port = port
+        self.ping_sec = ping_sec
+        self.keys = []
+        self.links = []
+        self.connects = 0
+        self.connections = set()
+        self.loop = asyncio.new_event_loop()
+        self.server = None
+
+    def start(self):
+        certfile, keyfile = write_cert_pair(tempfile.mkdtemp(prefix="fake-tv-"), "fake-tv")
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(certfile, keyfile)
+
+        threading.Thread(target=self.loop.run_forever, daemon=True, name="fake-tv").start()
+        self.server = asyncio.run_coroutine_threadsafe(
+            self.loop.create_server(lambda: FakeRemoteProtocol(self), "127.0.0.1", self.port, ssl=context),
+            self.loop,
+        ).result()
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    def drop_connections(self):
+        """Closes every open client connection, like a TV that rebooted."""
+        def drop():
+            for protocol in list(self.connections):
+                protocol.transport.abort()
+        self.loop.call_soon_threadsafe(drop)
+
+    def close(self):
+        async def shutdown():
+            self.server.close()
+            for protocol in list(self.connections):
+                protocol.transport.abort()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
@@ -0,0 +1,108 @@
+"""
+Multi-TV fan-out: one command to a group of TVs, one after another vs all at once.
+
+Run from the repository root:
+
+    python -m benchmarks.fan_out --devices 6 --latency 0.05 --jitter 0.02
+
+Every TV is its own stand-in bridge with latency + i * jitter seconds per
+request, listed in a temporary config.json as one group. "--down" adds a
+device whose bridge is not running, to show per-device failures.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+
+import agent_tools.devices as devices
+import agent_tools.send_key as send_key
+import agent_tools.send_link as send_link
+from agent_tools.http_client import close_async_client
+from agent_tools.intent_router import intent_router
+from benchmarks.standins import bridge_server
+
+MACRO = [{"command": "KEYCODE_VOLUME_UP", "repeat": 3}]
+LINK = "https://www.netflix.com/title/80057281"
+
+
+def write_config(bridges, down):
+    config = {
+        "tv_ip": "10.0.0.1",
+        "devices": {f"tv_{i + 1}": {"tv_ip": f"10.0.0.{i + 1}", "bridge_url": bridge.url} for i, bridge in enumerate(bridges)},
+    }
+    if down:
+        # Nothing listens on port 9 (discard)
+        config["devices"]["tv_down"] = {"tv_ip": "10.0.0.250", "bridge_url": "http://127.0.0.1:9"}
+    config["groups"] = {"house": list(config["devices"])}
+
+    path = os.path.join(tempfile.mkdtemp(prefix="tv-agent-fan-out-"), "config.json")
+    with open(path, "w") as f:
+        json.dump(config, f)
+    return path
+
+
+async def run_async(node, state):
+    try:
+        start = time.perf_counter()
+        result = await node(state)
+        return (time.perf_counter() - start) * 1000, result
+    finally:
+        await close_async_client()
+
+
+def measure(node, async_node, state, concurrency):
+    devices.FANOUT_CONCURRENCY = concurrency
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        node(state)
+        sync_ms = (time.perf_counter() - start) * 1000
+        async_ms, result = asyncio.run(run_async(async_node, state))
+    return sync_ms, async_ms, result["device_results"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--devices", type=int, default=6, help="TVs in the group")
+    parser.add_argument("--latency", type=float, default=0.05, help="bridge seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.02, help="extra seconds per request for each further TV")
+    parser.add_argument("--down", action="store_true", help="add a TV whose bridge is unreachable")
+    args = parser.parse_args()
+
+    bridges = [bridge_server(args.latency + i * args.jitter) for i in range(args.devices)]
+    devices.CONFIG_PATH = write_config(bridges, args.down)
+
+    # The router picks the group off the command
+    with contextlib.redirect_stdout(io.StringIO()):
+        routed = intent_router({"current_task": "volume up 3 times on the house"})
+    print(f"routed 'volume up 3 times on the house' -> {routed['target_devices']}, {routed['key_macro']}")
+
+    key_state = {**routed, "task_number": 0}
+    link_state = {"app_link": LINK, "target_devices": ["house"], "task_number": 0}
+    concurrency = max(args.devices + args.down, 1)
+
+    try:
+        for name, node, async_node, state in (
+            ("keys (volume up x3)", send_key.sendCode, send_key.sendCodeAsync, key_state),
+            ("app link", send_link.sendLink, send_link.sendLinkAsync, link_state),
+        ):
+            print(f"\n{name} to {args.devices + args.down} TVs")
+            rows = {mode: measure(node, async_node, state, limit) for mode, limit in (("one by one", 1), ("fan-out", concurrency))}
+            for mode, (sync_ms, async_ms, results) in rows.items():
+                print(f"    {mode:10} sync {sync_ms:7.0f} ms   async {async_ms:7.0f} ms"
+                      f"   ({rows['one by one'][1] / async_ms:.1f}x)")
+
+            print("    per device (fan-out, async)")
+            for result in rows["fan-out"][2]:
+                icon = "✅" if result["status"] == "success" else "❌"
+                print(f"      {icon} {result['device']:8} {result['latency_ms']:7.1f} ms {result['error'] or ''}")
+    finally:
+        for bridge in bridges:
+            bridge.close()
+
+
+if __name__ == "__main__":
+    main()
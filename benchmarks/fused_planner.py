@@ -0,0 +1,68 @@
+"""
+Model latency per command with and without the fused planner.
+
+Run from the repository root:
+
+    python -m benchmarks.fused_planner --latency 0.3
+
+Groq is replaced by a local stand-in that sleeps `--latency` seconds per
+call, so the numbers reflect how many sequential LLM round trips each
+mode makes. Only the LLM nodes of each plan are executed.
+"""
+import argparse
+import time
+
+from model.groq_model import set_backend
+import agent_tools.planner as planner_module
+from agent_tools.planner import planner
+from agent_tools.get_key import get_key
+from agent_tools.set_show import setShowName
+from agent_tools.get_youtube_query import get_youtube_query
+from benchmarks.standins import CORPUS, StandInBackend
+
+LLM_NODES = {"get_key": get_key, "set_show_name": setShowName, "get_youtube_query": get_youtube_query}
+
+
+def run_command(task):
+    state = {"current_task": task, "task_number": 0}
+    state.update(planner(state))
+    for edge in state["edges"]:
+        if edge in LLM_NODES:
+            state.update(LLM_NODES[edge](state))
+    return state
+
+
+def run_mode(fused, llm):
+    planner_module.FUSED_PLANNER = fused
+    results = []
+    for entry in CORPUS:
+        calls = llm.calls
+        start = time.perf_counter()
+        run_command(entry["task"])
+        results.append((entry["task"], (time.perf_counter() - start) * 1000, llm.calls - calls))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds per stand-in LLM call")
+    args = parser.parse_args()
+
+    llm = StandInBackend(latency=args.latency)
+    set_backend(llm)
+    planner_module.PLAN_CACHE_ENABLED = False
+
+    unfused = run_mode(False, llm)
+    fused = run_mode(True, llm)
+
+    print(f"\n{'task':<42}{'unfused':>16}{'fused':>16}")
+    for (task, u_ms, u_calls), (_, f_ms, f_calls) in zip(unfused, fused):
+        print(f"{task:<42}{u_ms:>9.0f} ms ({u_calls}){f_ms:>9.0f} ms ({f_calls})")
+
+    u_total = sum(r[1] for r in unfused)
+    f_total = sum(r[1] for r in fused)
+    print(f"{'total':<42}{u_total:>12.0f} ms{f_total:>13.0f} ms   ({u_total / f_total:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
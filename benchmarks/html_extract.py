@@ -0,0 +1,57 @@
+"""
+movie-map page parsing: full BeautifulSoup tree vs targeted div#gnodMap extraction.
+
+Run from the repository root:
+
+    python -m benchmarks.html_extract --repeat 200
+
+Runs over the saved pages in benchmarks/fixtures/movie_map and checks that
+both parsers return the same titles in the same order before timing them.
+"""
+import argparse
+import glob
+import os
+import statistics
+import time
+
+from agent_tools.get_recommendations import parse_recommendations, parse_recommendations_soup
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "movie_map")
+
+# Title each saved page is the map of
+SHOWS = {"inception": "Inception", "stranger-things": "Stranger Things", "edge-cases": "Inception"}
+
+
+def per_call_ms(parse, html, show, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse(html, show)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=200, help="parses per fixture and parser")
+    args = parser.parse_args()
+
+    print(f"{'fixture':18} {'kB':>6} {'titles':>6} {'soup ms':>9} {'targeted ms':>12} {'speedup':>8}")
+    for path in sorted(glob.glob(os.path.join(FIXTURES, "*.html"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        show = SHOWS.get(name, name)
+
+        expected = parse_recommendations_soup(html, show)
+        actual = parse_recommendations(html, show)
+        if actual != expected:
+            raise SystemExit(f"❌ {name}: targeted extraction differs from BeautifulSoup\n  {actual}\n  {expected}")
+
+        soup_ms = per_call_ms(parse_recommendations_soup, html, show, args.repeat)
+        fast_ms = per_call_ms(parse_recommendations, html, show, args.repeat)
+        print(f"{name:18} {len(html) / 1024:6.1f} {len(actual):6} {soup_ms:9.3f} {fast_ms:12.3f} {soup_ms / fast_ms:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Key delivery latency: fixed-delay presses vs paced presses vs one batch.
+
+Run from the repository root:
+
+    python -m benchmarks.key_delivery --latency 0.01 --key-latency 0.02
+
+Every mode goes to a local stand-in bridge.
+
+  fixed     one /send-key request per press, 0.5 s between presses
+  paced     one /send-key request per press, gap learned from the acks
+  batch     one /send-keys request, the bridge paces the presses
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+
+import agent_tools.send_key as send_key
+from agent_tools.http_client import close_async_client
+from agent_tools.key_macro import KeyPacer
+from benchmarks.standins import bridge_server
+
+MACROS = {
+    "volume up x1": [{"command": "KEYCODE_VOLUME_UP", "repeat": 1}],
+    "volume up x3": [{"command": "KEYCODE_VOLUME_UP", "repeat": 3}],
+    "volume up x10": [{"command": "KEYCODE_VOLUME_UP", "repeat": 10}],
+    "right x2, down, select": [
+        {"command": "KEYCODE_DPAD_RIGHT", "repeat": 2},
+        {"command": "KEYCODE_DPAD_DOWN", "repeat": 1},
+        {"command": "KEYCODE_DPAD_CENTER", "repeat": 1},
+    ],
+}
+
+
+def set_mode(mode):
+    fixed = send_key.KEY_DELAY_SEC * 1000
+    send_key.BATCH_KEYS = mode == "batch"
+    if mode == "fixed":
+        send_key.pacer = KeyPacer(initial_ms=fixed, max_ms=fixed, min_ms=fixed)
+    else:
+        send_key.pacer = KeyPacer(initial_ms=send_key.KEY_INTERVAL_MS, max_ms=fixed)
+
+
+async def run_async(state):
+    try:
+        start = time.perf_counter()
+        await send_key.sendCodeAsync(state)
+        return (time.perf_counter() - start) * 1000
+    finally:
+        await close_async_client()
+
+
+def measure(bridge, mode, steps):
+    set_mode(mode)
+    state = {"key_macro": steps, "task_number": 0}
+    requests_before = bridge.requests
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        send_key.sendCode(state)
+        sync_ms = (time.perf_counter() - start) * 1000
+        async_ms = asyncio.run(run_async(state))
+    return sync_ms, async_ms, (bridge.requests - requests_before) // 2, send_key.pacer.gap_ms()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.01, help="bridge seconds per request")
+    parser.add_argument("--key-latency", type=float, default=0.02, help="bridge seconds per injected press")
+    args = parser.parse_args()
+
+    bridge = bridge_server(args.latency, args.key_latency)
+    send_key.API_BASE_URL = bridge.url
+
+    try:
+        for name, steps in MACROS.items():
+            print(f"\n{name}")
+            rows = {mode: measure(bridge, mode, steps) for mode in ("fixed", "paced", "batch")}
+            for mode, (sync_ms, async_ms, requests, gap) in rows.items():
+                print(f"    {mode:6} sync {sync_ms:7.0f} ms   async {async_ms:7.0f} ms   {requests:2} requests"
+                      f"   gap {gap:4.0f} ms   ({rows['fixed'][0] / sync_ms:.1f}x)")
+    finally:
+        bridge.close()
+
+
+if __name__ == "__main__":
+    main()
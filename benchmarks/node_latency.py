@@ -0,0 +1,91 @@
+"""
+Per-node LLM setup latency: legacy per-call construction vs the shared runtime.
+
+Run from the repository root:
+
+    python -m benchmarks.node_latency            # setup cost only, no network
+    python -m benchmarks.node_latency --live     # full node calls against Groq
+
+The legacy path rebuilds what every node used to build on each call: a
+ChatGroq client, the Pydantic output class, a PydanticOutputParser and a
+PromptTemplate with its format instructions.
+"""
+import argparse
+import os
+import statistics
+import time
+
+from langchain_groq import ChatGroq
+from langchain_core.prompts import PromptTemplate
+from langchain_core.output_parsers import PydanticOutputParser
+from pydantic import create_model
+
+from model.groq_model import CHAINS, get_llm, warm_up
+import agent_tools.planner  # noqa: F401  (registers chains)
+import agent_tools.get_key  # noqa: F401
+import agent_tools.get_youtube_query  # noqa: F401
+import agent_tools.set_show  # noqa: F401
+
+TASKS = {
+    "planner": "increase volume 3 times",
+    "get_key": "increase volume 3 times",
+    "get_youtube_query": "play romantic songs",
+    "set_show_name": "i want to watch stranger things",
+}
+
+
+def legacy_call(chain, task, live):
+    llm = ChatGroq(model=chain.model)
+    schema = chain.parser.pydantic_object
+    fields = {name: (field.annotation, field) for name, field in schema.model_fields.items()}
+    per_call_schema = create_model(schema.__name__, **fields)
+    parser = PydanticOutputParser(pydantic_object=per_call_schema)
+    template = PromptTemplate(
+        template=chain.prompt.template,
+        input_variables=["task", "format_instructions"],
+        partial_variables={"format_instructions": parser.get_format_instructions()},
+    )
+    prompt = template.invoke({"task": task})
+    if live:
+        parser.parse(llm.invoke(prompt).content)
+
+
+def runtime_call(chain, task, live):
+    if live:
+        chain.invoke(task=task)
+    else:
+        chain.prompt.invoke({"task": task})
+        get_llm(chain.model)
+
+
+def measure(fn, chain, task, live, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(chain, task, live)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--live", action="store_true", help="include the Groq round trip")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    if not args.live:
+        # ChatGroq refuses to construct without a key; nothing is sent in this mode
+        os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+
+    warm_up(ping=args.live)
+
+    print(f"{'node':<20}{'before (ms)':>14}{'after (ms)':>14}{'saved':>10}")
+    for name, chain in CHAINS.items():
+        task = TASKS.get(name, "increase volume 3 times")
+        before = measure(legacy_call, chain, task, args.live, args.runs)
+        after = measure(runtime_call, chain, task, args.live, args.runs)
+        print(f"{name:<20}{before:>14.2f}{after:>14.2f}{before - after:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
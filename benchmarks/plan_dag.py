@@ -0,0 +1,74 @@
+"""
+Multi-step plan latency with linear vs dependency-DAG execution.
+
+Run from the repository root:
+
+    python -m benchmarks.plan_dag --latency 0.2
+
+Every plan node is replaced by a local stand-in that sleeps `--latency`
+seconds and writes the keys the real node writes, so the numbers only
+reflect how the graph schedules the steps.
+"""
+import argparse
+import asyncio
+import time
+
+import agent_tools.plan_dag as plan_dag
+from agent_tools.plan_dag import NODE_IO, plan_levels
+from main import build_graph
+
+PLANS = [
+    ["set_show_name", "get_platform", "get_recommendations"],
+    ["set_show_name", "get_youtube_query", "get_platform", "get_youtube_link", "send_link"],
+    ["set_show_name", "get_recommendations", "get_platform", "send_link"],
+    ["get_youtube_query", "get_youtube_link", "send_link"],
+]
+
+
+def stand_in(name, latency):
+    writes = NODE_IO[name][1]
+
+    async def node(state):
+        await asyncio.sleep(latency)
+        return {**{key: f"{name}:{key}" for key in writes if key != "repeat"}, 'task_number': state['task_number'] + 1}
+
+    return node
+
+
+async def run(app, edges):
+    start = time.perf_counter()
+    # "edges" in the input state skips the planner and goes straight to dispatch
+    await app.ainvoke({"current_task": "benchmark plan", "task_number": 0, "edges": edges})
+    return (time.perf_counter() - start) * 1000
+
+
+async def compare(app):
+    rows = []
+    for edges in PLANS:
+        plan_dag.PARALLEL_PLAN = False
+        linear = await run(app, edges)
+        plan_dag.PARALLEL_PLAN = True
+        parallel = await run(app, edges)
+        rows.append((edges, linear, parallel))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per stand-in node")
+    args = parser.parse_args()
+
+    app = build_graph(nodes={name: stand_in(name, args.latency) for name in NODE_IO})
+
+    rows = asyncio.run(compare(app))
+
+    print()
+    for edges, linear, parallel in rows:
+        print(" -> ".join(edges))
+        print(f"    levels   {plan_levels(edges)}")
+        print(f"    linear   {linear:7.0f} ms")
+        print(f"    dag      {parallel:7.0f} ms   ({linear / parallel:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
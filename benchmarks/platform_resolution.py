@@ -0,0 +1,85 @@
+"""
+Platform resolution for a recommendation list: title by title vs concurrent lookups.
+
+Run from the repository root:
+
+    python -m benchmarks.platform_resolution --titles 10 --unavailable 5 --latency 0.4
+
+The recommendations are stand-in titles, the first `--unavailable` of them
+without streaming offers, and JustWatch is a stand-in that answers after
+`--latency` seconds. The JustWatch cache is off so every run searches.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+
+import agent_tools.get_platform as get_platform
+
+TITLES = [
+    "Dark", "The OA", "Black Mirror", "Sense8", "Mindhunter", "Ozark", "Narcos",
+    "The Umbrella Academy", "Locke & Key", "The Witcher", "Lost", "Fringe",
+]
+
+
+async def run_async(node, state):
+    # Timed inside the loop: asyncio.run() waits for the losing lookups' threads on exit
+    start = time.perf_counter()
+    result = await node(state)
+    return (time.perf_counter() - start) * 1000, result
+
+
+def measure(node, state, concurrency, latency):
+    get_platform.PLATFORM_CONCURRENCY = concurrency
+    # Let lookups left running by the previous run finish before counting searches
+    time.sleep(latency + 0.1)
+    get_platform.search.calls = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            if asyncio.iscoroutinefunction(node):
+                ms, result = asyncio.run(run_async(node, state))
+            else:
+                start = time.perf_counter()
+                result = node(state)
+                ms = (time.perf_counter() - start) * 1000
+            picked = result["playing_title"]
+        except Exception as e:
+            ms, picked = float("nan"), f"{type(e).__name__}: {e}"
+        calls = get_platform.search.calls
+    return ms, calls, picked
+
+
+def main():
+    from benchmarks.standins import justwatch_search
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--titles", type=int, default=10, help="recommended titles")
+    parser.add_argument("--unavailable", type=int, default=5, help="leading titles without streaming offers")
+    parser.add_argument("--latency", type=float, default=0.4, help="seconds per JustWatch search")
+    args = parser.parse_args()
+
+    titles = TITLES[:args.titles]
+    get_platform.search = justwatch_search(args.latency, unavailable=titles[:args.unavailable])
+    get_platform.PLATFORM_CACHE_ENABLED = False
+    get_platform.PLATFORM_MAX_TITLES = len(titles)
+
+    state = {"target_show_name": titles[0], "recommendations": titles, "task_number": 0}
+    print(f"{len(titles)} recommendations, {args.unavailable} without offers, {args.latency * 1000:.0f} ms per search")
+
+    for label, node in (("sync", get_platform.get_tvshow_plattform), ("async", get_platform.get_tvshow_plattform_async)):
+        print(f"\n{label}")
+        baseline = None
+        for concurrency in (1, 4, 8):
+            ms, calls, picked = measure(node, state, concurrency, args.latency)
+            baseline = baseline or ms
+            print(f"    concurrency {concurrency}   {ms:7.0f} ms   {calls:2} searches started   picked {picked}   ({baseline / ms:.1f}x)")
+
+    # Used to crash on final_results[0]['available_platforms'][0]
+    get_platform.search = justwatch_search(args.latency, unavailable=titles)
+    ms, calls, picked = measure(get_platform.get_tvshow_plattform, state, 4, args.latency)
+    print(f"\nno title streaming anywhere: {calls} searches -> {picked}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Per-command connect vs a kept-open remote session, against a fake TV.
+
+Run from the repository root:
+
+    python -m benchmarks.remote_session --commands 5
+
+"per command" is the old connect_to_tv flow: new AndroidTVRemote, TLS
+connect, 1 s stabilization sleep, send, disconnect. "managed" goes through
+agent_tools.tv_remote.RemoteManager. The run ends by dropping the fake TV's
+connections and checking the manager recovers on its own.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+
+import agent_tools.send_key as send_key
+import agent_tools.send_link as send_link
+from agent_tools.tv_remote import RemoteManager
+from androidtvremote2 import AndroidTVRemote
+from benchmarks.fake_remote import FakeAndroidTV, client_cert_pair
+
+# Stabilization sleep of the old connect_to_tv
+LEGACY_SETTLE_SEC = 1.0
+
+STATE = {"key_macro": [{"command": "KEYCODE_VOLUME_UP", "repeat": 3}], "app_link": "https://www.netflix.com/title/80057281", "task_number": 0}
+
+
+def write_config(tv, certfile, keyfile):
+    path = os.path.join(tempfile.mkdtemp(prefix="fake-tv-config-"), "config.json")
+    with open(path, "w") as f:
+        json.dump({"tv_ip": "127.0.0.1", "api_port": tv.port, "certfile": certfile, "keyfile": keyfile, "client_name": "tv-agent-bench"}, f)
+    return path
+
+
+async def legacy_command(tv, certfile, keyfile, settle):
+    remote = AndroidTVRemote("tv-agent-bench", certfile, keyfile, "127.0.0.1", api_port=tv.port, enable_ime=False)
+    await remote.async_connect()
+    await asyncio.sleep(settle)
+    try:
+        for _ in range(3):
+            remote.send_key_command("KEYCODE_VOLUME_UP")
+            await asyncio.sleep(send_key.pacer.gap_ms() / 1000)
+    finally:
+        remote.disconnect()
+
+
+async def run_legacy(tv, certfile, keyfile, commands, settle):
+    times = []
+    for _ in range(commands):
+        start = time.perf_counter()
+        await legacy_command(tv, certfile, keyfile, settle)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+async def run_managed(commands):
+    times = []
+    for _ in range(commands):
+        start = time.perf_counter()
+        await send_key.sendCodeAsync(STATE)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--commands", type=int, default=5, help="key commands per mode")
+    parser.add_argument("--settle", type=float, default=LEGACY_SETTLE_SEC, help="legacy stabilization sleep in seconds")
+    args = parser.parse_args()
+
+    tv = FakeAndroidTV().start()
+    certfile, keyfile = client_cert_pair()
+    manager = RemoteManager(write_config(tv, certfile, keyfile))
+    send_key.TV_TRANSPORT = send_link.TV_TRANSPORT = "remote"
+    send_key.remote_manager = send_link.remote_manager = manager
+
+    try:
+        legacy = asyncio.run(run_legacy(tv, certfile, keyfile, args.commands, args.settle))
+        connects_before = tv.connects
+        with contextlib.redirect_stdout(io.StringIO()):
+            managed = asyncio.run(run_managed(args.commands))
+        managed_connects = tv.connects - connects_before
+
+        print(f"\n{args.commands} commands of 3 key presses")
+        print(f"    per command   mean {sum(legacy) / len(legacy):7.0f} ms   first {legacy[0]:6.0f} ms   {args.commands} connects")
+        print(f"    managed       mean {sum(managed) / len(managed):7.0f} ms   first {managed[0]:6.0f} ms   {managed_connects} connects"
+              f"   ({sum(legacy) / sum(managed):.1f}x)")
+
+        # The TV goes away; the next commands must get through without a restart
+        tv.drop_connections()
+        time.sleep(0.5)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            send_key.sendCode(STATE)
+            send_link.sendLink(STATE)
+        print(f"\nafter dropping the connection: sent in {(time.perf_counter() - start) * 1000:.0f} ms"
+              f" | fake TV connects {tv.connects} | session {manager.stats()}")
+        print(f"fake TV received {len(tv.keys)} key presses and {len(tv.links)} app links")
+    finally:
+        manager.close()
+        tv.close()
+
+
+if __name__ == "__main__":
+    main()
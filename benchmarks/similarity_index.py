@@ -0,0 +1,87 @@
+"""
+get_recommendations latency: live movie-map scrape vs the local similarity index.
+
+Run from the repository root:
+
+    python -m benchmarks.similarity_index --latency 0.2 --snapshot-titles 20000
+
+movie-map is a local stand-in answering after `--latency` seconds; the index
+lives in a scratch directory.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import agent_tools.get_recommendations as get_recommendations
+from agent_tools.similarity_index import SimilarityIndex
+from benchmarks.standins import SIMILAR_TITLES, movie_map_server
+
+
+def timed(show_name, rounds=1):
+    samples = []
+    for _ in range(rounds):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            get_recommendations.get_recommendations({"show_name": show_name, "task_number": 0})
+            samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per movie-map page")
+    parser.add_argument("--snapshot-titles", type=int, default=20000, help="titles in the imported snapshot")
+    args = parser.parse_args()
+
+    server = movie_map_server(args.latency)
+    get_recommendations.MOVIE_MAP_URL = server.url
+    scratch = tempfile.mkdtemp(prefix="tv-agent-similar-")
+    index = get_recommendations.similarity_index = SimilarityIndex(path=os.path.join(scratch, "similar.sqlite"))
+
+    try:
+        get_recommendations.SIMILAR_INDEX_ENABLED = False
+        live = timed("Inception", rounds=3)
+        get_recommendations.SIMILAR_INDEX_ENABLED = True
+
+        cold = timed("Inception")
+        requests_before = server.requests
+        warm = timed("Inception", rounds=20)
+        print(f"live scrape        {live:8.2f} ms")
+        print(f"unknown title      {cold:8.2f} ms   (scrapes, then indexes)")
+        print(f"indexed title      {warm:8.2f} ms   ({live / warm:.0f}x, {server.requests - requests_before} requests)")
+
+        # An expired entry is served at once and re-scraped off the request path
+        index.max_age = 0
+        stale = timed("Inception")
+        time.sleep(args.latency * 2)
+        print(f"stale title        {stale:8.2f} ms   (background refreshes: {get_recommendations.refresher.refreshed})")
+        index.max_age = 14 * 24 * 3600
+
+        snapshot = {f"Title {i}": [f"Title {(i + j) % args.snapshot_titles}" for j in range(1, 11)] for i in range(args.snapshot_titles)}
+        snapshot["Memento"] = SIMILAR_TITLES
+        snapshot_path = os.path.join(scratch, "snapshot.json")
+        with open(snapshot_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+
+        start = time.perf_counter()
+        count = index.import_snapshot(snapshot_path)
+        print(f"\nsnapshot import    {(time.perf_counter() - start) * 1000:8.0f} ms   ({count} titles)")
+
+        start = time.perf_counter()
+        reopened = SimilarityIndex(path=index.path)
+        print(f"reopen index       {(time.perf_counter() - start) * 1000:8.0f} ms   ({len(reopened)} titles)")
+
+        requests_before = server.requests
+        print(f"snapshot title     {timed('Memento', rounds=20):8.2f} ms   ({server.requests - requests_before} requests)")
+        print(f"\n{json.dumps(index.stats())}")
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Time-to-play for YouTube commands with and without the speculative search.
+
+Run from the repository root:
+
+    python -m benchmarks.speculative_youtube --llm-latency 0.3 --youtube-latency 0.4
+
+Each command goes through the compiled graph (router, planner, query
+rewrite, search, send_link) with the LLM, YouTube and the TV bridge replaced
+by local stand-ins; time-to-play is the time until the link reached the bridge.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import statistics
+import time
+
+import agent_tools.get_youtube_link as get_youtube_link
+import agent_tools.planner as planner
+import agent_tools.send_link as send_link
+from agent_tools.http_client import close_async_client
+from benchmarks.standins import CORPUS, StandInBackend, bridge_server, youtube_server
+from main import build_graph
+from model.groq_model import set_backend
+
+YOUTUBE_EDGES = ["get_youtube_query", "get_youtube_link", "send_link"]
+
+# Commands whose llm query differs from the raw task, on top of the CORPUS ones
+EXTRA = [
+    # Top hit of "that song shape of you" is titled with every word of "shape of you"
+    {"task": "play that song shape of you", "edges": YOUTUBE_EDGES, "youtube_query": "shape of you"},
+    # Nothing in common, the speculative result is thrown away
+    {"task": "put on something relaxing for studying", "edges": YOUTUBE_EDGES, "youtube_query": "lofi study music"},
+]
+
+
+async def time_to_play(app, task, rounds):
+    samples = []
+    for _ in range(rounds):
+        # Every command searches, as on a first request
+        get_youtube_link.youtube_cache.clear()
+        start = time.perf_counter()
+        await app.ainvoke({"current_task": task, "task_number": 0})
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+async def run(app, tasks, rounds):
+    try:
+        return {task: await time_to_play(app, task, rounds) for task in tasks}
+    finally:
+        await close_async_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="seconds per LLM call")
+    parser.add_argument("--youtube-latency", type=float, default=0.4, help="seconds per YouTube search")
+    args = parser.parse_args()
+
+    CORPUS.extend(EXTRA)
+    tasks = [entry["task"] for entry in CORPUS if entry["edges"] == YOUTUBE_EDGES]
+
+    set_backend(StandInBackend(latency=args.llm_latency))
+    bridge = bridge_server(0.01)
+    youtube = youtube_server(args.youtube_latency)
+    send_link.API_BASE_URL = bridge.url
+    get_youtube_link.YOUTUBE_URL = youtube.url
+    planner.PLAN_CACHE_ENABLED = False
+    app = build_graph()
+
+    results = {}
+    try:
+        for speculative in (False, True):
+            get_youtube_link.SPECULATIVE_YOUTUBE = speculative
+            with contextlib.redirect_stdout(io.StringIO()):
+                results[speculative] = asyncio.run(run(app, tasks, args.rounds))
+    finally:
+        bridge.close()
+        youtube.close()
+
+    print(f"time-to-play p50 (ms), llm {args.llm_latency * 1000:.0f} ms, search {args.youtube_latency * 1000:.0f} ms\n")
+    print(f"  {'command':42} {'off':>8} {'on':>8}")
+    for task in tasks:
+        off, on = results[False][task], results[True][task]
+        print(f"  {task:42} {off:8.0f} {on:8.0f}   ({off / on:.2f}x)")
+    print(f"\nspeculation {get_youtube_link.speculation_stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+SSDP discovery: every search target from one socket in one MX window, and
+UPnP descriptions fetched once per location, parsed only up to friendlyName.
+
+Run from the repository root:
+
+    python -m benchmarks.ssdp_discovery --repeats 2 --bandwidth 200000
+
+A stand-in responder (benchmarks.standins.SsdpResponder) joins the real
+multicast group and answers as a few TVs would: every supported search
+target, `--repeats` times each, spread over the search's MX, with a UPnP
+description behind every LOCATION. Searching one target at a time used to
+wait discovery_timeout (5 s) per target.
+"""
+import argparse
+import contextlib
+import io
+import statistics
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+import requests
+
+import setup.test as discovery_module
+from benchmarks.standins import SSDP_TVS, SsdpResponder, StandInServer, upnp_description
+from setup.test import DescriptionCache, SmartTVDiscovery
+
+NAMESPACE = "{urn:schemas-upnp-org:device-1-0}"
+
+
+def search(discovery, responder):
+    fetched = responder.descriptions_served()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()) as log:
+        discovery.send_ssdp_discovery()
+    elapsed = time.perf_counter() - start
+    # Replies still in flight when the window closed
+    time.sleep(0.2)
+    return elapsed, responder.descriptions_served() - fetched, log.getvalue()
+
+
+def full_parse(location):
+    # What get_name_from_location did: a fresh connection, the whole body, a whole tree
+    response = requests.get(location, timeout=10)
+    return ET.fromstring(response.text).find(f".//{NAMESPACE}friendlyName").text.strip(), len(response.content)
+
+
+def streamed_parse(cache, location):
+    cache.entries.clear()
+    with cache.session.get(location, timeout=10, stream=True) as response:
+        name = discovery_module.read_friendly_name(response)
+        read = response.raw.tell()
+    return name, read
+
+
+def median_ms(fn, rounds):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeats", type=int, default=2, help="replies per device and search target")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds a description takes to serve")
+    parser.add_argument("--bandwidth", type=float, default=200_000, help="description bytes per second, parse section")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    targets = len(discovery_module.SSDP_SEARCH_TARGETS)
+    print(f"{targets} search targets, MX {discovery_module.SSDP_MX} s, {len(SSDP_TVS)} TVs\n")
+
+    responder = SsdpResponder(repeats=args.repeats, latency=args.latency)
+    try:
+        discovery = SmartTVDiscovery()
+        for run in (1, 2):
+            replies = responder.replies
+            elapsed, fetched, log = search(discovery, responder)
+            print(f"  search {run}   {elapsed:5.2f} s   (one target at a time: {targets * 5} s)   "
+                  f"{responder.replies - replies} replies   {fetched} descriptions fetched")
+        print(f"  descriptions {discovery.descriptions.stats}\n")
+
+        found = {ip: device["name"] for ip, device in discovery.registry.devices.items()}
+        for ip, (name, _) in SSDP_TVS.items():
+            print(f"  {'•' if found.get(ip) == name else '❌'} {name} ({ip})")
+        if any(found.get(ip) != name for ip, (name, _) in SSDP_TVS.items()):
+            raise SystemExit(f"\n❌ Not every stand-in TV was found\n{log}")
+    finally:
+        responder.close()
+
+    # A slow description server: one download shared by concurrent lookups, and parsing that stops early
+    # A media server's description, listing many services
+    description = upnp_description("Bedroom TV", services=250)
+    server = StandInServer({("GET", "/description.xml"): description}, args.latency, bandwidth=args.bandwidth)
+    location = f"{server.url}/description.xml"
+    try:
+        cache = DescriptionCache(timeout=10)
+        served = server.requests
+        threads = [threading.Thread(target=cache.lookup, args=(location,)) for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        print(f"\n  16 concurrent lookups of one location: {server.requests - served} download(s), {cache.stats}")
+
+        full_ms, (full_name, full_bytes) = median_ms(lambda: full_parse(location), args.rounds)
+        stream_ms, (stream_name, stream_bytes) = median_ms(lambda: streamed_parse(cache, location), args.rounds)
+        assert full_name == stream_name == "Bedroom TV", (full_name, stream_name)
+        print(f"  full download + parse   {full_ms:7.1f} ms   {full_bytes / 1024:5.1f} kB")
+        print(f"  streamed to friendlyName {stream_ms:6.1f} ms   {stream_bytes / 1024:5.1f} kB   ({full_ms / stream_ms:.1f}x)")
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,512 @@
+"""
+Local stand-ins for the services the agent talks to, with configurable latency.
+"""
+import asyncio
+import contextlib
+import json
+import random
+import socket
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from model.llm_backend import prompt_to_text
+
+# Representative commands and the answers a well-behaved model gives for them
+CORPUS = [
+    {"task": "volume up 3 times", "edges": ["get_key", "send_code"], "command": "KEYCODE_VOLUME_UP", "repeat": 3},
+    {"task": "mute the tv", "edges": ["get_key", "send_code"], "command": "KEYCODE_MUTE", "repeat": 1},
+    {"task": "go back", "edges": ["get_key", "send_code"], "command": "KEYCODE_BACK", "repeat": 1},
+    {"task": "watch stranger things", "edges": ["set_show_name", "get_platform", "send_link"], "show_name": "Stranger Things"},
+    {"task": "i want to watch the office", "edges": ["set_show_name", "get_platform", "send_link"], "show_name": "The Office"},
+    {"task": "show me something similar to inception", "edges": ["set_show_name", "get_recommendations", "get_platform", "send_link"], "show_name": "Inception"},
+    {"task": "play romantic songs", "edges": ["get_youtube_query", "get_youtube_link", "send_link"], "youtube_query": "romantic songs"},
+    {"task": "play the avengers endgame trailer", "edges": ["get_youtube_query", "get_youtube_link", "send_link"], "youtube_query": "avengers endgame trailer"},
+]
+
+
+def find_entry(prompt):
+    # Longest task first so "go back" does not shadow a longer command containing it
+    for entry in sorted(CORPUS, key=lambda e: len(e["task"]), reverse=True):
+        if entry["task"] in prompt:
+            return entry
+    raise KeyError(f"No stand-in answer for prompt: {prompt[:80]!r}")
+
+
+def answer(prompt):
+    """Returns the JSON a model would produce for one of the agent prompts."""
+    entry = find_entry(prompt)
+
+    if "along with the plan also fill" in prompt:
+        return {
+            "edges": entry["edges"],
+            "key_macro": [{"command": entry["command"], "repeat": entry.get("repeat", 1)}] if "command" in entry else None,
+            "show_name": entry.get("show_name"),
+            "youtube_query": entry.get("youtube_query"),
+        }
+    if "goal oriented remote control agent" in prompt:
+        return {"edges": entry["edges"]}
+    if "valid key code" in prompt:
+        return {"steps": [{"command": entry["command"], "repeat": entry.get("repeat", 1)}]}
+    if "movie or tv show name" in prompt:
+        return {"showName": entry["show_name"]}
+    if "youtube query" in prompt:
+        return {"query": entry["youtube_query"]}
+    raise KeyError(f"Unknown prompt kind: {prompt[:80]!r}")
+
+
+class StandInBackend:
+    """
+    LLM backend that answers agent prompts from CORPUS with no network.
+
+    Each call takes `latency` seconds in total; streamed answers deliver the
+    first chunk after `first_token` seconds and spread the rest evenly.
+    """
+
+    mode = "replay"
+
+    def __init__(self, latency=0.3, first_token=0.05, chunk_size=8):
+        self.latency = latency
+        self.first_token = min(first_token, latency)
+        self.chunk_size = chunk_size
+        self.calls = 0
+
+    def complete(self, model, prompt):
+        self.calls += 1
+        time.sleep(self.latency)
+        return json.dumps(answer(prompt_to_text(prompt)))
+
+    def chunks(self, prompt):
+        text = json.dumps(answer(prompt_to_text(prompt)))
+        return [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+
+    def stream(self, model, prompt):
+        self.calls += 1
+        chunks = self.chunks(prompt)
+        time.sleep(self.first_token)
+        for chunk in chunks:
+            yield chunk
+            time.sleep((self.latency - self.first_token) / len(chunks))
+
+    async def acomplete(self, model, prompt):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return json.dumps(answer(prompt_to_text(prompt)))
+
+    async def astream(self, model, prompt):
+        self.calls += 1
+        chunks = self.chunks(prompt)
+        await asyncio.sleep(self.first_token)
+        for chunk in chunks:
+            yield chunk
+            await asyncio.sleep((self.latency - self.first_token) / len(chunks))
+
+
+# Titles the movie-map stand-in lists as similar to any show
+SIMILAR_TITLES = ["Interstellar", "Tenet", "The Prestige", "Memento", "Shutter Island"]
+
+
+class StandInServer:
+    """
+    Local HTTP server on a free port that answers after `latency` seconds.
+
+    `routes` maps (method, path) to a function of the request path and body
+    returning (status, content type, body bytes); a path ending in "/"
+    matches everything below it, the query string is ignored. With
+    `bandwidth` (bytes per second) the body is sent in paced chunks.
+    `host` can be any 127.x.y.z address to stand in for another machine.
+    """
+
+    def __init__(self, routes, latency=0.0, port=0, bandwidth=None, host="127.0.0.1"):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.requests = 0
+        self.bytes_sent = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def handle_route(self, method):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                server.requests += 1
+                time.sleep(server.latency)
+                path = self.path.split("?")[0]
+                for (route_method, route_path), route in routes.items():
+                    matches = path.startswith(route_path) if route_path.endswith("/") else path == route_path
+                    if route_method == method and matches:
+                        status, content_type, payload = route(self.path, body)
+                        break
+                else:
+                    status, content_type, payload = 404, "text/plain", b"not found"
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.write_body(payload)
+
+            def write_body(self, payload):
+                chunk = 16 * 1024 if server.bandwidth else len(payload) or 1
+                try:
+                    for i in range(0, len(payload), chunk):
+                        if server.bandwidth:
+                            time.sleep(chunk / server.bandwidth)
+                        self.wfile.write(payload[i:i + chunk])
+                        server.bytes_sent += len(payload[i:i + chunk])
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client stopped reading early
+                    self.close_connection = True
+
+            def handle(self):
+                try:
+                    super().handle()
+                except ConnectionResetError:
+                    # The client dropped a connection it had stopped reading
+                    pass
+
+            def do_GET(self):
+                self.handle_route("GET")
+
+            def do_POST(self):
+                self.handle_route("POST")
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def ok_json(path, body):
+    return 200, "application/json", b'{"status": "ok"}'
+
+
+def bridge_server(latency=0.0, key_latency=0.0, port=0):
+    """
+    Stand-in for the localhost:3000 TV bridge.
+
+    `latency` is paid once per request, `key_latency` once per key press the
+    bridge injects. /send-keys paces a batch itself, waiting interval_ms (or a
+    press's own delay_ms) between presses, and counts them in `server.keys`.
+    """
+    def send_key(path, body):
+        time.sleep(key_latency)
+        server.keys += 1
+        return ok_json(path, body)
+
+    def send_keys(path, body):
+        batch = json.loads(body)
+        keys = batch["keys"]
+        for i, key in enumerate(keys):
+            time.sleep(key_latency)
+            server.keys += 1
+            if i < len(keys) - 1:
+                # A press sent as an object carries its own pause
+                gap = key["delay_ms"] if isinstance(key, dict) else batch.get("interval_ms", 0)
+                time.sleep(gap / 1000)
+        return ok_json(path, body)
+
+    server = StandInServer({
+        ("POST", "/send-keys"): send_keys,
+        ("POST", "/send-key"): send_key,
+        ("POST", "/send-app"): ok_json,
+    }, latency, port)
+    server.keys = 0
+    return server
+
+
+def movie_map_page(path, body):
+    show = path.strip("/").replace("+", " ").title()
+    links = "".join(f'<a class="S" href="/{t.lower()}">{t}</a>' for t in [show] + SIMILAR_TITLES)
+    html = f'<html><body><div id="gnodMap">{links}</div></body></html>'
+    return 200, "text/html; charset=utf-8", html.encode("utf-8")
+
+
+def movie_map_server(latency=0.0):
+    """Stand-in for movie-map.com serving a similar-titles map for any show."""
+    return StandInServer({("GET", "/"): movie_map_page}, latency)
+
+
+def justwatch_entry(show_name, streaming=True):
+    """One raw search entry in the simplejustwatchapi 0.16 layout read by project_results."""
+    slug = show_name.lower().replace(" ", "-")
+    offer = [None] * 10
+    offer[8] = [None, None, None, "Netflix"]
+    offer[9] = f"https://www.netflix.com/title/{slug}"
+    entry = [None] * 19
+    entry[2], entry[3], entry[6], entry[7] = "SHOW", show_name, "2016-07-15", 50
+    entry[8], entry[12], entry[18] = f"{show_name} stand-in", "", [offer] if streaming else []
+    return entry
+
+
+def justwatch_search(latency=0.0, unavailable=()):
+    """
+    Drop-in for simplejustwatchapi.justwatch.search that sleeps `latency` seconds.
+    Titles in `unavailable` come back without streaming offers.
+    """
+    unavailable = {title.lower() for title in unavailable}
+
+    def search(title, country="US", language="en", count=4, best_only=True):
+        time.sleep(latency)
+        search.calls += 1
+        return [justwatch_entry(title, streaming=title.lower() not in unavailable)]
+    search.calls = 0
+    return search
+
+
+def youtube_video(query, i):
+    """One search result in the ytInitialData layout read by youtube_search, padded to a realistic size."""
+    slug = query.lower().replace(" ", "_")
+    return {"videoRenderer": {
+        "videoId": f"{slug}_{i}",
+        "thumbnail": {"thumbnails": [{"url": f"https://i.ytimg.com/vi/{slug}_{i}/hq{size}.jpg", "width": size, "height": size} for size in (360, 720)]},
+        "title": {"runs": [{"text": f"{query} #{i}"}], "accessibility": {"accessibilityData": {"label": f"{query} #{i} by Stand-in Channel"}}},
+        "descriptionSnippet": {"runs": [{"text": f"{query} stand-in result {i}. " * 8}]},
+        "longBylineText": {"runs": [{"text": "Stand-in Channel"}]},
+        "lengthText": {"simpleText": "3:45"},
+        "viewCountText": {"simpleText": f"{(i + 1) * 12345} views"},
+        "publishedTimeText": {"simpleText": f"{i + 1} years ago"},
+        "navigationEndpoint": {"commandMetadata": {"webCommandMetadata": {"url": f"/watch?v={slug}_{i}", "webPageType": "WEB_PAGE_TYPE_WATCH"}}},
+        "trackingParams": "x" * 2000,
+        "richThumbnail": {"movingThumbnailRenderer": {"movingThumbnailDetails": {"thumbnails": [{"url": "https://i.ytimg.com/an_webp/" + "y" * 400}] * 6}}},
+        "ownerBadges": [{"metadataBadgeRenderer": {"icon": {"iconType": "CHECK_CIRCLE_THICK"}, "tooltip": "Verified"}}],
+        "menu": {"menuRenderer": {"items": [{"menuServiceItemRenderer": {"text": {"runs": [{"text": "Add to queue"}]}, "trackingParams": "z" * 300}}] * 4}},
+    }}
+
+
+def youtube_results_page(path, body, videos=20):
+    """A YouTube results page: a large head, then ytInitialData with `videos` results, then more script."""
+    query = urllib.parse.parse_qs(urllib.parse.urlparse(path).query).get("search_query", ["stand-in"])[0]
+    contents = [{"itemSectionRenderer": {"contents": [youtube_video(query, i) for i in range(videos)]}}]
+    data = {"contents": {"twoColumnSearchResultsRenderer": {"primaryContents": {"sectionListRenderer": {"contents": contents}}}}}
+    head = "".join(f"<script>var ytcfg{i} = '{'h' * 1000}';</script>" for i in range(250))
+    tail = "".join(f"<script>var ytplayer{i} = '{'t' * 1000}';</script>" for i in range(150))
+    html = f"<!DOCTYPE html><html><head>{head}</head><body><script>var ytInitialData = {json.dumps(data, separators=(',', ':'))};</script>{tail}</body></html>"
+    return 200, "text/html; charset=utf-8", html.encode("utf-8")
+
+
+def youtube_server(latency=0.0, bandwidth=None):
+    """Stand-in for youtube.com/results, `bandwidth` bytes per second after `latency` seconds."""
+    return StandInServer({("GET", "/results"): youtube_results_page}, latency, bandwidth=bandwidth)
+
+
+def youtube_search(latency=0.0):
+    """Drop-in for youtube_search.YoutubeSearch that sleeps `latency` seconds."""
+    class YoutubeSearch:
+        def __init__(self, query, max_results=10):
+            time.sleep(latency)
+            slug = query.lower().replace(" ", "_")
+            self.videos = [{"title": f"{query} #{i}", "url_suffix": f"/watch?v={slug}_{i}"} for i in range(max_results)]
+
+        def to_dict(self, clear_cache=True):
+            return self.videos
+    return YoutubeSearch
+
+
+# Every port SmartTVDiscovery probes, across all vendors
+TV_SCAN_PORTS = [80, 1061, 3000, 3001, 3689, 5555, 6467, 7000, 8001, 8002, 8008, 8009, 8060, 8080, 8443, 9000, 26101, 32498, 36866]
+
+
+def page(body, status=200, content_type="text/html"):
+    return lambda path, request_body: (status, content_type, body.encode("utf-8"))
+
+
+# Last octet -> what the stand-in TV at that address answers: ports that accept
+# connections, and HTTP routes per port
+LAN_TVS = {
+    10: {"name": "Google TV", "open": [6467, 8009],
+         "http": {8008: {"/setup/eureka_info": page('{"name": "Living Room TV"}', content_type="application/json")}}},
+    20: {"name": "Samsung", "open": [8001, 8002], "http": {8080: {"/": page("<title>Samsung SmartView</title>")}}},
+    30: {"name": "LG webOS", "open": [], "http": {3000: {"/": page("webOS TV 6.0")}, 3001: {"/": page("webOS TV 6.0")}}},
+    40: {"name": "Roku", "open": [], "http": {8060: {"/": page("<root><device><manufacturer>Roku</manufacturer></device></root>")}}},
+    50: {"name": "Fire TV", "open": [5555], "http": {8008: {"/": page("Amazon Fire TV")}}},
+    60: {"name": "Apple TV", "open": [7000], "http": {}},
+    70: {"name": "Chromecast", "open": [8009],
+         "http": {8008: {"/": page("Chromecast"), "/setup/eureka_info": page("not json"), "/setup/offer": page("{}")}}},
+}
+
+
+class StandInLan:
+    """
+    A /24 of stand-in TVs on loopback, where every 127.x.y.z address reaches this host.
+
+    The TVs in LAN_TVS answer on their ports after `latency` seconds and refuse
+    the others. Every other address in `hosts` behaves like an empty address on
+    a real network: connections to the scanned ports hang until the client
+    gives up (a listener whose one-slot accept queue is kept full drops SYNs).
+    """
+
+    def __init__(self, subnet="127.0.42", hosts=range(1, 255), latency=0.0, tvs=LAN_TVS):
+        self.subnet = subnet
+        self.servers = []
+        self.sockets = []
+        self.accepted = 0
+        self.closed = threading.Event()
+        for octet in hosts:
+            host = f"{subnet}.{octet}"
+            tv = tvs.get(octet)
+            if tv is None:
+                for port in TV_SCAN_PORTS:
+                    self.silent_port(host, port)
+                continue
+            for port in tv["open"]:
+                self.open_port(host, port)
+            for port, paths in tv["http"].items():
+                self.servers.append(StandInServer({("GET", path): route for path, route in paths.items()}, latency, port, host=host))
+        self.tvs = {f"{subnet}.{octet}": tv["name"] for octet, tv in tvs.items() if octet in hosts}
+
+    def listener(self, host, port, backlog):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+        sock.listen(backlog)
+        self.sockets.append(sock)
+        return sock
+
+    def silent_port(self, host, port):
+        self.listener(host, port, 0)
+        filler = socket.create_connection((host, port))
+        self.sockets.append(filler)
+
+    def open_port(self, host, port):
+        sock = self.listener(host, port, 128)
+
+        def accept():
+            while not self.closed.is_set():
+                try:
+                    conn, _ = sock.accept()
+                except OSError:
+                    return
+                self.accepted += 1
+                conn.close()
+        threading.Thread(target=accept, daemon=True).start()
+
+    def hits(self):
+        """Connections and HTTP requests the TVs have answered so far"""
+        return self.accepted + sum(server.requests for server in self.servers)
+
+    def close(self):
+        self.closed.set()
+        for server in self.servers:
+            server.close()
+        for sock in self.sockets:
+            with contextlib.suppress(OSError):
+                # Wakes up a thread blocked in accept()
+                sock.shutdown(socket.SHUT_RDWR)
+            sock.close()
+
+def upnp_description(name, manufacturer="Stand-in", services=40):
+    """A UPnP device description route: friendlyName near the top, then `services` service entries."""
+    xml = (
+        '<?xml version="1.0"?>\n<root xmlns="urn:schemas-upnp-org:device-1-0">'
+        '<specVersion><major>1</major><minor>0</minor></specVersion><device>'
+        '<deviceType>urn:schemas-upnp-org:device:MediaRenderer:1</deviceType>'
+        f'<friendlyName>{name}</friendlyName><manufacturer>{manufacturer}</manufacturer>'
+        '<serviceList>' + ''.join(
+            f'<service><serviceType>urn:schemas-upnp-org:service:S{i}:1</serviceType>'
+            f'<serviceId>urn:upnp-org:serviceId:S{i}</serviceId><SCPDURL>/S{i}.xml</SCPDURL>'
+            f'<controlURL>/S{i}/control</controlURL><eventSubURL>/S{i}/event</eventSubURL></service>'
+            for i in range(services)
+        ) + '</serviceList></device></root>'
+    )
+    return page(xml, content_type='text/xml; charset="utf-8"')
+
+
+# Address -> (friendlyName, search targets it answers) for the SSDP stand-in
+SSDP_TVS = {
+    "127.0.43.10": ("Living Room TV", ["upnp:rootdevice", "urn:dial-multiscreen-org:service:dial:1", "urn:schemas-upnp-org:device:MediaRenderer:1"]),
+    "127.0.43.20": ("[TV] Samsung Q80", ["upnp:rootdevice", "urn:dial-multiscreen-org:service:dial:1", "urn:schemas-upnp-org:device:MediaRenderer:1"]),
+    "127.0.43.30": ("LG webOS TV OLED55", ["upnp:rootdevice", "urn:dial-multiscreen-org:service:dial:1", "urn:schemas-upnp-org:device:MediaRenderer:1", "urn:schemas-upnp-org:device:MediaServer:1"]),
+    "127.0.43.40": ("Roku Ultra", ["upnp:rootdevice", "urn:dial-multiscreen-org:service:dial:1", "roku:ecp"]),
+}
+
+
+class SsdpResponder:
+    """
+    TVs answering SSDP searches on the real multicast group, 239.255.255.250:1900.
+
+    Every device answers each search target it supports `repeats` times (UDP
+    is lossy, real devices repeat themselves) at random points within the
+    search's MX, from its own 127.x address. Its LOCATION is a description
+    served after `latency` seconds by a StandInServer on that address.
+    """
+
+    def __init__(self, devices=SSDP_TVS, repeats=2, latency=0.0):
+        self.repeats = repeats
+        self.replies = 0
+        self.devices = {}
+        self.servers = []
+        for ip, (name, targets) in devices.items():
+            server = StandInServer({("GET", "/description.xml"): upnp_description(name)}, latency, host=ip)
+            reply_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            reply_sock.bind((ip, 0))
+            self.devices[ip] = (name, targets, f"{server.url}/description.xml", reply_sock)
+            self.servers.append(server)
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        self.sock.bind(("", 1900))
+        group = socket.inet_aton("239.255.255.250") + socket.inet_aton("0.0.0.0")
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, group)
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    def descriptions_served(self):
+        return sum(server.requests for server in self.servers)
+
+    def serve(self):
+        while True:
+            try:
+                data, addr = self.sock.recvfrom(2048)
+            except OSError:
+                return
+            headers = {}
+            for line in data.decode("utf-8", errors="ignore").splitlines()[1:]:
+                if ":" in line:
+                    name, value = line.split(":", 1)
+                    headers[name.strip().upper()] = value.strip()
+            if headers.get("MAN") != '"ssdp:discover"':
+                continue
+            st, mx = headers.get("ST", ""), float(headers.get("MX", 1))
+            for ip, (name, targets, location, reply_sock) in self.devices.items():
+                if st in targets or st == "ssdp:all":
+                    for _ in range(self.repeats):
+                        threading.Timer(random.uniform(0, mx), self.reply, (reply_sock, addr, ip, st, location)).start()
+
+    def reply(self, reply_sock, addr, ip, st, location):
+        uuid = f"stand-in-{ip.replace('.', '-')}"
+        message = (
+            "HTTP/1.1 200 OK\r\nCACHE-CONTROL: max-age=1800\r\nEXT:\r\n"
+            f"LOCATION: {location}\r\nSERVER: Linux/4.9 UPnP/1.0 Stand-in/1.0\r\n"
+            f"ST: {st}\r\nUSN: uuid:{uuid}::{st}\r\n\r\n"
+        )
+        try:
+            reply_sock.sendto(message.encode("utf-8"), addr)
+            self.replies += 1
+        except OSError:
+            pass
+
+    def close(self):
+        self.sock.close()
+        for _, _, _, reply_sock in self.devices.values():
+            reply_sock.close()
+        for server in self.servers:
+            server.close()
+
+if __name__ == "__main__":
+    # Serve the stand-in bridge where the agent expects the real one
+    bridge = bridge_server(latency=0.01, key_latency=0.02, port=3000)
+    print(f"Stand-in TV bridge on {bridge.url} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        bridge.close()
@@ -0,0 +1,62 @@
+"""
+Time to first action with and without the streaming planner.
+
+Run from the repository root:
+
+    python -m benchmarks.streaming_planner --latency 0.3 --first-token 0.05
+
+Groq is replaced by a local stand-in backend. "First action" is the plan
+plus the output of its first step, which is what the graph needs before
+it can dispatch anything else.
+"""
+import argparse
+import time
+
+import agent_tools.planner as planner_module
+from agent_tools.planner import planner, PREFETCH_NODES
+from model.groq_model import set_backend
+from benchmarks.standins import CORPUS, StandInBackend
+
+
+def first_action(task):
+    state = {"current_task": task, "task_number": 0}
+    state.update(planner(state))
+    if state.get("task_number", 0) == 0 and state["edges"][0] in PREFETCH_NODES:
+        state.update(PREFETCH_NODES[state["edges"][0]](state))
+    return state
+
+
+def run_mode(streaming):
+    planner_module.STREAMING_PLANNER = streaming
+    timings = []
+    for entry in CORPUS:
+        start = time.perf_counter()
+        first_action(entry["task"])
+        timings.append((entry["task"], (time.perf_counter() - start) * 1000))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds per stand-in LLM call")
+    parser.add_argument("--first-token", type=float, default=0.05, help="seconds to the first streamed chunk")
+    args = parser.parse_args()
+
+    set_backend(StandInBackend(latency=args.latency, first_token=args.first_token))
+    planner_module.PLAN_CACHE_ENABLED = False
+    planner_module.FUSED_PLANNER = False
+
+    blocking = run_mode(False)
+    streaming = run_mode(True)
+
+    print(f"\n{'task':<42}{'blocking':>12}{'streaming':>12}")
+    for (task, b_ms), (_, s_ms) in zip(blocking, streaming):
+        print(f"{task:<42}{b_ms:>9.0f} ms{s_ms:>9.0f} ms")
+
+    b_total = sum(t for _, t in blocking)
+    s_total = sum(t for _, t in streaming)
+    print(f"{'total':<42}{b_total:>9.0f} ms{s_total:>9.0f} ms   ({b_total / s_total:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
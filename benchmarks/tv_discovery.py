@@ -0,0 +1,83 @@
+"""
+SmartTVDiscovery port scan: the thread pool engine vs the asyncio one, both sending each probe once.
+
+Run from the repository root:
+
+    python -m benchmarks.tv_discovery --hosts 254 --timeout 0.5
+
+The scanned /24 is a stand-in network on loopback (benchmarks.standins.StandInLan):
+a handful of TVs answering after `--latency` seconds, every other address
+silently dropping connections until the probe times out, as empty addresses
+on a real LAN do. SSDP is left out; both engines must find the same devices.
+The thread counts include the stand-in servers' own threads; "TV hits" counts
+the connections and requests the stand-in TVs served.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import threading
+import time
+
+from benchmarks.standins import StandInLan
+from setup.test import SmartTVDiscovery, probe_limit, DISCOVERY_CONCURRENCY
+
+
+def peak_threads(fn):
+    """Runs fn, returning (seconds, most threads alive at once)"""
+    peak, done = [threading.active_count()], threading.Event()
+
+    def sample():
+        while not done.wait(0.05):
+            peak.append(threading.active_count())
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    done.set()
+    sampler.join()
+    # Not counting the sampler itself
+    return elapsed, max(peak) - 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--hosts", type=int, default=254, help="addresses scanned, from .1")
+    parser.add_argument("--timeout", type=float, default=0.5, help="seconds per probe")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds a TV takes to answer")
+    args = parser.parse_args()
+
+    lan = StandInLan(hosts=range(1, args.hosts + 1), latency=args.latency)
+    print(f"{args.hosts} addresses, {len(lan.tvs)} TVs, probe timeout {args.timeout:.2f} s, "
+          f"{probe_limit(DISCOVERY_CONCURRENCY)} probes in flight (async)\n")
+
+    try:
+        results = {}
+        for engine in ("threaded", "async"):
+            discovery = SmartTVDiscovery(timeout=args.timeout, scan_range=(1, args.hosts), subnet=lan.subnet)
+            if engine == "threaded":
+                scan = discovery.scan_threaded
+            else:
+                scan = lambda: asyncio.run(discovery.scan_async())
+            hits = lan.hits()
+            with contextlib.redirect_stdout(io.StringIO()):
+                seconds, threads = peak_threads(scan)
+                results[engine] = discovery.tv_dict()
+            print(f"  {engine:9} {seconds:6.2f} s   {threads:4} threads   {lan.hits() - hits:4} TV hits   {len(results[engine])} devices")
+            if discovery.probe_table:
+                print(f"  {'':9} {len(discovery.probe_table)} probes, {len(discovery.probe_table) / args.hosts:.1f} per address")
+            # Let the stand-in servers drop the finished connections
+            time.sleep(0.5)
+    finally:
+        lan.close()
+
+    if results["async"] != results["threaded"]:
+        raise SystemExit(f"\n❌ The engines disagree\n  threaded {results['threaded']}\n  async    {results['async']}")
+    print()
+    for name in results["async"]:
+        print(f"  • {name}")
+
+
+if __name__ == "__main__":
+    main()
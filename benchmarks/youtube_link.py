@@ -0,0 +1,101 @@
+"""
+get_youtube_link: full results page vs early exit vs the query cache.
+
+Run from the repository root:
+
+    python -m benchmarks.youtube_link --latency 0.15 --bandwidth 2000000
+
+YouTube is a local stand-in serving a ~550 kB results page after `--latency`
+seconds at `--bandwidth` bytes per second.
+
+  full         download the whole page, parse every result (youtube_search)
+  early exit   stream the page, decode only up to the first video
+  cached       repeat query, answered from the TTL/LRU cache
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import statistics
+import time
+
+import requests
+from youtube_search import YoutubeSearch
+
+import agent_tools.get_youtube_link as get_youtube_link
+from agent_tools.http_client import close_async_client
+from benchmarks.standins import youtube_server
+
+QUERIES = ["lofi music", "avengers endgame trailer", "romantic songs"]
+
+
+def full_search(query):
+    # What YoutubeSearch(query, max_results=10) does, against the stand-in
+    page = requests.get(get_youtube_link.results_url(query), timeout=10).text
+    return YoutubeSearch._parse_html(None, page)[:10][0]
+
+
+def run_node(query, async_node):
+    state = {"youtube_query": query, "task_number": 0}
+    with contextlib.redirect_stdout(io.StringIO()):
+        if async_node:
+            async def run():
+                try:
+                    return await get_youtube_link.get_youtube_link_async(state)
+                finally:
+                    await close_async_client()
+            return asyncio.run(run())
+        return get_youtube_link.get_youtube_link(state)
+
+
+def timed(server, fn, rounds):
+    samples, sent = [], server.bytes_sent
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    # Let the server notice the closed connections before reading its counter
+    time.sleep(0.2)
+    return statistics.median(samples), (server.bytes_sent - sent) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.15, help="seconds before the page starts")
+    parser.add_argument("--bandwidth", type=float, default=2_000_000, help="bytes per second")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    server = youtube_server(args.latency, bandwidth=args.bandwidth)
+    get_youtube_link.YOUTUBE_URL = server.url
+
+    try:
+        for query in QUERIES:
+            expected = "https://www.youtube.com" + full_search(query)["url_suffix"]
+            print(f"\n{query}")
+
+            full_ms, full_bytes = timed(server, lambda: full_search(query), args.rounds)
+            print(f"    full          {full_ms:7.0f} ms   {full_bytes / 1024:6.0f} kB read")
+
+            for label, async_node in (("early exit", False), ("early async", True)):
+                get_youtube_link.YOUTUBE_CACHE_ENABLED = False
+
+                def node():
+                    result = run_node(query, async_node)
+                    assert result["app_link"] == expected, (result["app_link"], expected)
+
+                ms, read = timed(server, node, args.rounds)
+                print(f"    {label:12}  {ms:7.0f} ms   {read / 1024:6.0f} kB read   ({full_ms / ms:.1f}x)")
+
+            get_youtube_link.YOUTUBE_CACHE_ENABLED = True
+            run_node(query, True)
+            ms, _ = timed(server, lambda: run_node(query, False), args.rounds)
+            print(f"    cached        {ms:7.3f} ms")
+
+        print(f"\ncache {get_youtube_link.youtube_cache.stats()}")
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,53 @@
 from langgraph.graph import StateGraph, START, END
-from typing import TypedDict
-from agent_tools.get_key import get_key
-from agent_tools.send_key import sendCode
-from agent_tools.get_youtube_query import get_youtube_query
-from agent_tools.get_youtube_link import get_youtube_link
-from agent_tools.send_link import sendLink
-from agent_tools.get_platform import get_tvshow_plattform
-from agent_tools.get_recommendations import get_recommendations
-from agent_tools.set_show import setShowName
-from agent_tools.planner import planner
+from typing import TypedDict, Annotated
+from agent_tools.get_key import get_key_async
+from agent_tools.send_key import sendCodeAsync, TV_TRANSPORT
+from agent_tools.get_youtube_query import get_youtube_query_async
+from agent_tools.get_youtube_link import get_youtube_link_async
+from agent_tools.send_link import sendLinkAsync
+from agent_tools.get_platform import get_tvshow_plattform_async
+from agent_tools.get_recommendations import get_recommendations_async
+from agent_tools.set_show import setShowNameAsync
+from agent_tools.planner import planner_async
+from agent_tools.intent_router import intent_router_async
+from agent_tools.plan_dag import ready_steps, live_update
+from agent_tools.http_client import close_async_client
+from agent_tools.tv_remote import remote_manager
+from agent_tools.tracing import traced, command_trace, start_metrics_server
+from model.groq_model import warm_up
 import asyncio
+import threading
 from typing import Optional
 import os
 from pyfiglet import Figlet
 
+# Reducer for counters written by parallel branches
+def keep_max(current, update):
+    return max(current, update)
+
 # Creating state For the agent
 class TVAgentState(TypedDict):
     current_task: str
     current_task_command: Optional[str]
     repeat: int
+    key_macro: list
     youtube_query: str
     app_link: str
     status: str
     show_name: str
     target_show_name: str
+    # title get_platform found a link for; a later recommendation when the target has no offer
+    playing_title: str
     recommendations: list
     platform_info: list
     edges: list
-    task_number: int
+    # steps of independent branches can finish in the same superstep, keep the furthest count
+    task_number: Annotated[int, keep_max]
+    done_steps: list
+    pending_steps: list
+    # device / group names from config.json the command goes to, empty for the default TV
+    target_devices: list
+    device_results: list
 
 # # async funtion configuration
 # def run_send_code(state):
@@ -35,100 +55,156 @@ class TVAgentState(TypedDict):
 # def run_send_link(state):
 #     return asyncio.run(sendLinkTest(state))
 
-# Create state graph
-graph = StateGraph(TVAgentState)
+# Fan-in point after every step: records finished steps and picks the next batch
+def dispatch(state: TVAgentState):
+    edges = state.get('edges') or []
+    done = state.get('done_steps')
+
+    if done is None:
+        # Steps finished before the first dispatch (the streaming planner may run step one)
+        done = list(range(min(state.get('task_number', 0), len(edges))))
+    else:
+        done = done + state.get('pending_steps', [])
+
+    ready = ready_steps(edges, done)
+    if len(ready) > 1:
+        print(f"[DAG] Running in parallel: {', '.join(edges[i] for i in ready)}\n")
+
+    return { 'done_steps': done, 'pending_steps': ready, 'task_number': len(done) }
 
-# add nodes to the graph
-graph.add_node('planner', planner) # get key code
-graph.add_node('get_key', get_key) # get key code
-graph.add_node('set_show_name', setShowName) # set show name
-graph.add_node('send_code', sendCode) # send key code
-graph.add_node('get_youtube_query', get_youtube_query) # get youtube query
-graph.add_node('get_youtube_link', get_youtube_link) # get youtube link
-graph.add_node('send_link', sendLink) # send link
-graph.add_node('get_platform', get_tvshow_plattform) # get platform info
-graph.add_node('get_recommendations', get_recommendations) # get recommendations
+# Plan nodes are native coroutines; a step's writes a later step overwrites unread are dropped
+def plan_step(name, node):
+    async def step(state):
+        return live_update(state, name, await node(state))
+    return step
 
 # Edge creation logic
 def route_next_step(state: TVAgentState):
-    task_number = state.get('task_number', 0)
     steps = state['edges']
+    ready = state.get('pending_steps') or []
 
-    if task_number < len(steps):
-        next_node = steps[task_number]
-        return next_node
+    if ready:
+        # Several names fan out and run concurrently in the same superstep
+        return [steps[i] for i in ready]
     else:
         return END
 
-# add edges to the graph
-graph.add_edge(START, 'planner')
+# Direct remote commands skip the planner and go straight to dispatch
+def route_after_intent(state: TVAgentState):
+    if state.get('edges'):
+        return 'dispatch'
+    return 'planner'
 
 edge_variable = {"get_key": "get_key", "set_show_name": "set_show_name", "send_code": "send_code",
      "get_youtube_query": "get_youtube_query", "get_youtube_link": "get_youtube_link",
      "send_link": "send_link", "get_platform": "get_platform",
      "get_recommendations": "get_recommendations", END: END}
 
-# The planner determines the initial sequence.
-# After planner, we use route_next_step to transition to the first task.
-graph.add_conditional_edges(
-    'planner',
-    route_next_step,
-    # This dictionary maps the output of route_next_step to the actual node name.
-    # Since route_next_step directly returns the node name, we list all possible node names.
-    # LangGraph will automatically match the returned string to the node.
-    # This is a more explicit way to define the mapping.
-    # Alternatively, if route_next_step just returned 'get_key', LangGraph would look for a node named 'get_key'.
-    # This setup is useful if route_next_step had more complex conditions that might lead to different paths.
-    # However, for simply executing 'steps[task_number]', listing all nodes is a common pattern.
-    edge_variable
-)
-
-# Now, for every functional node that *could* be part of a multi-step plan,
-# we add a conditional edge back to `route_next_step`.
-# This ensures the graph continues executing the planned steps.
-
-graph.add_conditional_edges(
-    'get_key',
-    route_next_step,
-    edge_variable
-)
-graph.add_conditional_edges(
-    'set_show_name',
-    route_next_step,
-    edge_variable
-)
-graph.add_conditional_edges(
-    'send_code',
-    route_next_step,
-    edge_variable
-)
-graph.add_conditional_edges(
-    'get_youtube_query',
-    route_next_step,
-    edge_variable
-)
-graph.add_conditional_edges(
-    'get_youtube_link',
-    route_next_step,
-    edge_variable
-)
-graph.add_conditional_edges(
-    'send_link',
-    route_next_step,
-    edge_variable
-)
-graph.add_conditional_edges(
-    'get_platform',
-    route_next_step,
-    edge_variable
-)
-graph.add_conditional_edges(
-    'get_recommendations',
-    route_next_step,
-    edge_variable
-)
-
-app = graph.compile()
+# Every node a plan can contain, all native coroutines sharing one event loop
+NODES = {
+    'get_key': get_key_async, # get key code
+    'set_show_name': setShowNameAsync, # set show name
+    'send_code': sendCodeAsync, # send key code
+    'get_youtube_query': get_youtube_query_async, # get youtube query
+    'get_youtube_link': get_youtube_link_async, # get youtube link
+    'send_link': sendLinkAsync, # send link
+    'get_platform': get_tvshow_plattform_async, # get platform info
+    'get_recommendations': get_recommendations_async, # get recommendations
+}
+
+def build_graph(send_code=sendCodeAsync, send_link=sendLinkAsync, nodes=None):
+    """
+    Builds and compiles the agent graph; drive it with app.ainvoke.
+
+    send_code / send_link let callers swap the device nodes (auto.py uses the
+    test senders); nodes overrides any other plan node by name.
+    """
+    plan_nodes = {**NODES, 'send_code': send_code, 'send_link': send_link, **(nodes or {})}
+
+    # Create state graph
+    graph = StateGraph(TVAgentState)
+
+    # add nodes to the graph
+    # every node is wrapped so its wall, llm and network time land in the trace
+    graph.add_node('intent_router', traced('intent_router', intent_router_async)) # parse direct remote commands without the llm
+    graph.add_node('planner', traced('planner', planner_async)) # plan the sequence of steps
+    graph.add_node('dispatch', traced('dispatch', dispatch)) # pick the steps whose inputs are ready
+    for name, node in plan_nodes.items():
+        graph.add_node(name, traced(name, plan_step(name, node)))
+
+    # add edges to the graph
+    graph.add_edge(START, 'intent_router')
+
+    # The router either jumps straight to dispatch or hands the task to the planner.
+    graph.add_conditional_edges(
+        'intent_router',
+        route_after_intent,
+        {'dispatch': 'dispatch', 'planner': 'planner'}
+    )
+    graph.add_edge('planner', 'dispatch')
+
+    # dispatch fans out to every step whose dependencies are done.
+    # route_next_step returns a list of node names, LangGraph runs them concurrently.
+    graph.add_conditional_edges(
+        'dispatch',
+        route_next_step,
+        edge_variable
+    )
+
+    # Every step fans back in to dispatch, which runs once per superstep
+    # with the merged state of all branches that just finished.
+    for name in plan_nodes:
+        graph.add_edge(name, 'dispatch')
+
+    return graph.compile()
+
+app = build_graph()
+
+# Prometheus text endpoint for the node metrics, METRICS_PORT=0 turns it off
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+
+async def run_command(user_input):
+    initial_state = {
+        "current_task": user_input,
+        "task_number": 0
+    }
+
+    try:
+        with command_trace(user_input):
+            await app.ainvoke(initial_state)
+    except Exception as e:
+        print(f"❌ Task failed: {user_input} | {e}\n")
+
+def read_commands(loop, queue):
+    # input() blocks, so it lives on a daemon thread that never holds up exit
+    while True:
+        try:
+            user_input = input("🗣️  Enter your task: ").strip()
+        except EOFError:
+            user_input = None
+        loop.call_soon_threadsafe(queue.put_nowait, user_input)
+        if user_input is None:
+            return
+
+async def main():
+    queue = asyncio.Queue()
+    threading.Thread(target=read_commands, args=(asyncio.get_running_loop(), queue), daemon=True).start()
+
+    # Commands run as tasks on this one loop, so a new one can start while others are in flight
+    running = set()
+    try:
+        while (user_input := await queue.get()) is not None:
+            if not user_input:
+                print("⚠️  Please enter a valid task.\n")
+                continue
+
+            task = asyncio.create_task(run_command(user_input))
+            running.add(task)
+            task.add_done_callback(running.discard)
+
+        await asyncio.gather(*running)
+    finally:
+        await close_async_client()
 
 if __name__ == "__main__":
 
@@ -144,21 +220,22 @@ if __name__ == "__main__":
     print("-----------------------------------------------------------\n")
     print("Type your command or press Ctrl+C to exit.\n")
 
-    while True:
-        try:
-            user_input = input("🗣️  Enter your task: ").strip()
-            if not user_input:
-                print("⚠️  Please enter a valid task.\n")
-                continue
-
-            initial_state = {
-                "current_task": user_input,
-                "task_number": 0
-            }
+    # Build the shared LLM clients and prompt chains before the first command
+    warm_up()
 
-            # Replace this with your actual app/agent function
-            app.invoke(initial_state)
-
-        except KeyboardInterrupt:
-            print("\n👋 Exiting TVV Agent. Goodbye!\n")
-            break
+    # Open the TV session now so the first command does not pay for the TLS handshake
+    if TV_TRANSPORT == "remote":
+        try:
+            remote_manager.connect_sync()
+            print("📺 Remote session to the TV is open.\n")
+        except Exception as e:
+            print(f"⚠️ Could not open the remote session yet, retrying in the background: {e}\n")
+
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+        print(f"📈 Node metrics on http://127.0.0.1:{METRICS_PORT}/metrics\n")
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n👋 Exiting TVV Agent. Goodbye!\n")
@@ -1,9 +1,153 @@
+import os
+import time
+import httpx
+from contextlib import contextmanager
+from functools import lru_cache
 from langchain_groq import ChatGroq
+from langchain_core.prompts import PromptTemplate
+from langchain_core.output_parsers import PydanticOutputParser
 from dotenv import load_dotenv
+from model.llm_backend import create_backend
+
 load_dotenv()
 
-# Initialize Groq LLM
-llm = ChatGroq(
-    model_name="llama-3.3-70b-versatile",
-    temperature=0.7
-)
+# Model used by every agent node
+MODEL_NAME = "gemma2-9b-it"
+
+# Keep-alive pool shared by all nodes so every command reuses the same TLS connections
+HTTP_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=120)
+HTTP_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+
+
+@lru_cache(maxsize=None)
+def get_llm(model=MODEL_NAME):
+    """
+    Returns the process-wide Groq client for a model.
+
+    The client is created lazily (ChatGroq needs GROQ_API_KEY at construction)
+    and then reused by every node for the lifetime of the process.
+    """
+    return ChatGroq(
+        model=model,
+        http_client=httpx.Client(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT),
+        http_async_client=httpx.AsyncClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT),
+    )
+
+
+# live (pass through), record (live + save every response) or replay (fixtures only, no network)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "live")
+LLM_FIXTURES_DIR = os.getenv("LLM_FIXTURES_DIR", os.path.join("fixtures", "llm"))
+# Latency injected per replayed call in ms, or "recorded" to replay the measured latency
+LLM_REPLAY_LATENCY = os.getenv("LLM_REPLAY_LATENCY", "0")
+
+# Backend every chain sends its prompts through
+backend = create_backend(LLM_BACKEND, lambda model: get_llm(model), LLM_FIXTURES_DIR, LLM_REPLAY_LATENCY)
+
+
+def set_backend(new_backend):
+    """Swaps the backend used by every chain (e.g. a ReplayBackend for offline runs)."""
+    global backend
+    backend = new_backend
+
+
+class LLMChain:
+    """
+    Pre-compiled prompt -> LLM -> Pydantic parser chain for one node.
+
+    The parser, the prompt template and its format instructions are built once
+    when the node module is imported instead of on every call. `on_llm_time`
+    is called with the seconds spent waiting on the llm, e.g. to trace them.
+    """
+
+    def __init__(self, name, template, schema, model=MODEL_NAME, on_llm_time=None):
+        self.name = name
+        self.model = model
+        self.on_llm_time = on_llm_time or (lambda seconds: None)
+        self.parser = PydanticOutputParser(pydantic_object=schema)
+        self.prompt = PromptTemplate(
+            template=template,
+            input_variables=["task"],
+            partial_variables={"format_instructions": self.parser.get_format_instructions()},
+        )
+
+    @contextmanager
+    def llm_timer(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.on_llm_time(time.perf_counter() - start)
+
+    def invoke(self, **variables):
+        # Create prompt
+        prompt = self.prompt.invoke(variables)
+
+        # Get response from the shared llm (or the recorded fixture)
+        with self.llm_timer():
+            content = backend.complete(self.model, prompt)
+
+        # Parse the response using the output parser
+        return self.parser.parse(content)
+
+    def stream(self, **variables):
+        """Yields the raw completion text chunk by chunk; parse the joined text with self.parser."""
+        prompt = self.prompt.invoke(variables)
+        chunks = backend.stream(self.model, prompt)
+        while True:
+            # Only the wait for each chunk counts as llm time, not the caller's work between chunks
+            start = time.perf_counter()
+            chunk = next(chunks, None)
+            self.on_llm_time(time.perf_counter() - start)
+            if chunk is None:
+                return
+            yield chunk
+
+    async def ainvoke(self, **variables):
+        prompt = self.prompt.invoke(variables)
+        with self.llm_timer():
+            content = await backend.acomplete(self.model, prompt)
+        return self.parser.parse(content)
+
+    async def astream(self, **variables):
+        prompt = self.prompt.invoke(variables)
+        chunks = backend.astream(self.model, prompt).__aiter__()
+        while True:
+            start = time.perf_counter()
+            try:
+                chunk = await chunks.__anext__()
+            except StopAsyncIteration:
+                return
+            finally:
+                self.on_llm_time(time.perf_counter() - start)
+            yield chunk
+
+
+# All chains registered by the agent_tools nodes
+CHAINS = {}
+
+
+def register_chain(name, template, schema, model=MODEL_NAME, on_llm_time=None):
+    chain = LLMChain(name, template, schema, model, on_llm_time)
+    CHAINS[name] = chain
+    return chain
+
+
+def warm_up(ping=True):
+    """
+    Builds the shared clients and renders every registered prompt once.
+
+    With ping=True a one-token request is sent so the first real command
+    finds an open keep-alive connection to Groq.
+    """
+    offline = backend.mode == "replay"
+
+    for chain in CHAINS.values():
+        if not offline:
+            get_llm(chain.model)
+        chain.prompt.invoke({"task": "warm up"})
+
+    if ping and not offline:
+        try:
+            get_llm().invoke("ping", max_tokens=1)
+        except Exception as e:
+            print(f"⚠️ LLM warm-up ping failed: {e}")
@@ -0,0 +1,162 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+
+class FixtureMissing(KeyError):
+    """Raised in replay mode when no recorded response exists for a prompt."""
+
+
+def prompt_to_text(prompt):
+    return prompt.to_string() if hasattr(prompt, "to_string") else str(prompt)
+
+
+def prompt_hash(model, prompt):
+    """Fixture key: sha256 of the model name and the fully rendered prompt."""
+    return hashlib.sha256(f"{model}\n{prompt_to_text(prompt)}".encode("utf-8")).hexdigest()
+
+
+class LiveBackend:
+    """Pass-through: every prompt goes to the real model."""
+
+    mode = "live"
+
+    def __init__(self, llm_factory):
+        self.llm_factory = llm_factory
+
+    def complete(self, model, prompt):
+        return self.llm_factory(model).invoke(prompt).content
+
+    def stream(self, model, prompt):
+        for chunk in self.llm_factory(model).stream(prompt):
+            yield chunk.content
+
+    async def acomplete(self, model, prompt):
+        return (await self.llm_factory(model).ainvoke(prompt)).content
+
+    async def astream(self, model, prompt):
+        async for chunk in self.llm_factory(model).astream(prompt):
+            yield chunk.content
+
+
+class RecordBackend(LiveBackend):
+    """Calls the real model and writes every response to the fixture store."""
+
+    mode = "record"
+
+    def __init__(self, llm_factory, fixtures_dir):
+        super().__init__(llm_factory)
+        self.fixtures_dir = fixtures_dir
+        os.makedirs(fixtures_dir, exist_ok=True)
+
+    def complete(self, model, prompt):
+        start = time.perf_counter()
+        content = super().complete(model, prompt)
+        self.save(model, prompt, content, (time.perf_counter() - start) * 1000)
+        return content
+
+    def stream(self, model, prompt):
+        start = time.perf_counter()
+        chunks = []
+        for chunk in super().stream(model, prompt):
+            chunks.append(chunk)
+            yield chunk
+        self.save(model, prompt, "".join(chunks), (time.perf_counter() - start) * 1000)
+
+    async def acomplete(self, model, prompt):
+        start = time.perf_counter()
+        content = await super().acomplete(model, prompt)
+        self.save(model, prompt, content, (time.perf_counter() - start) * 1000)
+        return content
+
+    async def astream(self, model, prompt):
+        start = time.perf_counter()
+        chunks = []
+        async for chunk in super().astream(model, prompt):
+            chunks.append(chunk)
+            yield chunk
+        self.save(model, prompt, "".join(chunks), (time.perf_counter() - start) * 1000)
+
+    def save(self, model, prompt, content, latency_ms):
+        fixture = {
+            "model": model,
+            "prompt": prompt_to_text(prompt),
+            "response": content,
+            "latency_ms": round(latency_ms, 2),
+            "recorded_at": time.time(),
+        }
+        path = os.path.join(self.fixtures_dir, f"{prompt_hash(model, prompt)}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(fixture, f, ensure_ascii=False, indent=2)
+
+
+class ReplayBackend:
+    """
+    Answers from the fixture store without touching the network.
+
+    `latency` is injected before each answer: a number of milliseconds, or
+    "recorded" to sleep for the latency measured when the fixture was recorded.
+    """
+
+    mode = "replay"
+
+    def __init__(self, fixtures_dir, latency=0):
+        self.fixtures_dir = fixtures_dir
+        self.latency = latency
+        self._fixtures = {}
+
+    def load(self, model, prompt):
+        key = prompt_hash(model, prompt)
+        if key not in self._fixtures:
+            path = os.path.join(self.fixtures_dir, f"{key}.json")
+            if not os.path.exists(path):
+                raise FixtureMissing(f"No recorded response for prompt {key[:12]} in {self.fixtures_dir}")
+            with open(path, encoding="utf-8") as f:
+                self._fixtures[key] = json.load(f)
+        return self._fixtures[key]
+
+    def delay(self, fixture):
+        if self.latency == "recorded":
+            return fixture.get("latency_ms", 0) / 1000
+        return float(self.latency) / 1000
+
+    def complete(self, model, prompt):
+        fixture = self.load(model, prompt)
+        time.sleep(self.delay(fixture))
+        return fixture["response"]
+
+    def chunks(self, fixture, chunk_size=8):
+        response = fixture["response"]
+        return [response[i:i + chunk_size] for i in range(0, len(response), chunk_size)] or [""]
+
+    def stream(self, model, prompt):
+        # The injected latency is spread evenly over the replayed chunks
+        fixture = self.load(model, prompt)
+        chunks = self.chunks(fixture)
+        for chunk in chunks:
+            time.sleep(self.delay(fixture) / len(chunks))
+            yield chunk
+
+    async def acomplete(self, model, prompt):
+        fixture = self.load(model, prompt)
+        await asyncio.sleep(self.delay(fixture))
+        return fixture["response"]
+
+    async def astream(self, model, prompt):
+        fixture = self.load(model, prompt)
+        chunks = self.chunks(fixture)
+        for chunk in chunks:
+            await asyncio.sleep(self.delay(fixture) / len(chunks))
+            yield chunk
+
+
+def create_backend(mode, llm_factory, fixtures_dir, latency=0):
+    if mode == "live":
+        return LiveBackend(llm_factory)
+    if mode == "record":
+        return RecordBackend(llm_factory, fixtures_dir)
+    if mode == "replay":
+        return ReplayBackend(fixtures_dir, latency)
+    raise ValueError(f"Unknown LLM backend mode: {mode!r} (expected live, record or replay)")
@@ -1,118 +1,461 @@
+import asyncio
+import os
 import socket
+import ssl
 import threading
 import time
+import urllib.parse
 import requests
+import requests.adapters
 import json
 import xml.etree.ElementTree as ET
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor
 import re
 
+# Set ASYNC_DISCOVERY=0 to send the probes from a thread pool instead of an event loop
+ASYNC_DISCOVERY = os.getenv("ASYNC_DISCOVERY", "1") != "0"
+# Threads of that pool: as many as the seven per-vendor pools of 50 it replaced
+THREADED_DISCOVERY_WORKERS = int(os.getenv("THREADED_DISCOVERY_WORKERS", 350))
+# Probes in flight at once, across every vendor and IP; capped by the open file limit
+DISCOVERY_CONCURRENCY = int(os.getenv("DISCOVERY_CONCURRENCY", 1024))
+
+def probe_limit(requested):
+    """Raises the open file limit towards `requested` sockets and returns how many fit under it"""
+    try:
+        import resource
+    except ImportError:
+        # Windows, where select() is not involved and sockets are not files
+        return requested
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = requested + 64
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        try:
+            soft = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+            resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+        except (ValueError, OSError):
+            soft = resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+    if soft == resource.RLIM_INFINITY:
+        return requested
+    # Leave room for the files the process already has open
+    return max(16, min(requested, soft - 64))
+
+# Enough of a page for every fingerprint; the rest of a bigger body is not read
+MAX_PROBE_BODY = 1024 * 1024
+MAX_PROBE_REDIRECTS = 5
+
+class ProbeResponse:
+    """The parts of a requests.Response the vendor checks read"""
+    def __init__(self, status_code, body, encoding=None):
+        self.status_code = status_code
+        self.content = body
+        self.text = body.decode(encoding or 'utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.text)
+
+def dechunk(body):
+    """Decodes a chunked transfer-encoded body, keeping whatever arrived before a cut"""
+    out, pos = [], 0
+    while True:
+        end = body.find(b"\r\n", pos)
+        if end < 0:
+            break
+        size = int(body[pos:end].split(b";")[0] or b"0", 16)
+        if size == 0:
+            break
+        out.append(body[end + 2:end + 2 + size])
+        pos = end + 2 + size + 2
+    return b"".join(out)
+
+async def http_get(url, timeout):
+    """
+    GET on plain asyncio streams, following redirects like requests.get.
+    `timeout` bounds the connect and every read, as in requests. Raises on
+    anything but a complete HTTP answer.
+
+    httpx's pool does per-request bookkeeping over every queued request, which
+    turns a thousand concurrent probes into seconds of CPU; this does not.
+    """
+    for _ in range(MAX_PROBE_REDIRECTS + 1):
+        parts = urllib.parse.urlsplit(url)
+        secure = parts.scheme == 'https'
+        port = parts.port or (443 if secure else 80)
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(parts.hostname, port, ssl=ssl.create_default_context() if secure else None), timeout
+        )
+        try:
+            target = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+            writer.write(
+                f"GET {target} HTTP/1.1\r\nHost: {parts.netloc}\r\nUser-Agent: SmartTVDiscovery\r\n"
+                f"Accept: */*\r\nConnection: close\r\n\r\n".encode('ascii')
+            )
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout)
+            status_line, *header_lines = head.decode('latin-1').split("\r\n")
+            status = int(status_line.split()[1])
+            headers = {}
+            for line in header_lines:
+                if ':' in line:
+                    name, value = line.split(':', 1)
+                    headers[name.strip().lower()] = value.strip()
+
+            length = headers.get('content-length', '')
+            body = b""
+            if length.isdigit():
+                body = await asyncio.wait_for(reader.readexactly(min(int(length), MAX_PROBE_BODY)), timeout)
+            else:
+                while len(body) < MAX_PROBE_BODY:
+                    chunk = await asyncio.wait_for(reader.read(64 * 1024), timeout)
+                    if not chunk:
+                        break
+                    body += chunk
+                if 'chunked' in headers.get('transfer-encoding', '').lower():
+                    body = dechunk(body)
+        finally:
+            writer.close()
+
+        if status in (301, 302, 303, 307, 308) and 'location' in headers:
+            url = urllib.parse.urljoin(url, headers['location'])
+            continue
+        charset = re.search(r'charset=([\w-]+)', headers.get('content-type', ''))
+        return ProbeResponse(status, body, charset.group(1) if charset else None)
+    raise ConnectionError(f"Too many redirects: {url}")
+
+SSDP_ADDR = ('239.255.255.250', 1900)
+# Devices spread their replies over up to MX seconds
+SSDP_MX = 3
+SSDP_SEARCH_TARGETS = [
+    'upnp:rootdevice',
+    'urn:dial-multiscreen-org:service:dial:1',
+    'urn:schemas-upnp-org:device:MediaRenderer:1',
+    'urn:schemas-upnp-org:device:MediaServer:1',
+    'roku:ecp'
+]
+
+def ssdp_search(search_target):
+    return (
+        'M-SEARCH * HTTP/1.1\r\n'
+        f'HOST: {SSDP_ADDR[0]}:{SSDP_ADDR[1]}\r\n'
+        'MAN: "ssdp:discover"\r\n'
+        f'ST: {search_target}\r\n'
+        f'MX: {SSDP_MX}\r\n\r\n'
+    ).encode('utf-8')
+
+def parse_ssdp_reply(response):
+    """Header name in upper case -> value, for one SSDP reply or NOTIFY"""
+    headers = {}
+    for line in response.splitlines()[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers.setdefault(name.strip().upper(), value.strip())
+    return headers
+
+def read_friendly_name(response, chunk_size=4096):
+    """
+    The first non-empty friendlyName in a UPnP description, read as it
+    downloads: parsing stops at the element's end tag and the rest of the
+    body is never read. Malformed XML falls back to a text search of the
+    whole body.
+    """
+    parser = ET.XMLPullParser(events=("end",))
+    body = b""
+    for chunk in response.iter_content(chunk_size):
+        body += chunk
+        if parser is None:
+            continue
+        try:
+            parser.feed(chunk)
+            for _, element in parser.read_events():
+                # Any namespace, device-1-0 on every description seen so far
+                if element.tag.rsplit('}', 1)[-1] == 'friendlyName' and element.text and element.text.strip():
+                    return element.text.strip()
+        except ET.ParseError:
+            parser = None
+
+    text = body.decode(response.encoding or 'utf-8', errors='replace')
+    start = text.find("<friendlyName>")
+    if start >= 0:
+        start += len("<friendlyName>")
+        end = text.find("</friendlyName>", start)
+        if end > start:
+            return text[start:end].strip() or None
+    return None
+
+class DescriptionCache:
+    """
+    LOCATION -> (answered with 200, friendlyName or None) for UPnP descriptions.
+
+    Every SSDP reply of a device points at the same description, so each
+    location is downloaded once per discovery object: concurrent lookups of
+    a location wait for the one fetch in flight instead of starting their
+    own. Failed fetches are not cached. Downloads share a keep-alive pool.
+    """
+    def __init__(self, timeout=1.0, pool_size=8):
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.entries = {}
+        self.in_flight = {}
+        self.lock = threading.Lock()
+        self.stats = {"fetches": 0, "hits": 0, "shared": 0}
+
+    def lookup(self, location):
+        fetching = False
+        with self.lock:
+            if location in self.entries:
+                self.stats["hits"] += 1
+                return self.entries[location]
+            future = self.in_flight.get(location)
+            if future is not None:
+                self.stats["shared"] += 1
+            else:
+                future = self.in_flight[location] = Future()
+                self.stats["fetches"] += 1
+                fetching = True
+        if not fetching:
+            # Someone else is downloading it
+            return future.result()
+
+        try:
+            entry = self.fetch(location)
+        except Exception as e:
+            with self.lock:
+                del self.in_flight[location]
+            future.set_exception(e)
+            raise
+        with self.lock:
+            self.entries[location] = entry
+            del self.in_flight[location]
+        future.set_result(entry)
+        return entry
+
+    def fetch(self, location):
+        with self.session.get(location, timeout=self.timeout, stream=True) as response:
+            if response.status_code != 200:
+                return False, None
+            return True, read_friendly_name(response)
+
+def name_score(name):
+    """How specific a detected name is: the longer the better, generic 'Unknown ...' names last"""
+    return len(name) if 'Unknown' not in name else 0
+
+class DeviceRegistry:
+    """
+    Discovered devices by IP, merged as detections arrive from any thread.
+
+    An entry holds the best name so far (highest name_score, the earliest one
+    on a tie) with the method that found it, the first LOCATION seen, every
+    detection in order and when the device was first and last seen.
+    """
+    def __init__(self):
+        # ip -> entry, in the order devices were first seen
+        self.devices = {}
+        self.lock = threading.Lock()
+
+    def record(self, ip, name, method, location=None):
+        now = time.time()
+        score = name_score(name)
+        with self.lock:
+            device = self.devices.get(ip)
+            if device is None:
+                device = self.devices[ip] = {
+                    'ip': ip, 'name': name, 'method': method, 'location': location, 'score': score,
+                    'history': [], 'first_seen': now,
+                }
+            elif score > device['score']:
+                device.update(name=name, method=method, score=score)
+            if location and not device['location']:
+                device['location'] = location
+            device['history'].append({'name': name, 'method': method, 'at': now})
+            device['last_seen'] = now
+        return device
+
+    def get(self, ip):
+        return self.devices.get(ip)
+
+    def __len__(self):
+        return len(self.devices)
+
+    def tv_dict(self):
+        """Name (ip) -> ip"""
+        with self.lock:
+            return {f"{device['name']} ({ip})": ip for ip, device in self.devices.items()}
+
+    def detailed(self):
+        """ip -> name, method, location, every method that saw it and when"""
+        with self.lock:
+            return {
+                ip: {
+                    'name': device['name'],
+                    'method': device['method'],
+                    'location': device['location'],
+                    'methods': [detection['method'] for detection in device['history']],
+                    'first_seen': device['first_seen'],
+                    'last_seen': device['last_seen'],
+                }
+                for ip, device in self.devices.items()
+            }
+
+# Vendor fingerprints. Each matcher reads the answers to the probes of one IP,
+# {(port, path): answer}, where a path of None is a bare TCP connect answered
+# True/False and an HTTP probe is answered with a ProbeResponse or None. Within
+# a vendor the first match in the original scan's port order wins.
+
+def page_text(response):
+    return response.text.lower() if response is not None else ""
+
+def match_android_tv(probes):
+    if probes[(6467, None)]:
+        return 'Android TV / Google TV', 'ADB_PORT'
+    for port in (8008, 9000, 8080, 80):
+        content = page_text(probes[(port, '/')])
+        if any(keyword in content for keyword in ['android', 'google tv', 'chromecast', 'cast']):
+            return ("Chromecast / Google TV" if 'chromecast' in content else "Android TV / Google TV"), f'HTTP_{port}'
+
+def match_samsung_tv(probes):
+    for port in (8001, 8002):
+        if probes[(port, None)]:
+            return 'Samsung Smart TV', f'WebSocket_{port}'
+    for port in (8080, 26101):
+        response = probes[(port, '/')]
+        if response is not None and response.status_code == 200 and 'samsung' in response.text.lower():
+            return 'Samsung Smart TV', f'HTTP_{port}'
+
+def match_lg_tv(probes):
+    for port in (3000, 3001, 36866, 1061):
+        content = page_text(probes[(port, '/')])
+        if any(keyword in content for keyword in ['webos', 'lg', 'netcast']):
+            return ("LG WebOS TV" if 'webos' in content else "LG Smart TV"), f'HTTP_{port}'
+
+def match_chromecast(probes):
+    for port in CAST_PORTS:
+        response = probes[(port, EUREKA_INFO)]
+        if response is None:
+            continue
+        if response.status_code == 200:
+            try:
+                data = response.json()
+            except ValueError:
+                pass
+            else:
+                if isinstance(data, dict):
+                    return data.get("name") or "Chromecast", 'Eureka'
+                # JSON that is not an object: the threaded scan gives up on the port
+                continue
+        for endpoint in CAST_ENDPOINTS:
+            response = probes.get((port, endpoint))
+            if response is not None and response.status_code == 200:
+                return 'Chromecast', f'Cast_{port}'
+
+def match_roku(probes):
+    for path, method in (('/', 'ECP'), ('/query/device-info', 'DeviceInfo')):
+        response = probes.get((8060, path))
+        if response is not None and response.status_code == 200 and 'roku' in response.text.lower():
+            return 'Roku TV', method
+
+def match_apple_tv(probes):
+    for port in (7000, 32498, 3689):
+        if probes[(port, None)]:
+            return 'Apple TV', f'Port_{port}'
+
+def match_fire_tv(probes):
+    if probes[(5555, None)]:
+        return 'Amazon Fire TV', 'ADB'
+    for port in (8080, 8008):
+        content = page_text(probes[(port, '/')])
+        if 'amazon' in content or 'fire' in content:
+            return 'Amazon Fire TV', f'HTTP_{port}'
+
+VENDOR_MATCHERS = [
+    match_android_tv, match_samsung_tv, match_lg_tv, match_chromecast, match_roku, match_apple_tv, match_fire_tv,
+]
+
+CAST_PORTS = (8008, 8009, 8443)
+EUREKA_INFO = "/setup/eureka_info"
+CAST_ENDPOINTS = ("/setup/offer", "/setup/scan_wifi")
+
+# Everything the matchers read, each sent once per IP: 20 probes where the
+# vendor scans send 23, with 8008 and 8080 shared by up to four vendors
+PROBES = sorted({
+    *((port, None) for port in (6467, 8001, 8002, 7000, 32498, 3689, 5555)),
+    *((port, '/') for port in (8008, 9000, 8080, 80, 26101, 3000, 3001, 36866, 1061, 8060)),
+    *((port, EUREKA_INFO) for port in CAST_PORTS),
+}, key=lambda key: (key[0], key[1] or ''))
+
+# Probes only worth sending once another probe on the port got an HTTP answer
+FOLLOW_UPS = {
+    **{(port, endpoint): (port, EUREKA_INFO) for port in CAST_PORTS for endpoint in CAST_ENDPOINTS},
+    (8060, '/query/device-info'): (8060, '/'),
+}
+
 class SmartTVDiscovery:
-    def __init__(self, timeout=1.0, scan_range=(1, 254)):
-        self.discovered_devices = []
-        self.discovery_timeout = 5
+    def __init__(self, timeout=1.0, scan_range=(1, 254), subnet=None):
+        # Everything found so far, one entry per IP
+        self.registry = DeviceRegistry()
+        self.scanned = False
+        # Replies come within MX seconds of a search; one more for the network
+        self.discovery_timeout = SSDP_MX + 1
         self.request_timeout = timeout
         self.scan_range = scan_range
-        self.lock = threading.Lock()
+        # First three octets of the range to scan, e.g. "192.168.1"; defaults to the local network
+        self.subnet = subnet
+        self.descriptions = DescriptionCache(timeout)
+        # (ip, port, path) -> the async scan's probe of it
+        self.probe_table = {}
 
     def send_ssdp_discovery(self):
-        """Enhanced SSDP discovery with multiple search targets"""
-        search_targets = [
-            'upnp:rootdevice',
-            'urn:dial-multiscreen-org:service:dial:1',
-            'urn:schemas-upnp-org:device:MediaRenderer:1',
-            'urn:schemas-upnp-org:device:MediaServer:1',
-            'roku:ecp'
-        ]
-        
-        for st in search_targets:
-            self._send_ssdp_request(st)
-
-    def _send_ssdp_request(self, search_target):
-        ssdp_request = (
-            'M-SEARCH * HTTP/1.1\r\n'
-            'HOST: 239.255.255.250:1900\r\n'
-            'MAN: "ssdp:discover"\r\n'
-            f'ST: {search_target}\r\n'
-            'MX: 3\r\n\r\n'
-        )
+        """
+        Sends the M-SEARCH for every search target from one socket and collects
+        the replies to all of them in a single window, SSDP_MX seconds plus one
+        for the network.
 
+        A TV answers each target it supports, often more than once, with a
+        different USN but the same LOCATION; only the first reply per address
+        and LOCATION is kept, and its description is fetched on a small pool
+        while replies keep arriving.
+        """
         sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        sock.settimeout(self.discovery_timeout)
+        seen = set()
+        names = ThreadPoolExecutor(max_workers=8, thread_name_prefix="ssdp-name")
 
         try:
-            sock.sendto(ssdp_request.encode('utf-8'), ('239.255.255.250', 1900))
-            start_time = time.time()
-            while time.time() - start_time < self.discovery_timeout:
+            for st in SSDP_SEARCH_TARGETS:
+                sock.sendto(ssdp_search(st), SSDP_ADDR)
+
+            deadline = time.monotonic() + self.discovery_timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                sock.settimeout(remaining)
                 try:
                     data, addr = sock.recvfrom(2048)
-                    response = data.decode('utf-8', errors='ignore')
-                    self._process_ssdp_response(response, addr[0])
                 except socket.timeout:
                     break
+                reply = parse_ssdp_reply(data.decode('utf-8', errors='ignore'))
+                location = reply.get('LOCATION')
+                if not location or (addr[0], location) in seen:
+                    continue
+                seen.add((addr[0], location))
+                names.submit(self._add_ssdp_device, addr[0], location, reply.get('SERVER'))
         except Exception as e:
             print(f"SSDP discovery error: {e}")
         finally:
             sock.close()
+            names.shutdown(wait=True)
 
-    def _process_ssdp_response(self, response, ip):
-        """Process SSDP response and extract device information"""
-        if 'LOCATION:' in response.upper():
-            location = None
-            server = None
-            
-            for line in response.splitlines():
-                line_upper = line.upper()
-                if line_upper.startswith('LOCATION:'):
-                    location = line.split(':', 1)[1].strip()
-                elif line_upper.startswith('SERVER:'):
-                    server = line.split(':', 1)[1].strip()
-            
-            if location:
-                name = self.get_name_from_location(location, server)
-                with self.lock:
-                    self.discovered_devices.append({
-                        'ip': ip, 
-                        'name': name,
-                        'method': 'SSDP',
-                        'location': location
-                    })
+    def _add_ssdp_device(self, ip, location, server=None):
+        name = self.get_name_from_location(location, server)
+        self._add_device(ip, name, 'SSDP', location)
 
     def get_name_from_location(self, location_url, server_info=None):
         """Enhanced device name extraction from UPnP description"""
         try:
-            response = requests.get(location_url, timeout=self.request_timeout)
-            if response.status_code == 200:
-                # Try XML parsing first
-                try:
-                    root = ET.fromstring(response.text)
-                    
-                    # Look for friendlyName in various namespaces
-                    namespaces = {
-                        '': 'urn:schemas-upnp-org:device-1-0',
-                        'upnp': 'urn:schemas-upnp-org:device-1-0'
-                    }
-                    
-                    for ns_prefix, ns_uri in namespaces.items():
-                        friendly_name = root.find(f'.//{{{ns_uri}}}friendlyName')
-                        if friendly_name is not None and friendly_name.text:
-                            return friendly_name.text.strip()
-                    
-                    # Fallback to text search
-                    if "<friendlyName>" in response.text:
-                        start = response.text.find("<friendlyName>") + len("<friendlyName>")
-                        end = response.text.find("</friendlyName>", start)
-                        if end > start:
-                            return response.text[start:end].strip()
-                
-                except ET.ParseError:
-                    # If XML parsing fails, use text search
-                    if "<friendlyName>" in response.text:
-                        start = response.text.find("<friendlyName>") + len("<friendlyName>")
-                        end = response.text.find("</friendlyName>", start)
-                        if end > start:
-                            return response.text[start:end].strip()
-                
+            answered, friendly_name = self.descriptions.lookup(location_url)
+            if friendly_name:
+                return friendly_name
+            if answered:
                 # Try to extract device info from server header
                 if server_info:
                     if 'android' in server_info.lower():
@@ -125,282 +468,102 @@ class SmartTVDiscovery:
         
         return "Unknown Smart TV"
 
-    def scan_android_tv(self):
-        """Scan for Android TV / Google TV devices"""
-        def check(ip):
-            # Android TV typically runs on port 6467 for debugging
-            # and may have web interfaces on various ports
-            ports_to_check = [6467, 8008, 9000, 8080, 80]
-            
-            for port in ports_to_check:
-                try:
-                    # Check ADB port (6467) - only check if reachable
-                    if port == 6467:
-                        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                        sock.settimeout(self.request_timeout)
-                        result = sock.connect_ex((ip, port))
-                        sock.close()
-                        if result == 0:
-                            with self.lock:
-                                self.discovered_devices.append({
-                                    'ip': ip, 
-                                    'name': 'Android TV / Google TV',
-                                    'method': 'ADB_PORT'
-                                })
-                            return
-                    else:
-                        # Check HTTP endpoints
-                        url = f"http://{ip}:{port}/"
-                        response = requests.get(url, timeout=self.request_timeout)
-                        content = response.text.lower()
-                        
-                        if any(keyword in content for keyword in [
-                            'android', 'google tv', 'chromecast', 'cast'
-                        ]):
-                            device_name = "Android TV / Google TV"
-                            if 'chromecast' in content:
-                                device_name = "Chromecast / Google TV"
-                            
-                            with self.lock:
-                                self.discovered_devices.append({
-                                    'ip': ip, 
-                                    'name': device_name,
-                                    'method': f'HTTP_{port}'
-                                })
-                            return
-                            
-                except Exception:
-                    continue
-        
-        self._scan_ip_range(check)
-
-    def scan_samsung_tv(self):
-        """Enhanced Samsung TV detection"""
-        def check(ip):
-            ports = [8001, 8002, 8080, 26101]
-            
-            for port in ports:
-                try:
-                    if port in [8001, 8002]:
-                        # WebSocket ports - just check if they're open
-                        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                        sock.settimeout(self.request_timeout)
-                        result = sock.connect_ex((ip, port))
-                        sock.close()
-                        if result == 0:
-                            with self.lock:
-                                self.discovered_devices.append({
-                                    'ip': ip, 
-                                    'name': 'Samsung Smart TV',
-                                    'method': f'WebSocket_{port}'
-                                })
-                            return
-                    else:
-                        url = f"http://{ip}:{port}/"
-                        response = requests.get(url, timeout=self.request_timeout)
-                        if response.status_code == 200 and 'samsung' in response.text.lower():
-                            with self.lock:
-                                self.discovered_devices.append({
-                                    'ip': ip, 
-                                    'name': 'Samsung Smart TV',
-                                    'method': f'HTTP_{port}'
-                                })
-                            return
-                except Exception:
-                    continue
-        
-        self._scan_ip_range(check)
-
-    def scan_lg_tv(self):
-        """Enhanced LG TV detection"""
-        def check(ip):
-            ports = [3000, 3001, 36866, 1061]
-            
-            for port in ports:
-                try:
-                    url = f"http://{ip}:{port}/"
-                    response = requests.get(url, timeout=self.request_timeout)
-                    content = response.text.lower()
-                    
-                    if any(keyword in content for keyword in ['webos', 'lg', 'netcast']):
-                        device_name = "LG Smart TV"
-                        if 'webos' in content:
-                            device_name = "LG WebOS TV"
-                        
-                        with self.lock:
-                            self.discovered_devices.append({
-                                'ip': ip, 
-                                'name': device_name,
-                                'method': f'HTTP_{port}'
-                            })
-                        return
-                        
-                except Exception:
-                    continue
-        
-        self._scan_ip_range(check)
-
-    def scan_chromecast(self):
-        """Enhanced Chromecast/Google Cast detection"""
-        def check(ip):
-            ports = [8008, 8009, 8443]
-            
-            for port in ports:
-                try:
-                    # Try eureka_info endpoint
-                    url = f"http://{ip}:{port}/setup/eureka_info"
-                    response = requests.get(url, timeout=self.request_timeout)
-                    
-                    if response.status_code == 200:
-                        try:
-                            data = response.json()
-                            name = data.get("name", "Chromecast")
-                            if not name or name == "":
-                                name = "Chromecast"
-                            
-                            with self.lock:
-                                self.discovered_devices.append({
-                                    'ip': ip, 
-                                    'name': name,
-                                    'method': 'Eureka'
-                                })
-                            return
-                        except json.JSONDecodeError:
-                            pass
-                    
-                    # Try other Cast endpoints
-                    for endpoint in ["/setup/offer", "/setup/scan_wifi"]:
-                        try:
-                            url = f"http://{ip}:{port}{endpoint}"
-                            response = requests.get(url, timeout=self.request_timeout)
-                            if response.status_code == 200:
-                                with self.lock:
-                                    self.discovered_devices.append({
-                                        'ip': ip, 
-                                        'name': 'Chromecast',
-                                        'method': f'Cast_{port}'
-                                    })
-                                return
-                        except Exception:
-                            continue
-                            
-                except Exception:
-                    continue
-        
-        self._scan_ip_range(check)
+    def _port_open_sync(self, ip, port):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(self.request_timeout)
+        try:
+            return sock.connect_ex((ip, port)) == 0
+        except OSError:
+            return False
+        finally:
+            sock.close()
 
-    def scan_roku(self):
-        """Enhanced Roku detection"""
-        def check(ip):
-            try:
-                url = f"http://{ip}:8060/"
-                response = requests.get(url, timeout=self.request_timeout)
-                
-                if response.status_code == 200 and 'roku' in response.text.lower():
-                    with self.lock:
-                        self.discovered_devices.append({
-                            'ip': ip, 
-                            'name': 'Roku TV',
-                            'method': 'ECP'
-                        })
-                    return
-                    
-                # Try device info endpoint
-                url = f"http://{ip}:8060/query/device-info"
-                response = requests.get(url, timeout=self.request_timeout)
-                if response.status_code == 200 and 'roku' in response.text.lower():
-                    with self.lock:
-                        self.discovered_devices.append({
-                            'ip': ip, 
-                            'name': 'Roku TV',
-                            'method': 'DeviceInfo'
-                        })
-                        
-            except Exception:
-                pass
-        
-        self._scan_ip_range(check)
+    def _http_get_sync(self, ip, port, path="/"):
+        try:
+            response = requests.get(f"http://{ip}:{port}{path}", timeout=self.request_timeout)
+        except Exception:
+            return None
+        return ProbeResponse(response.status_code, response.content, response.encoding)
 
-    def scan_apple_tv(self):
-        """Scan for Apple TV devices"""
-        def check(ip):
+    def _probe_sync(self, ip, port, path):
+        return self._port_open_sync(ip, port) if path is None else self._http_get_sync(ip, port, path)
+
+    def scan_threaded(self):
+        """
+        The ASYNC_DISCOVERY=0 scan: the same probes, follow-ups and matchers as
+        scan_async, sent from a thread pool instead of an event loop.
+        """
+        ips = self.ip_range()
+        answers = {ip: {} for ip in ips}
+        with ThreadPoolExecutor(max_workers=THREADED_DISCOVERY_WORKERS) as pool:
+            def probe(keys):
+                for (ip, port, path), answer in zip(keys, pool.map(lambda key: self._probe_sync(*key), keys)):
+                    answers[ip][(port, path)] = answer
+
+            probe([(ip, *key) for ip in ips for key in PROBES])
+            probe([(ip, *key) for ip in ips for key, after in FOLLOW_UPS.items() if answers[ip][after] is not None])
+
+        for ip in ips:
+            self._match_host(ip, answers[ip])
+
+    def ip_range(self):
+        """Every IP of the scanned range"""
+        base_ip = self.subnet or '.'.join(self.get_local_ip().split('.')[:-1])
+        return [f"{base_ip}.{i}" for i in range(self.scan_range[0], self.scan_range[1] + 1)]
+
+    def _add_device(self, ip, name, method, location=None):
+        self.registry.record(ip, name, method, location)
+
+    async def _port_open(self, ip, port):
+        """True when something accepts a TCP connection on ip:port"""
+        async with self._probe_slots:
             try:
-                # Apple TV typically uses port 7000 for AirPlay
-                ports = [7000, 32498, 3689]
-                
-                for port in ports:
-                    try:
-                        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                        sock.settimeout(self.request_timeout)
-                        result = sock.connect_ex((ip, port))
-                        sock.close()
-                        
-                        if result == 0:
-                            with self.lock:
-                                self.discovered_devices.append({
-                                    'ip': ip, 
-                                    'name': 'Apple TV',
-                                    'method': f'Port_{port}'
-                                })
-                            return
-                    except Exception:
-                        continue
-                        
-            except Exception:
-                pass
-        
-        self._scan_ip_range(check)
+                _, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), self.request_timeout)
+            except (OSError, asyncio.TimeoutError):
+                return False
+            writer.close()
+            return True
 
-    def scan_fire_tv(self):
-        """Scan for Amazon Fire TV devices"""
-        def check(ip):
+    async def _http_get(self, ip, port, path="/"):
+        """The response to GET http://ip:port/path, or None when nothing answered in time"""
+        async with self._probe_slots:
             try:
-                # Fire TV often uses ADB on port 5555
-                ports = [5555, 8080, 8008]
-                
-                for port in ports:
-                    try:
-                        if port == 5555:
-                            # Check ADB port
-                            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                            sock.settimeout(self.request_timeout)
-                            result = sock.connect_ex((ip, port))
-                            sock.close()
-                            if result == 0:
-                                with self.lock:
-                                    self.discovered_devices.append({
-                                        'ip': ip, 
-                                        'name': 'Amazon Fire TV',
-                                        'method': 'ADB'
-                                    })
-                                return
-                        else:
-                            url = f"http://{ip}:{port}/"
-                            response = requests.get(url, timeout=self.request_timeout)
-                            if 'amazon' in response.text.lower() or 'fire' in response.text.lower():
-                                with self.lock:
-                                    self.discovered_devices.append({
-                                        'ip': ip, 
-                                        'name': 'Amazon Fire TV',
-                                        'method': f'HTTP_{port}'
-                                    })
-                                return
-                    except Exception:
-                        continue
-                        
+                return await http_get(f"http://{ip}:{port}{path}", self.request_timeout)
             except Exception:
-                pass
-        
-        self._scan_ip_range(check)
+                return None
 
-    def _scan_ip_range(self, scan_fn):
-        """Scan IP range with threading"""
-        local_ip = self.get_local_ip()
-        base_ip = '.'.join(local_ip.split('.')[:-1])
-        ip_list = [f"{base_ip}.{i}" for i in range(self.scan_range[0], self.scan_range[1] + 1)]
-        
-        with ThreadPoolExecutor(max_workers=50) as executor:
-            executor.map(scan_fn, ip_list)
+    def _probe(self, ip, port, path):
+        """The run's one probe of (ip, port, path), started on first use"""
+        key = (ip, port, path)
+        if key not in self.probe_table:
+            self.probe_table[key] = asyncio.ensure_future(
+                self._port_open(ip, port) if path is None else self._http_get(ip, port, path)
+            )
+        return self.probe_table[key]
+
+    async def _probe_host(self, ip):
+        """Sends every vendor's probes for one IP once, then runs the matchers over the answers"""
+        results = dict(zip(PROBES, await asyncio.gather(*(self._probe(ip, *key) for key in PROBES))))
+        follow_ups = [key for key, after in FOLLOW_UPS.items() if results[after] is not None]
+        results.update(zip(follow_ups, await asyncio.gather(*(self._probe(ip, *key) for key in follow_ups))))
+        self._match_host(ip, results)
+
+    def _match_host(self, ip, answers):
+        """Records every vendor whose fingerprint matches one IP's probe answers"""
+        for matcher in VENDOR_MATCHERS:
+            found = matcher(answers)
+            if found:
+                self._add_device(ip, *found)
+
+    async def scan_async(self):
+        """
+        Every vendor probe for every IP on one event loop, each (ip, port, path)
+        sent once however many vendors read it; at most DISCOVERY_CONCURRENCY
+        probes are in flight overall. The answers stay in self.probe_table.
+        """
+        self._probe_slots = asyncio.Semaphore(probe_limit(DISCOVERY_CONCURRENCY))
+        self.probe_table = {}
+        await asyncio.gather(*(self._probe_host(ip) for ip in self.ip_range()))
 
     def get_local_ip(self):
         """Get local IP address"""
@@ -417,76 +580,30 @@ class SmartTVDiscovery:
     def get_tv_name_ip_dict(self):
         """Discover all smart TV devices and return as dictionary"""
         print("Starting Smart TV discovery...")
-        print(f"Scanning IP range: {self.get_local_ip().rsplit('.', 1)[0]}.{self.scan_range[0]}-{self.scan_range[1]}")
-        
-        threads = []
-        methods = [
-            self.send_ssdp_discovery,
-            self.scan_android_tv,
-            self.scan_samsung_tv,
-            self.scan_lg_tv,
-            self.scan_chromecast,
-            self.scan_roku,
-            self.scan_apple_tv,
-            self.scan_fire_tv
-        ]
-        
-        # Start all discovery methods
-        for method in methods:
-            t = threading.Thread(target=method)
-            t.daemon = True
-            t.start()
-            threads.append(t)
-
-        # Wait for all threads to complete
-        for t in threads:
-            t.join(timeout=20)
-
-        # Deduplicate by IP and create result dictionary
-        tv_dict = {}
-        seen_ips = set()
-        
-        for device in self.discovered_devices:
-            ip = device['ip']
-            name = device.get('name', 'Unknown TV')
-            method = device.get('method', 'Unknown')
-            
-            if ip not in seen_ips:
-                # If we have multiple detections for same IP, prefer more specific names
-                if ip in [d['ip'] for d in self.discovered_devices]:
-                    # Find all devices with this IP
-                    same_ip_devices = [d for d in self.discovered_devices if d['ip'] == ip]
-                    # Prefer non-generic names
-                    best_device = max(same_ip_devices, 
-                                    key=lambda x: len(x['name']) if 'Unknown' not in x['name'] else 0)
-                    name = best_device['name']
-                    method = best_device['method']
-                
-                tv_dict[f"{name} ({ip})"] = ip
-                seen_ips.add(ip)
-                print(f"Found: {name} at {ip} (detected via {method})")
-
-        return tv_dict
+        print(f"Scanning IP range: {self.ip_range()[0].rsplit('.', 1)[0]}.{self.scan_range[0]}-{self.scan_range[1]}")
+
+        ssdp = threading.Thread(target=self.send_ssdp_discovery, daemon=True)
+        ssdp.start()
+        if ASYNC_DISCOVERY:
+            asyncio.run(self.scan_async())
+        else:
+            self.scan_threaded()
+        ssdp.join(timeout=20)
+        self.scanned = True
+
+        return self.tv_dict()
+
+    def tv_dict(self):
+        """Name (ip) -> ip for everything discovered so far"""
+        for ip, device in self.registry.devices.items():
+            print(f"Found: {device['name']} at {ip} (detected via {device['method']})")
+        return self.registry.tv_dict()
 
     def get_detailed_results(self):
-        """Get detailed discovery results with all information"""
-        self.get_tv_name_ip_dict()  # Run discovery
-        
-        # Deduplicate by IP
-        detailed_results = {}
-        seen_ips = set()
-        
-        for device in self.discovered_devices:
-            ip = device['ip']
-            if ip not in seen_ips:
-                detailed_results[ip] = {
-                    'name': device.get('name', 'Unknown TV'),
-                    'method': device.get('method', 'Unknown'),
-                    'location': device.get('location', None)
-                }
-                seen_ips.add(ip)
-        
-        return detailed_results
+        """Get detailed discovery results with all information, discovering first if nothing has run yet"""
+        if not self.scanned:
+            self.get_tv_name_ip_dict()
+        return self.registry.detailed()
 
 
 # Example usage
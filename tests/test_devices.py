@@ -0,0 +1,78 @@
+import json
+import os
+
+import pytest
+
+from agent_tools.devices import load_config, split_targets
+from agent_tools.intent_router import intent_router, parse_key_macro
+
+ONE_TV = {"tv_ip": "10.34.76.78"}
+BEDROOM = {"tv_ip": "10.34.76.78", "devices": {"bedroom": {"tv_ip": "10.34.76.80"}}}
+HOUSE = {
+    "devices": {"living_room": {"tv_ip": "10.34.76.78"}, "bedroom": {"tv_ip": "10.34.76.80"}},
+    "groups": {"downstairs": ["living_room"]},
+}
+
+
+def is_key_command(rest):
+    return parse_key_macro(rest) is not None
+
+
+@pytest.mark.parametrize("config", [ONE_TV, BEDROOM, HOUSE])
+@pytest.mark.parametrize("task", [
+    "play winner takes all",
+    "watch free for all",
+    "play one for each",
+    "play once and for all",
+    "play all for one and one for all",
+    "watch something for every",
+])
+def test_titles_ending_in_all_keep_their_last_word(task, config):
+    assert split_targets(task, config, is_key_command) == (task, [])
+
+
+@pytest.mark.parametrize("config", [ONE_TV, HOUSE])
+@pytest.mark.parametrize("task, expected", [
+    ("mute everywhere", "mute"),
+    ("volume up on all tvs", "volume up"),
+    ("pause every screen", "pause"),
+    ("play winner takes all on all the tvs", "play winner takes all"),
+])
+def test_explicit_every_tv_targets_all(task, expected, config):
+    assert split_targets(task, config, is_key_command) == (expected, ["all"])
+
+
+@pytest.mark.parametrize("config", [ONE_TV, HOUSE])
+def test_bare_all_only_follows_a_key_command(config):
+    assert split_targets("mute all", config, is_key_command) == ("mute", ["all"])
+    assert split_targets("pause on each", config, is_key_command) == ("pause", ["all"])
+    # Without a way to tell key commands apart, the bare form is never a target
+    assert split_targets("mute all", config) == ("mute all", [])
+
+
+def test_router_keeps_the_title_and_targets_key_commands(monkeypatch):
+    monkeypatch.setattr("agent_tools.devices.load_config", lambda path=None: BEDROOM)
+    assert intent_router({"current_task": "play winner takes all"}) == {}
+    update = intent_router({"current_task": "mute all"})
+    assert update["target_devices"] == ["all"] and update["edges"] == ["send_code"]
+
+
+def test_named_devices_and_groups():
+    assert split_targets("play stranger things in the bedroom", HOUSE) == ("play stranger things", ["bedroom"])
+    assert split_targets("pause downstairs", HOUSE) == ("pause downstairs", [])
+    assert split_targets("pause on downstairs", HOUSE) == ("pause", ["downstairs"])
+
+
+def test_config_is_read_again_only_when_it_changes(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps(ONE_TV))
+    first = load_config(str(path))
+    assert load_config(str(path)) is first
+
+    path.write_text(json.dumps(BEDROOM))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert load_config(str(path)) == BEDROOM
+
+    path.unlink()
+    assert load_config(str(path)) == {}
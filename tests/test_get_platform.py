@@ -0,0 +1,23 @@
+import contextlib
+import io
+
+from agent_tools.get_platform import platform_result, project_results
+from benchmarks.standins import justwatch_entry
+
+
+def resolved(title, streaming=True):
+    return title, project_results([justwatch_entry(title, streaming)]), None
+
+
+def test_target_show_is_the_title_that_plays():
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = platform_result([resolved("Dark", streaming=False), resolved("Ozark")], 0)
+    assert result["playing_title"] == "Ozark"
+    assert result["app_link"] == "https://www.netflix.com/title/ozark"
+    assert result["platform_info"][0]["name"] == "Ozark"
+
+
+def test_single_title_stays_the_target():
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = platform_result([resolved("Stranger Things")], 3)
+    assert (result["playing_title"], result["task_number"]) == ("Stranger Things", 4)
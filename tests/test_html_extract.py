@@ -0,0 +1,33 @@
+import glob
+import os
+
+import pytest
+
+from agent_tools.get_recommendations import parse_recommendations, parse_recommendations_soup
+from agent_tools.html_extract import extract_link_texts
+
+FIXTURES = os.path.join(os.path.dirname(__file__), os.pardir, "benchmarks", "fixtures", "movie_map")
+
+
+@pytest.mark.parametrize("path", sorted(glob.glob(os.path.join(FIXTURES, "*.html"))), ids=os.path.basename)
+def test_same_titles_as_beautifulsoup(path):
+    with open(path, encoding="utf-8") as f:
+        html = f.read()
+    assert sorted(parse_recommendations(html, "Inception")) == sorted(parse_recommendations_soup(html, "Inception"))
+
+
+def test_decoy_containers_are_skipped():
+    html = (
+        '<!-- <div id="gnodMap"><a class="S">Decoy</a></div> -->'
+        '<script>var t = \'<div id="gnodMap"><a class="S">Script Decoy</a></div>\';</script>'
+        '<div id="gnodMap"><a class="S">Real</a></div>'
+    )
+    assert extract_link_texts(html, "gnodMap", "S") == ["Real"]
+
+
+def test_script_style_and_template_text_is_not_part_of_a_title():
+    html = (
+        '<div id="gnodMap"><a class="S">Foo<script>x=1</script></a>'
+        '<a class="S"><style>.a{}</style>S</a><a class="S"><template>t</template>S</a></div>'
+    )
+    assert extract_link_texts(html, "gnodMap", "S") == ["Foo", "S", "S"]
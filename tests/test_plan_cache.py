@@ -0,0 +1,44 @@
+from agent_tools.plan_cache import PlanCache, normalize_task
+
+SHOW = ["set_show_name", "get_platform", "send_link"]
+YOUTUBE = ["get_youtube_query", "get_youtube_link", "send_link"]
+KEYS = ["get_key", "send_code"]
+
+
+def make_cache(tmp_path):
+    return PlanCache(path=str(tmp_path / "plans.sqlite"))
+
+
+def test_song_and_show_do_not_share_a_plan(tmp_path):
+    cache = make_cache(tmp_path)
+    assert normalize_task("play despacito") == normalize_task("play stranger things")
+
+    cache.set("play despacito", YOUTUBE)
+    assert cache.get("play stranger things") is None
+    # Nor does it come back from disk after a restart
+    assert make_cache(tmp_path).get("play stranger things") is None
+
+
+def test_app_and_key_do_not_share_a_plan(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set("open netflix", SHOW)
+    cache.set("open settings", KEYS)
+    assert cache.get("open netflix") is None
+    assert cache.get("open settings") is None
+
+
+def test_plans_pinned_by_the_command_are_shared(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set("watch stranger things", SHOW)
+    cache.set("play bailando song", YOUTUBE)
+    cache.set("volume up 3 times", KEYS)
+
+    assert cache.get("watch the office") == SHOW
+    assert cache.get("play despacito song") == YOUTUBE
+    assert cache.get("volume up 5 times") == KEYS
+
+
+def test_unpinned_entries_already_on_disk_are_ignored(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.disk.set(normalize_task("play despacito"), YOUTUBE)
+    assert cache.get("play stranger things") is None
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+import agent_tools.plan_dag as plan_dag
+from agent_tools.plan_dag import NODE_IO, dead_writes, plan_levels
+
+MIXED = ["set_show_name", "get_youtube_query", "get_platform", "get_youtube_link", "send_link"]
+
+
+def test_platform_and_recommendations_run_together():
+    # The planner prompt's example of a plan with independent branches
+    assert plan_levels(["set_show_name", "get_platform", "get_recommendations"]) == [
+        ["set_show_name"],
+        ["get_platform", "get_recommendations"],
+    ]
+
+
+@pytest.mark.parametrize("edges", [
+    ["get_youtube_query", "get_youtube_link", "send_link"],
+    ["set_show_name", "get_recommendations", "get_platform", "send_link"],
+    ["get_key", "send_code"],
+    ["set_show_name", "get_platform", "send_link"],
+])
+def test_chains_from_the_planner_prompt_stay_in_order(edges):
+    assert plan_levels(edges) == [[node] for node in edges]
+
+
+def test_link_lookups_of_a_mixed_plan_run_together():
+    # get_platform's app_link is overwritten by get_youtube_link before send_link reads it
+    assert dead_writes(MIXED, 2) == {"app_link"}
+    assert plan_levels(MIXED) == [
+        ["set_show_name", "get_youtube_query"],
+        ["get_platform", "get_youtube_link"],
+        ["send_link"],
+    ]
+
+
+def test_a_link_that_is_sent_is_not_dead():
+    edges = ["set_show_name", "get_platform", "send_link", "get_youtube_query", "get_youtube_link", "send_link"]
+    assert dead_writes(edges, 1) == set()
+    # The first send_link still reads the platform link from before its batch
+    assert plan_levels(edges) == [
+        ["set_show_name", "get_youtube_query"],
+        ["get_platform"],
+        ["send_link", "get_youtube_link"],
+        ["send_link"],
+    ]
+
+
+def stand_in(name, seen):
+    async def node(state):
+        seen.append((name, state.get("app_link")))
+        update = {key: f"{name}:{key}" for key in NODE_IO[name][1] if key != "repeat"}
+        return {**update, "task_number": state["task_number"] + 1}
+    return node
+
+
+@pytest.mark.parametrize("parallel", [True, False])
+def test_mixed_plan_ends_like_the_linear_run(parallel, monkeypatch):
+    from main import build_graph
+
+    monkeypatch.setattr(plan_dag, "PARALLEL_PLAN", parallel)
+    seen = []
+    app = build_graph(nodes={name: stand_in(name, seen) for name in NODE_IO})
+    state = asyncio.run(app.ainvoke({"current_task": "test plan", "task_number": 0, "edges": MIXED}))
+
+    assert ("send_link", "get_youtube_link:app_link") in seen
+    assert state["app_link"] == "get_youtube_link:app_link"
+    assert state["platform_info"] == "get_platform:platform_info"
+    assert state["done_steps"] == list(range(len(MIXED)))
@@ -0,0 +1,62 @@
+import asyncio
+import threading
+
+import pytest
+from langchain_core.exceptions import OutputParserException
+
+import agent_tools.planner as planner
+
+# The first edge streams in fine, the plan as a whole does not validate
+BROKEN_PLAN = ['{"edges": ["set_show_name", ', '"not_a_tool"', ']}']
+
+
+def test_async_early_step_is_cancelled_when_the_plan_does_not_parse(monkeypatch):
+    started, cancelled = asyncio.Event(), []
+
+    async def astream(**variables):
+        for chunk in BROKEN_PLAN:
+            await asyncio.sleep(0)
+            yield chunk
+        # The early step is running when the plan turns out to be unusable
+        await started.wait()
+
+    async def slow_step(state):
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    monkeypatch.setattr(planner.plan_chain, "astream", astream)
+    monkeypatch.setitem(planner.PREFETCH_NODES_ASYNC, "set_show_name", slow_step)
+
+    async def main():
+        with pytest.raises(OutputParserException):
+            await planner.stream_plan_async({"current_task": "watch dark"})
+        await asyncio.sleep(0)
+        # Cancelled by the planner, not by asyncio.run tearing the loop down
+        assert cancelled == [True]
+
+    asyncio.run(main())
+
+
+def test_sync_early_step_is_cancelled_when_the_plan_does_not_parse(monkeypatch):
+    release, calls = threading.Event(), []
+
+    def stream(**variables):
+        yield from BROKEN_PLAN
+
+    monkeypatch.setattr(planner.plan_chain, "stream", stream)
+    # Keep the pool busy so the early step is still queued when the plan fails
+    blockers = [planner.prefetch_pool.submit(release.wait) for _ in range(planner.prefetch_pool._max_workers)]
+    monkeypatch.setitem(planner.PREFETCH_NODES, "set_show_name", lambda state: calls.append(state))
+    try:
+        with pytest.raises(OutputParserException):
+            planner.stream_plan({"current_task": "watch dark"})
+    finally:
+        release.set()
+        for blocker in blockers:
+            blocker.result()
+    planner.prefetch_pool.submit(lambda: None).result()
+    assert calls == []
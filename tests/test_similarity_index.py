@@ -0,0 +1,54 @@
+import json
+import sqlite3
+
+from agent_tools import get_recommendations
+from agent_tools.similarity_index import SimilarityIndex, open_index
+
+
+def make_index(tmp_path):
+    return SimilarityIndex(path=str(tmp_path / "similar.sqlite"))
+
+
+def test_empty_results_are_not_indexed(tmp_path):
+    index = make_index(tmp_path)
+    assert index.put_many({"Dark": ["Stranger Things"], "Nothing Like It": []}) == 1
+    assert index.get("nothing like it") is None
+    assert index.get("dark") == (["Stranger Things"], False)
+    assert make_index(tmp_path).get("nothing like it") is None
+
+
+def test_empty_entries_already_on_disk_are_misses(tmp_path):
+    db = sqlite3.connect(tmp_path / "similar.sqlite")
+    db.execute("CREATE TABLE similar (key TEXT PRIMARY KEY, title TEXT NOT NULL, similar TEXT NOT NULL, updated_at REAL NOT NULL)")
+    db.execute("INSERT INTO similar VALUES ('nothing like it', 'Nothing Like It', '[]', 0)")
+    db.commit()
+    db.close()
+
+    index = make_index(tmp_path)
+    assert index.get("nothing like it") is None
+    assert len(index) == 0
+
+
+def test_empty_scrape_is_not_indexed_by_either_path(tmp_path, monkeypatch):
+    index = make_index(tmp_path)
+    monkeypatch.setattr(get_recommendations, "similarity_index", index)
+    get_recommendations.index_recommendations("Nothing Like It", [])
+    get_recommendations.index_recommendations("Dark", ["Stranger Things"])
+    assert get_recommendations.indexed_recommendations("Nothing Like It") is None
+    assert get_recommendations.indexed_recommendations("Dark") == ["Stranger Things"]
+
+
+def test_bad_snapshot_starts_an_empty_index(tmp_path):
+    snapshot = tmp_path / "snapshot.json"
+    snapshot.write_text("{not json")
+    assert len(open_index(str(snapshot), path=str(tmp_path / "similar.sqlite"))) == 0
+    assert len(open_index(str(tmp_path / "missing.json"), path=str(tmp_path / "similar.sqlite"))) == 0
+
+    snapshot.write_text(json.dumps({"Dark": ["Stranger Things"]}))
+    assert len(open_index(str(snapshot), path=str(tmp_path / "similar.sqlite"))) == 1
+
+
+def test_unreadable_index_file_starts_an_empty_index(tmp_path):
+    broken = tmp_path / "similar.sqlite"
+    broken.write_bytes(b"not a database" * 100)
+    assert len(open_index("", path=str(broken))) == 0
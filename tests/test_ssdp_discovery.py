@@ -0,0 +1,39 @@
+import contextlib
+import io
+import time
+
+import pytest
+
+from benchmarks.standins import SSDP_TVS, SsdpResponder
+from setup.test import SSDP_MX, SSDP_SEARCH_TARGETS, SmartTVDiscovery
+
+
+@pytest.fixture
+def responder():
+    try:
+        responder = SsdpResponder(repeats=3)
+    except OSError as e:
+        pytest.skip(f"multicast is not available here: {e}")
+    yield responder
+    responder.close()
+
+
+def test_one_window_finds_each_tv_once(responder):
+    discovery = SmartTVDiscovery()
+    start = time.monotonic()
+    with contextlib.redirect_stdout(io.StringIO()):
+        discovery.send_ssdp_discovery()
+    elapsed = time.monotonic() - start
+
+    if not responder.replies:
+        pytest.skip("multicast searches do not reach the stand-in responder here")
+
+    # Every target in one window, not one window per target
+    assert elapsed <= SSDP_MX + 1 + 0.5
+    assert len(SSDP_SEARCH_TARGETS) > 1
+
+    # Each TV answered several targets several times, but is one device with one description fetch
+    found = {ip: device["name"] for ip, device in discovery.registry.devices.items() if ip in SSDP_TVS}
+    assert found == {ip: name for ip, (name, _) in SSDP_TVS.items()}
+    assert responder.replies > len(SSDP_TVS)
+    assert responder.descriptions_served() == len(SSDP_TVS)
@@ -0,0 +1,37 @@
+import asyncio
+import contextlib
+import io
+
+import pytest
+
+from benchmarks.standins import LAN_TVS, StandInLan
+from setup.test import SmartTVDiscovery
+
+
+@pytest.fixture(scope="module")
+def lan():
+    # Every stand-in TV and one empty address; the rest of the range refuses at once
+    lan = StandInLan(hosts=[9, *LAN_TVS])
+    yield lan
+    lan.close()
+
+
+def scan(lan, engine):
+    # Long enough that no stand-in answer is lost to a busy machine
+    discovery = SmartTVDiscovery(timeout=2.0, scan_range=(8, 72), subnet=lan.subnet)
+    with contextlib.redirect_stdout(io.StringIO()):
+        if engine == "threaded":
+            discovery.scan_threaded()
+        else:
+            asyncio.run(discovery.scan_async())
+        return discovery.tv_dict(), discovery.registry.detailed()
+
+
+def test_threaded_and_async_scans_agree(lan):
+    threaded, threaded_details = scan(lan, "threaded")
+    async_, async_details = scan(lan, "async")
+
+    assert threaded == async_
+    assert {ip: device["methods"] for ip, device in threaded_details.items()} == \
+        {ip: device["methods"] for ip, device in async_details.items()}
+    assert set(threaded.values()) == set(lan.tvs) and len(lan.tvs) == len(LAN_TVS)
@@ -0,0 +1,63 @@
+import asyncio
+import contextlib
+import io
+
+import pytest
+
+import agent_tools.tv_remote as tv_remote
+from agent_tools.tv_remote import RemoteSession
+from benchmarks.fake_remote import FakeAndroidTV, client_cert_pair
+
+
+@pytest.fixture
+def tv():
+    tv = FakeAndroidTV().start()
+    yield tv
+    tv.close()
+
+
+async def until(condition, timeout=5.0):
+    for _ in range(int(timeout / 0.02)):
+        if condition():
+            return
+        await asyncio.sleep(0.02)
+    raise AssertionError("timed out")
+
+
+def run(tv, scenario):
+    async def main():
+        session = RemoteSession("127.0.0.1", *client_cert_pair(), "tv-agent-test", api_port=tv.port)
+        try:
+            await session.check()
+            assert session.is_healthy()
+            await scenario(session)
+            return session
+        finally:
+            session.close()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return asyncio.run(main())
+
+
+def test_library_reconnects_a_dropped_session(tv):
+    async def scenario(session):
+        tv.drop_connections()
+        await until(lambda: not session.ready.is_set())
+        # The library's reconnect loop is on it, the health check leaves it alone
+        await session.check()
+        await until(session.is_healthy)
+
+    session = run(tv, scenario)
+    assert (session.connects, session.reconnects) == (1, 1)
+
+
+def test_health_check_reconnects_when_the_library_takes_too_long(tv, monkeypatch):
+    monkeypatch.setattr(tv_remote, "LIBRARY_RECONNECT_GRACE_SEC", 0.0)
+
+    async def scenario(session):
+        tv.drop_connections()
+        await until(lambda: not session.ready.is_set())
+        await session.check()
+        assert session.is_healthy()
+
+    assert run(tv, scenario).connects == 2
@@ -0,0 +1,95 @@
+import asyncio
+import json
+from concurrent.futures import Future
+
+import pytest
+from youtube_search import YoutubeSearch
+
+import agent_tools.get_youtube_link as youtube_link
+from agent_tools.get_youtube_link import FirstVideoScanner
+from benchmarks.standins import youtube_results_page, youtube_video
+
+
+def results_page(contents, header=None):
+    data = {"contents": {"twoColumnSearchResultsRenderer": {"primaryContents": {"sectionListRenderer": {"contents": contents}}}}}
+    if header is not None:
+        data = {"header": header, **data}
+    return f"<html><script>var ytInitialData = {json.dumps(data)};</script></html>"
+
+
+def scan(page, chunk_size):
+    scanner = FirstVideoScanner()
+    for i in range(0, len(page), chunk_size):
+        video = scanner.feed(page[i:i + chunk_size])
+        if video:
+            return video, scanner
+    return None, scanner
+
+
+@pytest.mark.parametrize("chunk_size", [7, 1000, 16 * 1024, 10 ** 7])
+def test_first_video_matches_youtube_search(chunk_size):
+    page = youtube_results_page("/results?search_query=lofi+music", b"")[2].decode()
+    video, scanner = scan(page, chunk_size)
+    expected = YoutubeSearch._parse_html(None, page)[0]
+    assert (video["id"], video["url_suffix"]) == (expected["id"], expected["url_suffix"])
+    # Only the unscanned end of the page is kept, not the whole page
+    assert len("".join(scanner.pending)) < chunk_size + 64
+
+
+@pytest.mark.parametrize("chunk_size", [5, 300, 10 ** 7])
+def test_nested_video_renderers_are_not_results(chunk_size):
+    shelf = {"shelfRenderer": {"content": {"items": [youtube_video("shelf", 0)]}}}
+    ad = {"adSlotRenderer": {"fulfillment": youtube_video("ad", 0)}}
+    unplayable = {"videoRenderer": {"videoId": "upcoming"}}
+    page = results_page(
+        [{"itemSectionRenderer": {"contents": [shelf, ad, unplayable, youtube_video("real", 0)]}}],
+        header=youtube_video("header", 0),
+    )
+    video, _ = scan(page, chunk_size)
+    assert video["id"] == "real_0"
+
+
+def test_later_item_sections_are_searched():
+    page = results_page([
+        {"itemSectionRenderer": {"contents": [{"messageRenderer": {"text": "No results"}}]}},
+        {"itemSectionRenderer": {"contents": [youtube_video("second", 3)]}},
+    ])
+    assert scan(page, 11)[0]["id"] == "second_3"
+
+
+def test_page_without_results_finds_nothing():
+    assert scan(results_page([{"itemSectionRenderer": {"contents": []}}]), 4)[0] is None
+    assert scan("<html>consent</html>", 4)[0] is None
+
+
+def discarded_speculation(monkeypatch):
+    """A speculative hit for another title, while the llm query itself finds nothing."""
+    searches = []
+
+    def find_video(query):
+        searches.append(query)
+        return None
+
+    async def find_video_async(query):
+        return find_video(query)
+
+    monkeypatch.setattr(youtube_link, "find_video", find_video)
+    monkeypatch.setattr(youtube_link, "find_video_async", find_video_async)
+    future = Future()
+    future.set_result({**youtube_video("other", 0), "title": "Something Else Entirely"})
+    monkeypatch.setitem(youtube_link.speculations, youtube_link.query_key("rare live set"), ("rare set", future))
+    return searches
+
+
+def test_discarded_speculation_without_results_is_not_searched_again(monkeypatch):
+    searches = discarded_speculation(monkeypatch)
+    with pytest.raises(Exception, match="No YouTube results"):
+        youtube_link.get_youtube_link({"youtube_query": "rare live set", "task_number": 0})
+    assert searches == ["rare live set"]
+
+
+def test_discarded_speculation_without_results_is_not_searched_again_async(monkeypatch):
+    searches = discarded_speculation(monkeypatch)
+    with pytest.raises(Exception, match="No YouTube results"):
+        asyncio.run(youtube_link.get_youtube_link_async({"youtube_query": "rare live set", "task_number": 0}))
+    assert searches == ["rare live set"]